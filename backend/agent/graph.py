@@ -9,7 +9,10 @@ from backend.agent.nodes.memory_nodes import (
 )
 from backend.agent.nodes.response_node import response_node
 from backend.agent.nodes.escalation_node import escalation_node
+from backend.database import session_scope
+from backend.services.profile_store import ProfileUnitOfWork
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 import uuid
 
 
@@ -21,24 +24,33 @@ def should_escalate(state: AgentState) -> str:
 
 
 class MedicalAgentGraph:
-    """LangGraph workflow for medical agent"""
+    """
+    LangGraph workflow for medical agent
     
-    def __init__(self, db: AsyncSession, message_id: uuid.UUID):
+    Without a db the run checks a connection out only around its reads and
+    writes (profile read, escalation ticket, final profile write) and holds
+    none while the LLM nodes wait on Gemini. Passing a db runs every step in
+    that session instead; the caller commits it.
+    """
+    
+    def __init__(self, message_id: uuid.UUID, db: Optional[AsyncSession] = None):
         self.db = db
         self.message_id = message_id
+        self.profile_uow = None  # Created per run, shared by every node that touches the profile
         self.graph = self._build_graph()
     
     async def _memory_retrieval_wrapper(self, state: AgentState) -> AgentState:
         """Wrapper for memory retrieval node with db dependency"""
-        return await memory_retrieval_node(state, self.db)
+        async with session_scope(self.db) as db:
+            return await memory_retrieval_node(state, db, self.profile_uow)
     
     async def _memory_update_wrapper(self, state: AgentState) -> AgentState:
         """Wrapper for memory update node with db and message_id dependencies"""
-        return await memory_update_node(state, self.db, self.message_id)
+        return await memory_update_node(state, self.db, self.message_id, self.profile_uow)
     
     async def _escalation_wrapper(self, state: AgentState) -> AgentState:
         """Wrapper for escalation node with db dependency"""
-        return await escalation_node(state, self.db)
+        return await escalation_node(state, self.db, self.profile_uow)
     
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph state machine"""
@@ -81,6 +93,13 @@ class MedicalAgentGraph:
     
     async def run(self, initial_state: AgentState) -> AgentState:
         """Run the agent workflow"""
+        self.profile_uow = ProfileUnitOfWork(uuid.UUID(initial_state["patient_id"]))
+        
         # LangGraph's invoke method
         result = await self.graph.ainvoke(initial_state)
+        
+        # Single profile write for the whole run
+        if self.profile_uow.has_changes:
+            async with session_scope(self.db) as db:
+                await self.profile_uow.commit(db)
         return result
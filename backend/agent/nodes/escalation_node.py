@@ -1,19 +1,41 @@
-import google.generativeai as genai
 from backend.agent.state import AgentState
 from backend.config import get_settings
+from backend.database import session_scope
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.models.escalation import EscalationTicket, EscalationStatus
 from backend.models.conversation import Conversation, ConversationStatus
+from backend.services.profile_store import ProfileUnitOfWork
+from backend.services.profile_digest import build_digest
+from backend.services.escalation_dispatch import escalation_dispatcher
+from backend.services.clinician_assignment import assign_ticket
+from backend.services.escalation_coalescer import (
+    acquire_escalation_advisory_lock, add_follow_up, find_open_ticket, follow_up_entry,
+    lock_ticket, material_change, sbar_due, sbar_update_prompt, seconds_until_sbar_due,
+    trailing_sbar_updates, unsummarized
+)
+from backend.services.escalation_dispatch import OPEN_STATUSES
+from backend.services.llm import llm
+from backend.services.metrics import metrics
+from datetime import datetime
+from typing import Optional
 import uuid
-import json
 
 settings = get_settings()
-genai.configure(api_key=settings.google_api_key)
 
 
-async def escalation_node(state: AgentState, db: AsyncSession) -> AgentState:
+async def escalation_node(state: AgentState, db: Optional[AsyncSession], profile_uow: Optional[ProfileUnitOfWork] = None) -> AgentState:
     """
     Node 7: Create escalation ticket with SBAR clinical summary
+    
+    With db=None the profile read and the ticket write each use their own short
+    session (the ticket is committed right away), so no connection is held
+    while the SBAR is generated. The new ticket is assigned to the least-loaded
+    available clinician in the same transaction, if there is one, and goes
+    straight into the clinician queue (escalation_dispatcher).
+    
+    If the conversation already has an open ticket, the message is added to it
+    as a follow-up instead (see backend/services/escalation_coalescer.py).
     """
     if not state.get("should_escalate", False):
         return state
@@ -21,38 +43,36 @@ async def escalation_node(state: AgentState, db: AsyncSession) -> AgentState:
     conversation_id = uuid.UUID(state["conversation_id"])
     patient_id = uuid.UUID(state["patient_id"])
     risk_assessment = state.get("risk_assessment", {})
-    profile = state.get("patient_profile")
+    profile_context = state.get("profile_context")
     message = state["redacted_message"]
     
-    # If profile is None (escalation happened before memory retrieval), load it now
-    if profile is None:
-        from sqlalchemy import select
-        from backend.models.patient_profile import PatientProfile
-        
-        result = await db.execute(
-            select(PatientProfile).where(PatientProfile.patient_id == patient_id)
-        )
-        profile_obj = result.scalar_one_or_none()
-        
-        if profile_obj:
-            profile = {
-                "medications": profile_obj.medications or [],
-                "symptoms": profile_obj.symptoms or [],
-                "allergies": profile_obj.allergies or [],
-                "conditions": profile_obj.conditions or []
-            }
+    # Open ticket to add to, and the profile if it is still needed (escalation
+    # happened before memory retrieval)
+    open_ticket = None
+    needs_profile = profile_context is None and state.get("patient_profile") is None
+    if settings.escalation_coalesce or needs_profile:
+        async with session_scope(db) as read_db:
+            if settings.escalation_coalesce:
+                open_ticket = await find_open_ticket(read_db, conversation_id)
+            if open_ticket is None and needs_profile:
+                profile_uow = profile_uow or ProfileUnitOfWork(patient_id)
+                profile_context = await profile_uow.digest(read_db)
+    
+    if open_ticket is not None:
+        followed = await _follow_up(state, db, open_ticket)
+        if followed is not None:
+            return followed
+        # Resolved in the meantime: this message starts a new ticket
+    
+    if profile_context is None:
+        if state.get("patient_profile") is not None:
+            profile_context = build_digest(state["patient_profile"])
         else:
-            # No profile exists yet, use empty profile
-            profile = {
-                "medications": [],
-                "symptoms": [],
-                "allergies": [],
-                "conditions": []
-            }
+            profile_uow = profile_uow or ProfileUnitOfWork(patient_id)
+            async with session_scope(db) as read_db:
+                profile_context = await profile_uow.digest(read_db)
     
     # Generate SBAR clinical summary
-    model = genai.GenerativeModel(settings.gemini_model)
-    
     prompt = f"""Generate a clinical summary in SBAR format for this escalation.
 
 Patient Message: "{message}"
@@ -60,10 +80,7 @@ Risk Level: {risk_assessment.get('risk_level', 'UNKNOWN')}
 Risk Reason: {risk_assessment.get('reason', 'Unknown')}
 
 Patient Profile:
-- Medications: {json.dumps(profile.get('medications', []))}
-- Symptoms: {json.dumps(profile.get('symptoms', []))}
-- Allergies: {json.dumps(profile.get('allergies', []))}
-- Conditions: {json.dumps(profile.get('conditions', []))}
+{profile_context["block"]}
 
 Generate SBAR format:
 **Situation**: What is happening with the patient right now?
@@ -75,8 +92,7 @@ Keep it concise and professional.
 """
     
     try:
-        response = model.generate_content(prompt)
-        clinical_summary = response.text.strip()
+        clinical_summary = (await llm.generate("sbar", prompt)).strip()
     except Exception as e:
         print(f"Error generating SBAR: {e}")
         clinical_summary = f"Patient reports: {message}\nRisk Level: {risk_assessment.get('risk_level')}\nReason: {risk_assessment.get('reason')}"
@@ -88,22 +104,91 @@ Keep it concise and professional.
         reason=risk_assessment.get("reason", "High risk detected"),
         risk_level=risk_assessment.get("risk_level", "UNKNOWN"),
         clinical_summary=clinical_summary,
-        status=EscalationStatus.PENDING
+        status=EscalationStatus.PENDING,
+        follow_ups=[],
+        summarized_follow_ups=0,
+        summary_updated_at=datetime.utcnow()
     )
     
-    db.add(ticket)
-    await db.flush()
-    
-    # Update conversation status
-    from sqlalchemy import select
-    result = await db.execute(
-        select(Conversation).where(Conversation.id == conversation_id)
-    )
-    conversation = result.scalar_one_or_none()
-    if conversation:
-        conversation.status = ConversationStatus.ESCALATED
+    async with session_scope(db) as write_db:
+        existing = None
+        if settings.escalation_coalesce:
+            # Another run may have opened a ticket while the SBAR was generated
+            await acquire_escalation_advisory_lock(write_db, conversation_id)
+            existing = await find_open_ticket(write_db, conversation_id, for_update=True)
+        
+        if existing is not None:
+            add_follow_up(existing, follow_up_entry(message, risk_assessment, material_change(existing, message, risk_assessment)))
+            metrics.incr("escalation_follow_ups")
+            ticket = existing
+        else:
+            write_db.add(ticket)
+            if settings.escalation_auto_assign:
+                await assign_ticket(write_db, ticket)
+            await write_db.flush()
+        
+        # Update conversation status
+        result = await write_db.execute(
+            select(Conversation).where(Conversation.id == conversation_id)
+        )
+        conversation = result.scalar_one_or_none()
+        if conversation:
+            conversation.status = ConversationStatus.ESCALATED
     
+    escalation_dispatcher.track(ticket)
     state["escalation_ticket_id"] = str(ticket.id)
     state["response"] = f"Your message has been escalated to a healthcare professional. A clinician will respond shortly."
     
     return state
+
+
+async def _follow_up(state: AgentState, db: Optional[AsyncSession], ticket: EscalationTicket) -> Optional[AgentState]:
+    """
+    Add an escalating message to the conversation's open ticket
+    
+    The SBAR is updated from the current one and the uncovered follow-ups
+    when one of them raised the risk level, or is a material change and the
+    debounce interval has passed; otherwise a material change is summarized
+    when the interval ends (trailing_sbar_updates). The LLM call runs without
+    a session, like ticket creation. Returns None if the ticket was resolved
+    in the meantime.
+    """
+    risk_assessment = state.get("risk_assessment", {})
+    message = state["redacted_message"]
+    follow_up = follow_up_entry(message, risk_assessment, material_change(ticket, message, risk_assessment))
+    summarized, seen = ticket.summarized_follow_ups or 0, len(ticket.follow_ups or [])
+    pending = unsummarized(ticket) + [follow_up]
+    
+    clinical_summary = None
+    if sbar_due(ticket, pending):
+        try:
+            clinical_summary = (await llm.generate("sbar", sbar_update_prompt(ticket, pending))).strip()
+            metrics.incr("escalation_sbar_updates")
+        except Exception as e:
+            print(f"Error updating SBAR: {e}")
+    elif follow_up["material"]:
+        metrics.incr("escalation_sbar_debounced")
+    
+    async with session_scope(db) as write_db:
+        current = await lock_ticket(write_db, ticket.id)
+        if current is not None and current.status in OPEN_STATUSES:
+            # The SBAR only covers the follow-ups it was generated from
+            unchanged = current.summarized_follow_ups == summarized and len(current.follow_ups or []) == seen
+            add_follow_up(current, follow_up)
+            if clinical_summary and unchanged:
+                current.clinical_summary = clinical_summary
+                current.summarized_follow_ups = len(current.follow_ups)
+                current.summary_updated_at = datetime.utcnow()
+    
+    if current is None or current.status not in OPEN_STATUSES:
+        return None
+    
+    remaining = seconds_until_sbar_due(current, unsummarized(current))
+    if remaining is not None:
+        trailing_sbar_updates.schedule(current.id, remaining)
+    
+    metrics.incr("escalation_follow_ups")
+    escalation_dispatcher.track(current)
+    state["escalation_ticket_id"] = str(current.id)
+    state["response"] = "Your message has been added to your open escalation. A clinician will respond shortly."
+    return state
@@ -1,44 +1,31 @@
-from typing import Dict, List
-import google.generativeai as genai
+from typing import Dict, List, Optional
 from backend.agent.state import AgentState
 from backend.config import get_settings
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from backend.models.patient_profile import PatientProfile
+from backend.services.profile_history import facts_to_events
+from backend.services.profile_store import ProfileUnitOfWork
+from backend.services.profile_digest import build_digest
+from backend.services.json_stream import IncrementalJSONParser
+from backend.services.llm import llm
+from backend.services.llm_schemas import ExtractedFactsOutput, parse_facts
+from backend.services.near_duplicate import near_duplicate_cache
+from backend.services.risk_assessment import risk_assessment_service
 import uuid
-import json
 
 settings = get_settings()
-genai.configure(api_key=settings.google_api_key)
 
 
-async def memory_retrieval_node(state: AgentState, db: AsyncSession) -> AgentState:
+async def memory_retrieval_node(state: AgentState, db: AsyncSession, profile_uow: Optional[ProfileUnitOfWork] = None) -> AgentState:
     """
     Node 3: Retrieve current patient profile from database
-    """
-    patient_id = uuid.UUID(state["patient_id"])
     
-    # Fetch patient profile
-    result = await db.execute(
-        select(PatientProfile).where(PatientProfile.patient_id == patient_id)
-    )
-    profile = result.scalar_one_or_none()
+    A plain read: the advisory lock is only taken by the unit of work's commit,
+    so no lock (or connection) is held while the later nodes call the LLM.
+    """
+    profile_uow = profile_uow or ProfileUnitOfWork(uuid.UUID(state["patient_id"]))
     
-    if profile:
-        state["patient_profile"] = {
-            "medications": profile.medications or [],
-            "symptoms": profile.symptoms or [],
-            "allergies": profile.allergies or [],
-            "conditions": profile.conditions or []
-        }
-    else:
-        # Create empty profile if doesn't exist
-        state["patient_profile"] = {
-            "medications": [],
-            "symptoms": [],
-            "allergies": [],
-            "conditions": []
-        }
+    state["patient_profile"] = await profile_uow.view(db)
+    state["profile_context"] = await profile_uow.digest(db)
     
     return state
 
@@ -48,19 +35,26 @@ async def fact_extraction_node(state: AgentState) -> AgentState:
     Node 4: Extract medical facts from patient message using LLM
     """
     message = state["redacted_message"]
-    current_profile = state.get("patient_profile", {})
     
-    model = genai.GenerativeModel(settings.gemini_model)
+    # Facts are extracted relative to the current profile: a near-duplicate
+    # message against the same profile version yields the same facts. HIGH
+    # keywords always run in full.
+    scope = None
+    if state.get("profile_context") and risk_assessment_service.keyword_risk_level(message) != "HIGH":
+        scope = f"{state['patient_id']}:{state['profile_context'].get('version')}"
+        cached = near_duplicate_cache.get("extraction", message, scope)
+        if cached is not None:
+            state["extracted_facts"] = cached
+            return state
+    
+    profile_context = state.get("profile_context") or build_digest(state.get("patient_profile") or {})
     
     prompt = f"""Extract structured medical facts from this patient message.
 
 Patient Message: "{message}"
 
 Current Profile:
-- Medications: {json.dumps(current_profile.get('medications', []))}
-- Symptoms: {json.dumps(current_profile.get('symptoms', []))}
-- Allergies: {json.dumps(current_profile.get('allergies', []))}
-- Conditions: {json.dumps(current_profile.get('conditions', []))}
+{profile_context["block"]}
 
 Extract any NEW or UPDATED information about:
 1. Medications (name, status: ACTIVE/STOPPED/CHANGED)
@@ -80,19 +74,13 @@ If no new facts, return empty arrays.
 """
     
     try:
-        response = model.generate_content(prompt)
-        result_text = response.text.strip()
-        
-        # Extract JSON
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        extracted_facts = json.loads(result_text)
-        if not isinstance(extracted_facts, dict):
-             extracted_facts = {}
+        # Schema-constrained JSON; malformed or cut-short replies keep their valid facts
+        parser = IncrementalJSONParser()
+        parser.feed(await llm.generate("extraction", prompt, schema=ExtractedFactsOutput))
+        extracted_facts = parse_facts(parser.result())
         state["extracted_facts"] = extracted_facts
+        if scope is not None and parser.complete:
+            near_duplicate_cache.put("extraction", message, extracted_facts, scope)
         
     except Exception as e:
         print(f"Error extracting facts: {e}")
@@ -101,91 +89,30 @@ If no new facts, return empty arrays.
     return state
 
 
-async def memory_update_node(state: AgentState, db: AsyncSession, message_id: uuid.UUID) -> AgentState:
+async def memory_update_node(
+    state: AgentState,
+    db: Optional[AsyncSession],
+    message_id: uuid.UUID,
+    profile_uow: Optional[ProfileUnitOfWork] = None
+) -> AgentState:
     """
     Node 5: Update patient profile with extracted facts (with provenance)
-    """
-    patient_id = uuid.UUID(state["patient_id"])
-    
-    # Get or create profile
-    result = await db.execute(
-        select(PatientProfile).where(PatientProfile.patient_id == patient_id)
-    )
-    profile = result.scalar_one_or_none()
     
-    if not profile:
-        profile = PatientProfile(
-            patient_id=patient_id,
-            medications=[],
-            symptoms=[],
-            allergies=[],
-            conditions=[]
-        )
-        db.add(profile)
-        
-    # Ensure fields are lists (in case of DB corruption or None values)
-    if profile.medications is None: profile.medications = []
-    if profile.symptoms is None: profile.symptoms = []
-    if profile.allergies is None: profile.allergies = []
-    if profile.conditions is None: profile.conditions = []
+    Inside the graph the changes are staged on the shared unit of work and
+    written once at the end of the run (no database access here, db may be
+    None); called standalone it writes immediately.
+    """
+    standalone = profile_uow is None
+    profile_uow = profile_uow or ProfileUnitOfWork(uuid.UUID(state["patient_id"]))
     
     extracted_facts = state.get("extracted_facts", {})
     if not isinstance(extracted_facts, dict):
         extracted_facts = {}
     
-    # Update medications
-    for med_update in extracted_facts.get("medications", []):
-        action = med_update.get("action")
-        med_name = med_update.get("name")
-        
-        if action == "ADD":
-            profile.medications.append({
-                "name": med_name,
-                "status": med_update.get("status", "ACTIVE"),
-                "provenance_message_id": str(message_id),
-                "added_at": str(uuid.uuid4())  # Timestamp placeholder
-            })
-        elif action == "STOP":
-            # Find and update existing medication
-            for med in profile.medications:
-                if med["name"].lower() == med_name.lower():
-                    med["status"] = "STOPPED"
-                    med["provenance_message_id"] = str(message_id)
-    
-    # Update symptoms
-    for symptom_update in extracted_facts.get("symptoms", []):
-        if symptom_update.get("action") == "ADD":
-            profile.symptoms.append({
-                "description": symptom_update.get("description"),
-                "severity": symptom_update.get("severity", "MODERATE"),
-                "provenance_message_id": str(message_id)
-            })
-    
-    # Update allergies
-    for allergy_update in extracted_facts.get("allergies", []):
-        if allergy_update.get("action") == "ADD":
-            profile.allergies.append({
-                "allergen": allergy_update.get("allergen"),
-                "reaction": allergy_update.get("reaction", "Unknown"),
-                "provenance_message_id": str(message_id)
-            })
-    
-    # Update conditions
-    for condition_update in extracted_facts.get("conditions", []):
-        if condition_update.get("action") == "ADD":
-            profile.conditions.append({
-                "name": condition_update.get("name"),
-                "status": condition_update.get("status", "Active"),
-                "provenance_message_id": str(message_id)
-            })
-    
-    # Mark as modified for SQLAlchemy
-    from sqlalchemy.orm import attributes
-    attributes.flag_modified(profile, "medications")
-    attributes.flag_modified(profile, "symptoms")
-    attributes.flag_modified(profile, "allergies")
-    attributes.flag_modified(profile, "conditions")
+    # Apply facts as profile events (appended to the event log with provenance)
+    profile_uow.stage(facts_to_events(extracted_facts, message_id))
     
-    await db.flush()
+    if standalone:
+        await profile_uow.commit(db)
     
     return state
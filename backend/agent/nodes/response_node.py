@@ -1,10 +1,6 @@
-import google.generativeai as genai
 from backend.agent.state import AgentState
-from backend.config import get_settings
-import json
-
-settings = get_settings()
-genai.configure(api_key=settings.google_api_key)
+from backend.services.profile_digest import build_digest
+from backend.services.llm import llm
 
 
 async def response_node(state: AgentState) -> AgentState:
@@ -16,46 +12,20 @@ async def response_node(state: AgentState) -> AgentState:
         return state
     
     message = state["redacted_message"]
-    profile = state.get("patient_profile")
     risk_assessment = state.get("risk_assessment", {})
     
-    # Build context from patient profile
-    context_parts = []
-    if profile:
-        if profile.get("medications"):
-            meds_list = [m["name"] for m in profile["medications"] if isinstance(m, dict) and "name" in m]
-            if meds_list:
-                context_parts.append(f"Current medications: {', '.join(meds_list)}")
-                
-        if profile.get("conditions"):
-             # Conditions might be strings or dicts depending on implementation, handle both
-            conds_list = []
-            for c in profile["conditions"]:
-                if isinstance(c, dict) and "name" in c:
-                    conds_list.append(c["name"])
-                elif isinstance(c, str):
-                    conds_list.append(c)
-            if conds_list:
-                context_parts.append(f"Known conditions: {', '.join(conds_list)}")
-                
-        if profile.get("allergies"):
-            allg_list = []
-            for a in profile["allergies"]:
-                if isinstance(a, dict) and "name" in a:
-                    allg_list.append(a["name"])
-                elif isinstance(a, str):
-                    allg_list.append(a)
-            if allg_list:
-                context_parts.append(f"Allergies: {', '.join(allg_list)}")
-    
-    context = "\n".join(context_parts) if context_parts else "No prior medical history available."
+    # Patient context is precomputed with the profile (no per-turn profile walk)
+    profile_context = state.get("profile_context") or build_digest(state.get("patient_profile") or {})
+    context = profile_context["context"]
+    summary = state.get("conversation_summary")
+    summary_section = f"\nConversation So Far: {summary}\n" if summary else ""
     
     # Build prompt
     prompt = f"""You are a helpful medical AI assistant. Provide clear, empathetic guidance.
 
 Patient Context:
 {context}
-
+{summary_section}
 Patient Message: "{message}"
 
 Risk Assessment: {risk_assessment.get('risk_level', 'UNKNOWN')} risk
@@ -70,9 +40,7 @@ Guidelines:
 Provide your response:"""
     
     try:
-        model = genai.GenerativeModel(settings.gemini_model)
-        response = model.generate_content(prompt)
-        ai_response = response.text.strip()
+        ai_response = (await llm.generate("response", prompt)).strip()
         
         # Add disclaimer for medium risk
         if risk_assessment.get("risk_level") == "MEDIUM":
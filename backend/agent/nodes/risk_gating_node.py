@@ -8,8 +8,12 @@ async def risk_gating_node(state: AgentState) -> AgentState:
     """
     redacted_message = state["redacted_message"]
     
-    # Assess risk
-    risk_assessment = await risk_assessment_service.assess_risk(redacted_message)
+    # Assess risk (with the bounded rolling summary as multi-turn context)
+    risk_assessment = await risk_assessment_service.assess_risk(
+        redacted_message,
+        conversation_context=state.get("conversation_summary"),
+        scope=state["conversation_id"]
+    )
     
     # Update state
     state["risk_assessment"] = risk_assessment
@@ -8,6 +8,7 @@ class AgentState(TypedDict):
     conversation_id: str
     patient_id: str
     raw_message: str
+    conversation_summary: Optional[str]  # Rolling summary of earlier turns (bounded size)
     
     # Redaction
     redacted_message: str
@@ -18,6 +19,7 @@ class AgentState(TypedDict):
     
     # Patient Profile
     patient_profile: Optional[Dict]  # Current patient profile
+    profile_context: Optional[Dict]  # Precomputed prompt digest of the profile (context/block strings)
     extracted_facts: Optional[List[Dict]]  # New facts extracted from message
     
     # Response
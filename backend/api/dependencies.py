@@ -0,0 +1,42 @@
+"""
+Authentication dependencies shared by the API routers
+
+The caller is identified by the Bearer token issued at /auth/login. The
+token is verified in-process (see backend/services/tokens.py), so these
+dependencies never query the users table. A missing Authorization header is
+rejected with 403 by HTTPBearer; an invalid or expired token gets 401.
+"""
+import uuid
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from backend.models.user import UserRole
+from backend.services.tokens import InvalidToken, SessionUser, token_service
+
+bearer_scheme = HTTPBearer()
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+) -> SessionUser:
+    """Verified caller identity from the Bearer token"""
+    try:
+        return token_service.verify(credentials.credentials)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=401,
+            detail=f"Invalid session: {e}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+async def require_clinician(user: SessionUser = Depends(get_current_user)) -> SessionUser:
+    """Only clinicians may use the triage endpoints"""
+    if user.role != UserRole.CLINICIAN:
+        raise HTTPException(status_code=403, detail="Clinician access required")
+    return user
+
+
+def ensure_patient_access(user: SessionUser, patient_id: uuid.UUID) -> None:
+    """Patients may only see their own data; clinicians may see any patient's"""
+    if user.role != UserRole.CLINICIAN and user.user_id != patient_id:
+        raise HTTPException(status_code=403, detail="Not allowed to access this patient's data")
@@ -1,11 +1,20 @@
+import math
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from backend.config import get_settings
 from backend.database import get_db
+from backend.api.dependencies import get_current_user, ensure_patient_access
 from backend.models.user import User, UserRole
+from backend.services.metrics import metrics
+from backend.services.passwords import password_hasher
+from backend.services.rate_limit import login_limiter
+from backend.services.tokens import RevocationListFull, SessionUser, token_service
 import uuid
 
+settings = get_settings()
+
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
@@ -20,13 +29,29 @@ class LoginResponse(BaseModel):
     username: str
     name: str
     role: str
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
 
 
 @router.post("/login", response_model=LoginResponse)
 async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user with username and password
+    
+    Attempts are rate limited per username (429 + Retry-After) before any
+    database or bcrypt work; the bcrypt check runs off the event loop.
     """
+    if settings.login_rate_limit_burst > 0:
+        retry_after = login_limiter.acquire(request.username.strip().lower())
+        if retry_after > 0:
+            metrics.incr("auth_login_rate_limited")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many login attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    
     # Find user by username
     result = await db.execute(
         select(User).where(User.username == request.username)
@@ -37,22 +62,47 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     # Verify password
-    if not user.check_password(request.password):
+    if not await password_hasher.verify(request.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
     return LoginResponse(
         user_id=str(user.id),
         username=user.username,
         name=user.name,
-        role=user.role.value
+        role=user.role.value,
+        access_token=token_service.issue(user.id, user.role),
+        expires_in=token_service.ttl_seconds
     )
 
 
+@router.post("/logout")
+async def logout(current_user: SessionUser = Depends(get_current_user)):
+    """
+    Revoke the caller's session token
+    
+    Revocation is recorded in the worker that handles the request only; other
+    workers accept the token until it expires (session_token_ttl_minutes).
+    """
+    try:
+        token_service.revoke(current_user)
+    except RevocationListFull:
+        metrics.incr("auth_logout_refused")
+        raise HTTPException(status_code=503, detail="Logout could not be recorded, please try again shortly")
+    return {"message": "Logged out"}
+
+
 @router.get("/users/{user_id}")
-async def get_user(user_id: str, db: AsyncSession = Depends(get_db)):
-    """Get user by ID"""
+async def get_user(
+    user_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
+):
+    """Get user by ID (yourself, or anyone for clinicians)"""
+    user_uuid = uuid.UUID(user_id)
+    ensure_patient_access(current_user, user_uuid)
+    
     result = await db.execute(
-        select(User).where(User.id == uuid.UUID(user_id))
+        select(User).where(User.id == user_uuid)
     )
     user = result.scalar_one_or_none()
     
@@ -1,22 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+import math
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from backend.database import get_db
+from backend.config import get_settings
+from backend.database import get_db, session_scope
+from backend.api.dependencies import get_current_user, ensure_patient_access
 from backend.models.conversation import Conversation, ConversationStatus
-from backend.models.message import Message, SenderType, RiskLevel
-from backend.models.user import User
+from backend.models.message import Message, SenderType, RiskLevel, RiskSource
+from backend.models.user import User, UserRole
 from backend.agent.graph import MedicalAgentGraph
 from backend.agent.state import AgentState
+from backend.services.agent_jobs import URGENT, AgentJob, QueueFull, agent_jobs
 from backend.services.audit import audit_service
-from typing import List
+from backend.services.patient_lock import patient_locks
+from backend.services.conversation_summary import conversation_summary_service
+from backend.services.message_coalescer import message_coalescer
+from backend.services.metrics import metrics
+from backend.services.rate_limit import message_limiter
+from backend.services.redaction import redaction_service
+from backend.services.risk_assessment import risk_assessment_service
+from backend.services.tokens import SessionUser
+from typing import List, Optional
 import uuid
 
+settings = get_settings()
+
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
 
 
 class CreateConversationRequest(BaseModel):
-    patient_id: str
+    patient_id: Optional[str] = None  # Defaults to the caller
 
 
 class SendMessageRequest(BaseModel):
@@ -41,10 +56,12 @@ class ConversationResponse(BaseModel):
 @router.get("/patient/{patient_id}/latest", response_model=dict)
 async def get_latest_conversation(
     patient_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
 ):
     """Get patient's most recent active or escalated conversation"""
     patient_uuid = uuid.UUID(patient_id)
+    ensure_patient_access(current_user, patient_uuid)
     
     # Get most recent conversation that's not closed
     result = await db.execute(
@@ -72,18 +89,21 @@ async def get_latest_conversation(
 @router.post("", response_model=dict)
 async def create_conversation(
     request: CreateConversationRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
 ):
     """Create a new conversation"""
-    patient_id = uuid.UUID(request.patient_id)
+    patient_id = uuid.UUID(request.patient_id) if request.patient_id else current_user.user_id
+    ensure_patient_access(current_user, patient_id)
     
-    # Verify patient exists
-    result = await db.execute(
-        select(User).where(User.id == patient_id)
-    )
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="Patient not found")
+    # A patient's own id comes from a signed token; only clinicians opening a
+    # conversation for someone else need the existence check
+    if patient_id != current_user.user_id:
+        result = await db.execute(
+            select(User).where(User.id == patient_id, User.role == UserRole.PATIENT)
+        )
+        if not result.scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Patient not found")
     
     # Create conversation
     conversation = Conversation(patient_id=patient_id)
@@ -101,7 +121,8 @@ async def create_conversation(
 @router.get("/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
 ):
     """Get conversation with all messages"""
     conv_id = uuid.UUID(conversation_id)
@@ -113,11 +134,12 @@ async def get_conversation(
     conversation = result.scalar_one_or_none()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    ensure_patient_access(current_user, conversation.patient_id)
     
-    # Get messages
+    # Get messages (the created_at bound lets Postgres skip older monthly partitions)
     result = await db.execute(
         select(Message)
-        .where(Message.conversation_id == conv_id)
+        .where(Message.conversation_id == conv_id, Message.created_at >= conversation.created_at)
         .order_by(Message.created_at)
     )
     messages = result.scalars().all()
@@ -143,7 +165,9 @@ async def get_conversation(
 async def send_message(
     conversation_id: str,
     request: SendMessageRequest,
-    db: AsyncSession = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
 ):
     """
     Send a message and trigger the agent workflow
@@ -158,12 +182,36 @@ async def send_message(
     conversation = result.scalar_one_or_none()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
+    if conversation.patient_id != current_user.user_id:
+        # Clinicians reply through /escalations/{id}/respond
+        raise HTTPException(status_code=403, detail="Only the patient can send messages in this conversation")
+    
+    # Rate limit per conversation and per patient to protect the shared LLM quota.
+    # Messages with HIGH-risk keywords always go through so they can escalate.
+    high_risk_keyword = risk_assessment_service.keyword_risk_level(request.content) == "HIGH"
+    if high_risk_keyword:
+        metrics.incr("messages_rate_limit_bypassed_high_risk")
+    else:
+        retry_after = await message_limiter.acquire(str(conversation.patient_id), str(conv_id))
+        if retry_after > 0:
+            metrics.incr("messages_rate_limited")
+            raise HTTPException(
+                status_code=429,
+                detail="You are sending messages too quickly. If this is an emergency, contact emergency services now.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    
+    coalescing = settings.message_coalesce_window_ms > 0
+    redacted_content = None
+    if coalescing:
+        # Redacted up front: the stored text must not hold raw PHI while the message waits for its batch
+        redacted_content, _ = redaction_service.redact_text(request.content)
     
     # Create patient message
     patient_message = Message(
         conversation_id=conv_id,
         sender_type=SenderType.PATIENT,
-        content=request.content,  # Will be redacted by agent
+        content=redacted_content or request.content,  # Redacted by the agent unless already done above
         risk_level=RiskLevel.UNKNOWN
     )
     db.add(patient_message)
@@ -182,67 +230,50 @@ async def send_message(
     # COMMIT USER MESSAGE FIRST -> ensures visibility even if agent crashes
     await db.commit()
     
-    # Run agent workflow
-    initial_state: AgentState = {
-        "conversation_id": str(conv_id),
-        "patient_id": str(conversation.patient_id),
-        "raw_message": request.content,
-        "redacted_message": "",
-        "phi_detected": False,
-        "risk_assessment": None,
-        "patient_profile": None,
-        "extracted_facts": None,
-        "response": None,
-        "should_escalate": False,
-        "escalation_ticket_id": None,
-        "error": None
+    turn = {
+        "conversation_id": conv_id,
+        "patient_id": conversation.patient_id,
+        "summary": conversation_summary_service.get(conversation)
     }
+    message_ref = (patient_message.id, patient_message.created_at, redacted_content, request.content)
+    
+    if settings.agent_async_mode:
+        # Don't hold this connection (or a DB session) for the agent run: queue it and answer 202
+        try:
+            job = agent_jobs.submit(
+                conversation.patient_id,
+                conv_id,
+                lambda job: _reply_job(job, turn, message_ref, high_risk_keyword),
+                priority=URGENT if high_risk_keyword else 1
+            )
+        except QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many messages are being processed, please retry shortly",
+                headers={"Retry-After": "5"}
+            )
+        return JSONResponse(status_code=202, content={
+            "patient_message_id": str(patient_message.id),
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/v1/conversations/jobs/{job.id}"
+        })
     
     try:
-        agent = MedicalAgentGraph(db=db, message_id=patient_message.id)
-        final_state = await agent.run(initial_state)
-        
-        # We need to re-fetch or merge patient_message because session was committed
-        # But actually in asyncpg/SQLAlchemy it might be detached.
-        # Let's just query it or update it directly.
-        # However, since we are in the SAME session context, we can just use `db.merge(patient_message)` if needed,
-        # but typically we can just update the object if it's still attached.
-        # After commit, objects expire. We need to refresh/merge.
-        # But easier to just update via execute or re-fetch.
-        
-        # Re-fetch for safety
-        result = await db.execute(select(Message).where(Message.id == patient_message.id))
-        patient_message = result.scalar_one()
-
-        # Update patient message with redacted content and risk level
-        patient_message.content = final_state.get("redacted_message", request.content)
-        
-        if final_state.get("risk_assessment"):
-            risk_level_str = final_state["risk_assessment"].get("risk_level", "UNKNOWN").upper()
-            if risk_level_str in RiskLevel.__members__:
-                patient_message.risk_level = RiskLevel[risk_level_str]
-            else:
-                patient_message.risk_level = RiskLevel.UNKNOWN
+        # The commit above returned this session's connection to the pool; the
+        # agent run checks connections out only around its own reads and writes
+        final_state, replies = await _process(turn, message_ref, high_risk_keyword)
         
-        # Create AI response message
-        if final_state.get("response"):
-            ai_message = Message(
-                conversation_id=conv_id,
-                sender_type=SenderType.AI,
-                content=final_state["response"],
-                risk_level=RiskLevel.LOW
+        if replies:
+            # Fold this turn into the rolling summary after the response is sent
+            background_tasks.add_task(
+                conversation_summary_service.refresh,
+                conv_id,
+                final_state.get("redacted_message", ""),
+                final_state.get("response")
             )
-            db.add(ai_message)
-            
-        await db.commit()
         
-        return {
-            "patient_message_id": str(patient_message.id),
-            "response": final_state.get("response"),
-            "escalated": final_state.get("should_escalate", False),
-            "escalation_ticket_id": final_state.get("escalation_ticket_id"),
-            "risk_level": final_state.get("risk_assessment", {}).get("risk_level", "UNKNOWN")
-        }
+        return _reply_body(patient_message.id, final_state, replies)
         
     except Exception as e:
         import traceback
@@ -258,3 +289,157 @@ async def send_message(
             pass
             
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_message_job(
+    job_id: str,
+    current_user: SessionUser = Depends(get_current_user)
+):
+    """Status of an asynchronous message job (`result` holds the send_message reply once done)"""
+    job = agent_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    ensure_patient_access(current_user, job.owner_id)
+    return job.to_dict()
+
+
+def _reply_body(message_id: uuid.UUID, final_state: AgentState, replies: bool) -> dict:
+    """send_message response; an earlier message of a coalesced batch gets no reply text"""
+    body = {
+        "patient_message_id": str(message_id),
+        "response": final_state.get("response") if replies else None,
+        "escalated": final_state.get("should_escalate", False),
+        "escalation_ticket_id": final_state.get("escalation_ticket_id"),
+        "risk_level": (final_state.get("risk_assessment") or {}).get("risk_level", "UNKNOWN")
+    }
+    if not replies:
+        body["coalesced"] = True
+    return body
+
+
+async def _process(turn: dict, message_ref: tuple, high_risk_keyword: bool):
+    """
+    Run the agent for one stored patient message
+    
+    Returns:
+        (final_state, replies): replies is False when the message was folded into a
+        coalesced batch whose reply belongs to a later message
+    """
+    if settings.message_coalesce_window_ms > 0:
+        # Rapid follow-ups share one agent run; a HIGH-risk keyword runs the batch now
+        batch, final_state = await message_coalescer.submit(
+            str(turn["conversation_id"]),
+            message_ref,
+            lambda items: process_patient_message(turn, items),
+            immediate=high_risk_keyword
+        )
+        if batch[-1][0] != message_ref[0]:
+            return final_state, False
+        metrics.incr("agent_runs_saved_by_coalescing", len(batch) - 1)
+        return final_state, True
+    
+    return await process_patient_message(turn, [message_ref]), True
+
+
+async def _reply_job(job: AgentJob, turn: dict, message_ref: tuple, high_risk_keyword: bool) -> None:
+    """Queued agent run (agent_async_mode); publishes the reply, then refreshes the summary"""
+    final_state, replies = await _process(turn, message_ref, high_risk_keyword)
+    job.finish(_reply_body(message_ref[0], final_state, replies))
+    if replies:
+        await conversation_summary_service.refresh(
+            turn["conversation_id"],
+            final_state.get("redacted_message", ""),
+            final_state.get("response")
+        )
+
+
+async def process_patient_message(turn: dict, messages: list) -> AgentState:
+    """
+    Run the agent once over one or more patient messages and store the outcome
+    
+    Uses its own short-lived sessions (no connection is held while the LLM
+    runs), so it also serves runs that outlive the request that stored the
+    messages (coalesced batches, queued jobs).
+    
+    Args:
+        turn: conversation_id, patient_id and the rolling summary
+        messages: (id, created_at, redacted content or None, raw content) per patient
+            message, oldest first; the agent sees their raw texts joined
+    """
+    raw_text = "\n".join(message[3] for message in messages)
+    initial_state: AgentState = {
+        "conversation_id": str(turn["conversation_id"]),
+        "patient_id": str(turn["patient_id"]),
+        "raw_message": raw_text,
+        "conversation_summary": turn["summary"],
+        "redacted_message": "",
+        "phi_detected": False,
+        "risk_assessment": None,
+        "patient_profile": None,
+        "profile_context": None,
+        "extracted_facts": None,
+        "response": None,
+        "should_escalate": False,
+        "escalation_ticket_id": None,
+        "error": None
+    }
+    
+    # One agent run per patient at a time: concurrent runs would both read the
+    # profile and the last commit would silently drop the other's facts
+    async with patient_locks.hold(str(turn["patient_id"])):
+        agent = MedicalAgentGraph(message_id=messages[-1][0])
+        final_state = await agent.run(initial_state)
+        
+        risk_level, risk_source = None, None
+        if final_state.get("risk_assessment"):
+            risk_level_str = final_state["risk_assessment"].get("risk_level", "UNKNOWN").upper()
+            risk_level = RiskLevel[risk_level_str] if risk_level_str in RiskLevel.__members__ else RiskLevel.UNKNOWN
+            # A coalesced batch was assessed as one text, so no single message has its own label
+            source = final_state["risk_assessment"].get("source")
+            if len(messages) > 1:
+                risk_source = RiskSource.COALESCED
+            elif source in RiskSource.__members__:
+                risk_source = RiskSource[source]
+        
+        async with session_scope() as db:
+            message_ids = [message[0] for message in messages]
+            # Coalesced items can arrive out of created_at order
+            created_at = [message[1] for message in messages]
+            result = await db.execute(
+                select(Message).where(
+                    Message.id.in_(message_ids),
+                    Message.created_at.between(min(created_at), max(created_at))  # Partition pruning
+                )
+            )
+            stored = {message.id: message for message in result.scalars().all()}
+
+            missing = [message_id for message_id in message_ids if message_id not in stored]
+            if missing:
+                # The stored timestamp can differ from the submitted one; look up by id alone
+                result = await db.execute(select(Message).where(Message.id.in_(missing)))
+                stored.update({message.id: message for message in result.scalars().all()})
+
+            # Update patient messages with redacted content and risk level
+            for message_id, _, redacted_content, raw_content in messages:
+                patient_message = stored.get(message_id)
+                if patient_message is None:
+                    print(f"Warning: message {message_id} not found, skipping its agent update")
+                    continue
+                patient_message.content = redacted_content or final_state.get("redacted_message", raw_content)
+                if risk_level is not None:
+                    patient_message.risk_level = risk_level
+                    patient_message.risk_source = risk_source
+            
+            # Create AI response message
+            if final_state.get("response"):
+                ai_message = Message(
+                    conversation_id=turn["conversation_id"],
+                    sender_type=SenderType.AI,
+                    content=final_state["response"],
+                    risk_level=RiskLevel.LOW
+                )
+                db.add(ai_message)
+    
+    return final_state
+
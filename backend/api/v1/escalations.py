@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from backend.database import get_db
+from backend.api.dependencies import require_clinician
 from backend.models.escalation import EscalationTicket, EscalationStatus
 from backend.models.message import Message, SenderType, RiskLevel
 from backend.models.user import User
+from backend.services.clinician_assignment import adjust_load, set_availability, update_ticket
+from backend.services.escalation_dispatch import escalation_dispatcher, OPEN_STATUSES
+from backend.services.metrics import metrics
+from backend.services.tokens import SessionUser
 from typing import List, Optional
 import uuid
 
@@ -23,62 +28,144 @@ class EscalationResponse(BaseModel):
     status: str
     created_at: str
     assigned_clinician_id: Optional[str]
+    follow_ups: List[dict] = []  # Later escalating messages in the same conversation, oldest first
+
+
+def _to_response(ticket: EscalationTicket, patient_name: str) -> EscalationResponse:
+    return EscalationResponse(
+        id=str(ticket.id),
+        conversation_id=str(ticket.conversation_id),
+        patient_id=str(ticket.patient_id),
+        patient_name=patient_name,
+        reason=ticket.reason,
+        risk_level=ticket.risk_level,
+        clinical_summary=ticket.clinical_summary,
+        status=ticket.status.value,
+        created_at=ticket.created_at.isoformat(),
+        assigned_clinician_id=str(ticket.assigned_clinician_id) if ticket.assigned_clinician_id else None,
+        follow_ups=ticket.follow_ups or []
+    )
+
+
+async def _with_patient_names(db: AsyncSession, tickets: List[EscalationTicket]) -> List[EscalationResponse]:
+    """Responses for tickets, with all patient names fetched in one query"""
+    patient_ids = {ticket.patient_id for ticket in tickets}
+    names = {}
+    if patient_ids:
+        result = await db.execute(select(User.id, User.name).where(User.id.in_(patient_ids)))
+        names = dict(result.all())
+    return [_to_response(ticket, names.get(ticket.patient_id, "Unknown")) for ticket in tickets]
+
+
+async def _open_tickets_by_priority(db: AsyncSession) -> List[EscalationTicket]:
+    """Open tickets in dispatcher order (risk level, SLA deadline, age); stale entries are dropped"""
+    await escalation_dispatcher.catch_up(db)
+    ticket_ids = escalation_dispatcher.ordered()
+    if not ticket_ids:
+        return []
+    result = await db.execute(select(EscalationTicket).where(EscalationTicket.id.in_(ticket_ids)))
+    by_id = {ticket.id: ticket for ticket in result.scalars().all()}
+    
+    tickets = []
+    for ticket_id in ticket_ids:
+        ticket = by_id.get(ticket_id)
+        if ticket is None or ticket.status not in OPEN_STATUSES:
+            escalation_dispatcher.discard(ticket_id)  # Resolved or removed by another worker
+            continue
+        escalation_dispatcher.track(ticket)
+        tickets.append(ticket)
+    return tickets
+
+
+class AvailabilityRequest(BaseModel):
+    available: bool
+    max_open_tickets: Optional[int] = None  # Cap on auto-assigned open tickets (default: server setting)
 
 
 class ClinicianResponseRequest(BaseModel):
-    clinician_id: str
     response_text: str
+    clinician_id: Optional[str] = None  # Deprecated: the clinician is taken from the session token
 
 
 @router.get("", response_model=List[EscalationResponse])
 async def list_escalations(
     status: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
 ):
-    """List escalation tickets (for clinician dashboard)"""
-    query = select(EscalationTicket)
+    """
+    List escalation tickets (for clinician dashboard)
     
-    if status:
-        query = query.where(EscalationTicket.status == EscalationStatus[status.upper()])
-    else:
-        # Default: show pending and in-progress
-        query = query.where(
-            EscalationTicket.status.in_([EscalationStatus.PENDING, EscalationStatus.IN_PROGRESS])
-        )
-    
-    query = query.order_by(EscalationTicket.created_at.desc())
+    The default view (pending and in-progress) comes from the escalation
+    dispatcher, most urgent first; a status filter lists newest first.
+    """
+    if not status:
+        tickets = await _open_tickets_by_priority(db)
+        return await _with_patient_names(db, tickets)
     
+    query = (
+        select(EscalationTicket)
+        .where(EscalationTicket.status == EscalationStatus[status.upper()])
+        .order_by(EscalationTicket.created_at.desc())
+    )
     result = await db.execute(query)
-    tickets = result.scalars().all()
-    
-    # Get patient names
-    responses = []
-    for ticket in tickets:
-        patient_result = await db.execute(
-            select(User).where(User.id == ticket.patient_id)
-        )
-        patient = patient_result.scalar_one_or_none()
+    return await _with_patient_names(db, result.scalars().all())
+
+
+@router.post("/next", response_model=EscalationResponse)
+async def claim_next_escalation(
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
+):
+    """
+    Start the most urgent pending ticket assigned to the calling clinician or to nobody
+    
+    Pops the dispatcher queue; the claim is a conditional update, so a ticket
+    taken in the meantime (by another worker or clinician) is skipped.
+    """
+    await escalation_dispatcher.catch_up(db)
+    clinician_id = current_user.user_id
+    
+    while True:
+        popped = escalation_dispatcher.pop(clinician_id)
+        if popped is None:
+            raise HTTPException(status_code=404, detail="No pending escalation tickets")
+        ticket_id, assignee = popped
+        
+        try:
+            result = await db.execute(
+                update(EscalationTicket)
+                .where(
+                    EscalationTicket.id == ticket_id,
+                    EscalationTicket.status == EscalationStatus.PENDING,
+                    EscalationTicket.assigned_clinician_id == assignee if assignee else EscalationTicket.assigned_clinician_id.is_(None)
+                )
+                .values(assigned_clinician_id=clinician_id, status=EscalationStatus.IN_PROGRESS)
+            )
+            if result.rowcount == 1 and assignee is None:
+                await adjust_load(db, clinician_id, 1)
+        except Exception:
+            escalation_dispatcher.invalidate()  # The popped ticket may still be pending
+            raise
+        if result.rowcount == 1:
+            break
         
-        responses.append(EscalationResponse(
-            id=str(ticket.id),
-            conversation_id=str(ticket.conversation_id),
-            patient_id=str(ticket.patient_id),
-            patient_name=patient.name if patient else "Unknown",
-            reason=ticket.reason,
-            risk_level=ticket.risk_level,
-            clinical_summary=ticket.clinical_summary,
-            status=ticket.status.value,
-            created_at=ticket.created_at.isoformat(),
-            assigned_clinician_id=str(ticket.assigned_clinician_id) if ticket.assigned_clinician_id else None
-        ))
-    
-    return responses
+        # Claimed, resolved or removed elsewhere; its status is refreshed on the next dashboard load
+        metrics.incr("escalation_claim_conflicts")
+    
+    await db.commit()
+    
+    result = await db.execute(select(EscalationTicket).where(EscalationTicket.id == ticket_id))
+    ticket = result.scalar_one()
+    escalation_dispatcher.track(ticket)
+    return (await _with_patient_names(db, [ticket]))[0]
 
 
 @router.get("/{ticket_id}", response_model=EscalationResponse)
 async def get_escalation(
     ticket_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
 ):
     """Get specific escalation ticket"""
     result = await db.execute(
@@ -95,29 +182,21 @@ async def get_escalation(
     )
     patient = patient_result.scalar_one_or_none()
     
-    return EscalationResponse(
-        id=str(ticket.id),
-        conversation_id=str(ticket.conversation_id),
-        patient_id=str(ticket.patient_id),
-        patient_name=patient.name if patient else "Unknown",
-        reason=ticket.reason,
-        risk_level=ticket.risk_level,
-        clinical_summary=ticket.clinical_summary,
-        status=ticket.status.value,
-        created_at=ticket.created_at.isoformat(),
-        assigned_clinician_id=str(ticket.assigned_clinician_id) if ticket.assigned_clinician_id else None
-    )
+    return _to_response(ticket, patient.name if patient else "Unknown")
 
 
 @router.post("/{ticket_id}/respond", response_model=dict)
 async def respond_to_escalation(
     ticket_id: str,
     request: ClinicianResponseRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
 ):
     """Clinician responds to escalation ticket"""
     ticket_uuid = uuid.UUID(ticket_id)
-    clinician_uuid = uuid.UUID(request.clinician_id)
+    clinician_uuid = current_user.user_id
+    if request.clinician_id and uuid.UUID(request.clinician_id) != clinician_uuid:
+        raise HTTPException(status_code=403, detail="Cannot respond on behalf of another clinician")
     
     # Get ticket
     result = await db.execute(
@@ -128,17 +207,8 @@ async def respond_to_escalation(
     if not ticket:
         raise HTTPException(status_code=404, detail="Escalation ticket not found")
     
-    # Verify clinician exists
-    clinician_result = await db.execute(
-        select(User).where(User.id == clinician_uuid)
-    )
-    clinician = clinician_result.scalar_one_or_none()
-    if not clinician:
-        raise HTTPException(status_code=404, detail="Clinician not found")
-    
-    # Update ticket
-    ticket.assigned_clinician_id = clinician_uuid
-    ticket.status = EscalationStatus.IN_PROGRESS
+    # Update ticket (the responding clinician takes it over)
+    await update_ticket(db, ticket, EscalationStatus.IN_PROGRESS, clinician_uuid)
     
     # Create clinician message in conversation
     clinician_message = Message(
@@ -150,6 +220,7 @@ async def respond_to_escalation(
     db.add(clinician_message)
     
     await db.commit()
+    escalation_dispatcher.track(ticket)
     
     return {
         "message": "Response sent successfully",
@@ -161,7 +232,8 @@ async def respond_to_escalation(
 async def update_escalation_status(
     ticket_id: str,
     status: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
 ):
     """Update escalation ticket status"""
     result = await db.execute(
@@ -172,12 +244,35 @@ async def update_escalation_status(
     if not ticket:
         raise HTTPException(status_code=404, detail="Escalation ticket not found")
     
-    ticket.status = EscalationStatus[status.upper()]
+    await update_ticket(db, ticket, EscalationStatus[status.upper()], ticket.assigned_clinician_id)
     
     if status.upper() == "RESOLVED":
         from datetime import datetime
         ticket.resolved_at = datetime.utcnow()
     
     await db.commit()
+    escalation_dispatcher.track(ticket)
     
     return {"message": "Status updated successfully"}
+
+
+@router.put("/availability", response_model=dict)
+async def update_availability(
+    request: AvailabilityRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(require_clinician)
+):
+    """
+    Set whether new escalations are assigned to the calling clinician
+    
+    Going unavailable returns their not-yet-started tickets to the shared queue.
+    """
+    released = await set_availability(db, current_user.user_id, request.available, request.max_open_tickets)
+    await db.commit()
+    
+    if released:
+        result = await db.execute(select(EscalationTicket).where(EscalationTicket.id.in_(released)))
+        for ticket in result.scalars().all():
+            escalation_dispatcher.track(ticket)
+    
+    return {"available": request.available, "released_tickets": len(released)}
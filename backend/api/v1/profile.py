@@ -3,9 +3,14 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from backend.database import get_db
+from backend.api.dependencies import get_current_user, ensure_patient_access
 from backend.models.patient_profile import PatientProfile
 from backend.models.user import User
-from typing import List, Dict
+from backend.services.profile_history import get_profile_as_of
+from backend.services.profile_store import profile_cache, profile_to_dict
+from backend.services.tokens import SessionUser
+from datetime import datetime
+from typing import List, Dict, Optional
 import uuid
 
 router = APIRouter(prefix="/profile", tags=["Patient Profile"])
@@ -24,10 +29,16 @@ class ProfileResponse(BaseModel):
 @router.get("/{patient_id}", response_model=ProfileResponse)
 async def get_patient_profile(
     patient_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
 ):
     """Get patient's living profile"""
     patient_uuid = uuid.UUID(patient_id)
+    ensure_patient_access(current_user, patient_uuid)
+    
+    cached = profile_cache.get(patient_uuid)
+    if cached is not None:
+        return ProfileResponse(**cached)
     
     # Get patient
     patient_result = await db.execute(
@@ -43,24 +54,47 @@ async def get_patient_profile(
     )
     profile = result.scalar_one_or_none()
     
-    if not profile:
-        # Return empty profile
-        return ProfileResponse(
-            patient_id=str(patient_uuid),
-            patient_name=patient.name,
-            medications=[],
-            symptoms=[],
-            allergies=[],
-            conditions=[],
-            last_updated=""
-        )
-    
-    return ProfileResponse(
+    response = ProfileResponse(
         patient_id=str(patient_uuid),
         patient_name=patient.name,
-        medications=profile.medications or [],
-        symptoms=profile.symptoms or [],
-        allergies=profile.allergies or [],
-        conditions=profile.conditions or [],
-        last_updated=profile.last_updated.isoformat()
+        last_updated=profile.last_updated.isoformat() if profile else "",
+        **profile_to_dict(profile)
+    )
+    profile_cache.put(patient_uuid, response.model_dump())
+    
+    return response
+
+
+class ProfileHistoryResponse(BaseModel):
+    patient_id: str
+    as_of: str
+    version: int
+    medications: List[Dict]
+    symptoms: List[Dict]
+    allergies: List[Dict]
+    conditions: List[Dict]
+
+
+@router.get("/{patient_id}/history", response_model=ProfileHistoryResponse)
+async def get_patient_profile_history(
+    patient_id: str,
+    as_of: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: SessionUser = Depends(get_current_user)
+):
+    """Reconstruct patient's profile as of a point in time (snapshot + event replay)"""
+    patient_uuid = uuid.UUID(patient_id)
+    ensure_patient_access(current_user, patient_uuid)
+    as_of = as_of or datetime.utcnow()
+    
+    state = await get_profile_as_of(db, patient_uuid, as_of)
+    
+    return ProfileHistoryResponse(
+        patient_id=str(patient_uuid),
+        as_of=as_of.isoformat(),
+        version=state["version"],
+        medications=state["medications"],
+        symptoms=state["symptoms"],
+        allergies=state["allergies"],
+        conditions=state["conditions"]
     )
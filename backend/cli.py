@@ -0,0 +1,56 @@
+"""
+One-off database commands (run once per deploy, not in every worker)
+
+Run:
+    python -m backend.cli migrate   # alembic upgrade head, then create the current and upcoming partitions
+    python -m backend.cli seed      # test users
+    python -m backend.cli setup     # migrate, then seed
+"""
+import argparse
+import asyncio
+import os
+from alembic import command
+from alembic.config import Config
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate(revision: str = "head") -> None:
+    """Apply alembic migrations up to `revision`"""
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT_DIR, "migrations"))
+    command.upgrade(config, revision)
+    print(f"[OK] Database migrated to {revision}")
+
+
+def partitions() -> None:
+    """Create the monthly partitions for this month and the next partition_months_ahead"""
+    from backend.database import engine
+    from backend.services.partitions import ensure_partitions
+
+    async def run():
+        async with engine.begin() as conn:
+            return await ensure_partitions(conn)
+
+    names = asyncio.run(run())
+    print(f"[OK] {len(names)} partitions in place")
+
+
+def seed() -> None:
+    """Create the development/test user accounts"""
+    from backend.init_test_users import init_test_users
+
+    asyncio.run(init_test_users())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database setup commands")
+    parser.add_argument("command", choices=["migrate", "seed", "setup"])
+    parser.add_argument("--revision", default="head", help="Target revision for migrate")
+    args = parser.parse_args()
+
+    if args.command in ("migrate", "setup"):
+        migrate(args.revision)
+        partitions()
+    if args.command in ("seed", "setup"):
+        seed()
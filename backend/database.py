@@ -1,6 +1,11 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from backend.config import get_settings
+from backend.services.metrics import metrics
 
 settings = get_settings()
 
@@ -8,7 +13,9 @@ settings = get_settings()
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
-    future=True
+    future=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow
 )
 
 # Create async session factory
@@ -21,6 +28,30 @@ AsyncSessionLocal = async_sessionmaker(
 # Export for use in init_test_users.py
 async_session_maker = AsyncSessionLocal
 
+
+class PoolOccupancy:
+    """Connections currently checked out of the pool, and the peak since startup"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.peak = 0
+
+    def checkout(self, *args) -> None:
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+        metrics.set_gauge("db_pool_checked_out", self.checked_out)
+        metrics.set_gauge("db_pool_checked_out_peak", self.peak)
+
+    def checkin(self, *args) -> None:
+        self.checked_out = max(0, self.checked_out - 1)
+        metrics.set_gauge("db_pool_checked_out", self.checked_out)
+
+
+# Singleton instance
+pool_occupancy = PoolOccupancy()
+event.listen(engine.sync_engine.pool, "checkout", pool_occupancy.checkout)
+event.listen(engine.sync_engine.pool, "checkin", pool_occupancy.checkin)
+
 # Base class for models
 Base = declarative_base()
 
@@ -38,10 +69,46 @@ async def get_db():
             await session.close()
 
 
+@asynccontextmanager
+async def session_scope(db: Optional[AsyncSession] = None):
+    """
+    Short-lived session for one read or write, committed on exit
+    
+    When the caller passes its own session it is used as-is and the caller
+    keeps ownership of the transaction.
+    """
+    if db is not None:
+        yield db
+        return
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def warm_pool(connections: int):
+    """Open `connections` pooled connections up front so the first requests skip the connect handshake"""
+    async def _connect():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    
+    await asyncio.gather(*[_connect() for _ in range(connections)])
+
+
 async def init_db():
-    """Initialize database - create all tables"""
+    """
+    Create all tables and seed test users (reset_db.py / local scripts only)
+    
+    Deployed databases are managed by alembic: `python -m backend.cli setup`
+    """
+    from backend.services.partitions import ensure_partitions
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_partitions(conn)
     
     # Initialize test users
     try:
@@ -24,26 +24,27 @@ async def init_test_users():
     ]
     
     async with async_session_maker() as db:
+        # One round trip for all existing usernames; bcrypt only runs for missing users
+        result = await db.execute(
+            select(User.username).where(User.username.in_([user_data["username"] for user_data in test_users]))
+        )
+        existing_usernames = set(result.scalars().all())
+        
         for user_data in test_users:
-            # Check if user already exists
-            result = await db.execute(
-                select(User).where(User.username == user_data["username"])
-            )
-            existing_user = result.scalar_one_or_none()
-            
-            if not existing_user:
-                # Create new user
-                user = User(
-                    username=user_data["username"],
-                    name=user_data["name"],
-                    role=user_data["role"],
-                    email=f"{user_data['username']}@test.com"
-                )
-                user.set_password(user_data["password"])
-                db.add(user)
-                print(f"[OK] Created test user: {user_data['username']} ({user_data['role'].value})")
-            else:
+            if user_data["username"] in existing_usernames:
                 print(f"[SKIP] User already exists: {user_data['username']}")
+                continue
+            
+            # Create new user
+            user = User(
+                username=user_data["username"],
+                name=user_data["name"],
+                role=user_data["role"],
+                email=f"{user_data['username']}@test.com"
+            )
+            user.set_password(user_data["password"])
+            db.add(user)
+            print(f"[OK] Created test user: {user_data['username']} ({user_data['role'].value})")
         
         await db.commit()
     
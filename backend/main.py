@@ -1,8 +1,19 @@
+import asyncio
+from typing import Set
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import init_db
+from backend.database import warm_pool
 from backend.api.v1 import auth, conversations, escalations, profile
 from backend.config import get_settings
+from backend.services.metrics import metrics
+from backend.services.agent_jobs import agent_jobs
+from backend.services.audit import audit_sink
+from backend.services.passwords import password_hasher
+from backend.services.audit_verify import seal_loop
+from backend.services.partitions import partition_maintenance_loop
+from backend.services.profile_compaction import compaction_loop
+from backend.services.escalation_dispatch import escalation_dispatcher, resync_loop
+from backend.services.escalation_coalescer import trailing_sbar_updates
 
 # Import all models so they're registered with Base.metadata
 from backend.models.user import User
@@ -10,6 +21,10 @@ from backend.models.conversation import Conversation
 from backend.models.message import Message
 from backend.models.patient_profile import PatientProfile
 from backend.models.escalation import EscalationTicket
+from backend.models.clinician_availability import ClinicianAvailability
+from backend.models.symptom_history import SymptomHistory
+from backend.models.profile_history import ProfileEvent, ProfileSnapshot
+from backend.models.audit_log import AuditLog, AuditChainHead, AuditSegment
 
 settings = get_settings()
 
@@ -28,6 +43,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Periodic loops started on startup; referenced here so they are not garbage collected, cancelled on shutdown
+background_tasks: Set[asyncio.Task] = set()
+
+
+def _background_done(task: asyncio.Task) -> None:
+    background_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"Error in background task {task.get_name()}: {error!r}")
+    else:
+        print(f"Warning: Background task {task.get_name()} stopped")
+
+
+def _start_background(name: str, coro) -> asyncio.Task:
+    """Run a periodic loop for the lifetime of the worker"""
+    task = asyncio.create_task(coro, name=name)
+    background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
 # Include API routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(conversations.router, prefix="/api/v1")
@@ -37,9 +75,59 @@ app.include_router(profile.router, prefix="/api/v1")
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
-    await init_db()
-    print("[OK] Database initialized")
+    """
+    Warm this worker's connection pool and start background tasks
+    
+    Schema and seed data are not touched here; run `python -m backend.cli setup` once per deploy.
+    """
+    try:
+        await warm_pool(settings.db_pool_warm_connections)
+        print("[OK] Database pool warmed")
+    except Exception as e:
+        print(f"Warning: Could not warm database pool: {e}")
+    
+    try:
+        open_tickets = await escalation_dispatcher.rebuild()
+        print(f"[OK] Escalation queue loaded ({open_tickets} open tickets)")
+    except Exception as e:
+        print(f"Warning: Could not load escalation queue (retried on first use): {e}")
+    
+    if settings.escalation_queue_resync_seconds > 0:
+        _start_background("escalation_resync", resync_loop(settings.escalation_queue_resync_seconds))
+        print("[OK] Escalation queue resync scheduled")
+    
+    if settings.audit_batching:
+        await audit_sink.start()
+        print("[OK] Audit sink started")
+    
+    if settings.agent_async_mode:
+        await agent_jobs.start()
+        print(f"[OK] Agent job workers started ({agent_jobs.workers})")
+    
+    if settings.profile_compaction_interval_seconds > 0:
+        _start_background("profile_compaction", compaction_loop(settings.profile_compaction_interval_seconds))
+        print("[OK] Profile compaction scheduled")
+    
+    if settings.audit_seal_interval_seconds > 0:
+        _start_background("audit_seal", seal_loop(settings.audit_seal_interval_seconds))
+        print("[OK] Audit segment sealing scheduled")
+    
+    if settings.partition_maintenance_interval_seconds > 0:
+        _start_background("partition_maintenance", partition_maintenance_loop(settings.partition_maintenance_interval_seconds))
+        print("[OK] Partition maintenance scheduled")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the periodic loops, drain queued agent jobs and audit events (spilled to disk if the database is unavailable), stop the bcrypt pool"""
+    tasks = list(background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await agent_jobs.stop(settings.agent_job_drain_seconds)
+    await trailing_sbar_updates.stop()
+    await audit_sink.stop()
+    password_hasher.shutdown()
 
 
 @app.get("/")
@@ -62,6 +150,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process operational metrics (counters and gauges, no PHI)"""
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
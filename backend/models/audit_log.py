@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -9,6 +9,9 @@ from backend.database import Base
 class AuditLog(Base):
     """Audit log for compliance - metadata only, NO PHI"""
     __tablename__ = "audit_logs"
+    # Monthly range partitions (see backend/services/partitions.py); the
+    # partition key has to be part of the primary key
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
@@ -19,7 +22,43 @@ class AuditLog(Base):
     
     metadata_hash = Column(String, nullable=False)  # SHA-256 hash of content
     
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Hash chain: entry_hash = SHA-256(prev_hash + canonical row), seq is gapless
+    # (unique per chain lock; a partitioned table cannot enforce it on seq alone)
+    seq = Column(BigInteger, nullable=True, index=True)  # NULL only for rows written before chaining
+    prev_hash = Column(String(64), nullable=True)
+    entry_hash = Column(String(64), nullable=True)
+    
+    timestamp = Column(DateTime, default=datetime.utcnow, primary_key=True, index=True)
     
     def __repr__(self):
         return f"<AuditLog(action={self.action}, user_id={self.user_id}, timestamp={self.timestamp})>"
+
+
+class AuditChainHead(Base):
+    """Single-row pointer to the newest chained audit entry (avoids scanning every partition)"""
+    __tablename__ = "audit_chain_head"
+    
+    id = Column(Integer, primary_key=True, default=1)
+    seq = Column(BigInteger, nullable=False)
+    entry_hash = Column(String(64), nullable=False)
+
+
+class AuditSegment(Base):
+    """Merkle root over the chained audit entries of one time segment"""
+    __tablename__ = "audit_segments"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    start_seq = Column(BigInteger, nullable=False, unique=True)
+    end_seq = Column(BigInteger, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    
+    prev_hash = Column(String(64), nullable=False)  # entry_hash just before start_seq
+    last_entry_hash = Column(String(64), nullable=False)  # entry_hash at end_seq
+    merkle_root = Column(String(64), nullable=False)
+    
+    sealed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<AuditSegment(seq={self.start_seq}-{self.end_seq}, root={self.merkle_root[:12]})>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Boolean, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+from backend.database import Base
+
+
+class ClinicianAvailability(Base):
+    """A clinician's availability and open escalation load, used for automatic assignment"""
+    __tablename__ = "clinician_availability"
+    
+    clinician_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    available = Column(Boolean, default=False, nullable=False)
+    open_tickets = Column(Integer, default=0, nullable=False)  # Assigned tickets not yet resolved
+    max_open_tickets = Column(Integer, nullable=True)  # NULL = settings.escalation_max_open_per_clinician
+    last_assigned_at = Column(DateTime, nullable=True)  # Round-robin between equally loaded clinicians
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<ClinicianAvailability(clinician_id={self.clinician_id}, available={self.available}, open={self.open_tickets})>"
+
+
+# Assignment: least-loaded available clinician (assign_ticket)
+Index("ix_clinician_availability_load", ClinicianAvailability.available, ClinicianAvailability.open_tickets)
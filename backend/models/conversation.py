@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum as SQLEnum, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, Enum as SQLEnum, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -19,10 +19,24 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    patient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     status = Column(SQLEnum(ConversationStatus), default=ConversationStatus.ACTIVE, nullable=False)
+    
+    # Rolling summary of the conversation so far (bounded, see backend/services/conversation_summary.py)
+    rolling_summary = Column(Text, nullable=True)
+    summary_turns = Column(Integer, default=0, nullable=False)
+    
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     def __repr__(self):
         return f"<Conversation(id={self.id}, patient_id={self.patient_id}, status={self.status})>"
+
+
+# Latest open conversation per patient (get_latest_conversation); also serves patient_id lookups
+Index(
+    "ix_conversations_patient_status_updated",
+    Conversation.patient_id,
+    Conversation.status,
+    Conversation.updated_at.desc()
+)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Text, Enum as SQLEnum, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, Integer, Enum as SQLEnum, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
 import enum
@@ -27,6 +27,11 @@ class EscalationTicket(Base):
     risk_level = Column(String, nullable=False)
     clinical_summary = Column(Text, nullable=False)  # SBAR format summary
     
+    # Later escalating messages in the same conversation (see escalation_coalescer)
+    follow_ups = Column(JSONB, default=list, nullable=False)  # [{message, risk_level, reason, material, received_at}]
+    summarized_follow_ups = Column(Integer, default=0, nullable=False)  # Follow-ups covered by clinical_summary
+    summary_updated_at = Column(DateTime, nullable=True)  # Last SBAR (re)generation; NULL = created_at
+    
     status = Column(SQLEnum(EscalationStatus), default=EscalationStatus.PENDING, nullable=False)
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -34,3 +39,10 @@ class EscalationTicket(Base):
     
     def __repr__(self):
         return f"<EscalationTicket(id={self.id}, risk={self.risk_level}, status={self.status})>"
+
+
+# Clinician queue: filter by status, newest first (list_escalations)
+Index("ix_escalation_tickets_status_created", EscalationTicket.status, EscalationTicket.created_at.desc())
+
+# Per-clinician load and queue: open tickets assigned to a clinician (clinician_assignment)
+Index("ix_escalation_tickets_assigned_status", EscalationTicket.assigned_clinician_id, EscalationTicket.status)
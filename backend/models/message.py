@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Enum as SQLEnum, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Enum as SQLEnum, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -22,21 +22,39 @@ class RiskLevel(str, enum.Enum):
     UNKNOWN = "UNKNOWN"
 
 
+class RiskSource(str, enum.Enum):
+    """What produced a message's risk_level (the pre-classifier trains on LLM and KEYWORD labels only)"""
+    LLM = "LLM"  # Triage model
+    KEYWORD = "KEYWORD"  # Risk keywords (LLM unavailable, or a HIGH keyword overriding it)
+    FALLBACK = "FALLBACK"  # LLM unavailable and no keywords: LOW by default
+    CLASSIFIER = "CLASSIFIER"  # Local pre-classifier (clear-cut LOW)
+    CACHE = "CACHE"  # Reused from a near-duplicate message
+    COALESCED = "COALESCED"  # Assessed together with other messages of a coalesced batch
+
+
 class Message(Base):
     """Message model with voice-ready fields"""
     __tablename__ = "messages"
+    # Monthly range partitions (see backend/services/partitions.py); the
+    # partition key has to be part of the primary key
+    __table_args__ = (
+        # Conversation history in order (get_conversation); also serves conversation_id lookups
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False, index=True)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False)
     sender_type = Column(SQLEnum(SenderType), nullable=False)
     content = Column(Text, nullable=False)  # Redacted content
     risk_level = Column(SQLEnum(RiskLevel), default=RiskLevel.UNKNOWN)
+    risk_source = Column(SQLEnum(RiskSource), nullable=True)  # None until assessed
     
     # Voice-ready fields for future expansion
     audio_url = Column(String, nullable=True)  # S3 path for audio
     transcription_id = Column(UUID(as_uuid=True), nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, primary_key=True)
     
     def __repr__(self):
         return f"<Message(id={self.id}, sender={self.sender_type}, risk={self.risk_level})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from datetime import datetime
 import uuid
@@ -20,6 +20,12 @@ class PatientProfile(Base):
     allergies = Column(JSONB, default=list, nullable=False)
     conditions = Column(JSONB, default=list, nullable=False)
     
+    # Sequence of the last ProfileEvent applied (see backend/services/profile_history.py)
+    version = Column(Integer, default=0, nullable=False)
+    
+    # Precomputed prompt context for `version` (see backend/services/profile_digest.py)
+    context_digest = Column(JSONB, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
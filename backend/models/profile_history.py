@@ -0,0 +1,47 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+import uuid
+
+from backend.database import Base
+
+
+class ProfileEvent(Base):
+    """Append-only log of every change applied to a PatientProfile"""
+    __tablename__ = "profile_events"
+    __table_args__ = (
+        Index("ix_profile_events_patient_seq", "patient_id", "seq", unique=True),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    seq = Column(Integer, nullable=False)  # Per-patient sequence, matches PatientProfile.version after apply
+    
+    event_type = Column(String, nullable=False)  # e.g., "MEDICATION_ADDED", "SYMPTOMS_COMPACTED"
+    payload = Column(JSONB, nullable=False)
+    provenance_message_id = Column(UUID(as_uuid=True), nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<ProfileEvent(patient_id={self.patient_id}, seq={self.seq}, type={self.event_type})>"
+
+
+class ProfileSnapshot(Base):
+    """Full profile state at a given event sequence, written every N events"""
+    __tablename__ = "profile_snapshots"
+    __table_args__ = (
+        Index("ix_profile_snapshots_patient_version", "patient_id", "version"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False)  # Last event seq included in state
+    
+    # {"medications": [...], "symptoms": [...], "allergies": [...], "conditions": [...]}
+    state = Column(JSONB, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<ProfileSnapshot(patient_id={self.patient_id}, version={self.version})>"
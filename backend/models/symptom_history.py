@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+import uuid
+
+from backend.database import Base
+
+
+class SymptomHistory(Base):
+    """Archived raw symptom entries moved out of the active PatientProfile by compaction"""
+    __tablename__ = "symptom_history"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    patient_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    
+    # Original entry exactly as it was stored in PatientProfile.symptoms (keeps provenance_message_id)
+    entry = Column(JSONB, nullable=False)
+    archive_reason = Column(String, nullable=False)  # "RESOLVED", "DUPLICATE" or "WINDOW"
+    
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<SymptomHistory(patient_id={self.patient_id}, reason={self.archive_reason})>"
@@ -3,9 +3,9 @@ from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
 import enum
-import bcrypt
 
 from backend.database import Base
+from backend.services.passwords import hash_password_sync, verify_password_sync
 
 
 class UserRole(str, enum.Enum):
@@ -27,12 +27,12 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     def set_password(self, password: str):
-        """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set password (blocking; use password_hasher.hash on the event loop)"""
+        self.password_hash = hash_password_sync(password)
     
     def check_password(self, password: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Verify password against hash (blocking; use password_hasher.verify on the event loop)"""
+        return verify_password_sync(password, self.password_hash)
     
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username}, role={self.role})>"
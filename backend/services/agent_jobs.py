@@ -0,0 +1,188 @@
+"""
+In-process job queue for agent runs (async message mode)
+
+With agent_async_mode on, send_message stores the patient's message, submits
+the agent run here and returns 202 with a job id straight away. A fixed pool
+of worker tasks runs the jobs, so API throughput no longer depends on Gemini
+latency and requests do not hold a connection or DB session for the run.
+Clients poll GET /conversations/jobs/{job_id} for the result.
+
+Jobs carry a priority (lower runs first): messages with HIGH-risk keywords
+jump the queue. Finished jobs are kept for job_ttl_seconds so their result
+can be fetched.
+
+Jobs live in this worker process. On shutdown the queue is drained for up to
+drain_seconds. After that, HIGH-keyword jobs still run to completion, however
+long that takes; other queued jobs are dropped: their messages are already
+stored but keep risk_level UNKNOWN and get no reply. Dropped jobs are marked
+failed, counted in agent_jobs_dropped and their conversations logged.
+"""
+import asyncio
+import itertools
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from backend.config import get_settings
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+URGENT = 0  # Priority of jobs for messages with HIGH-risk keywords
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity"""
+
+
+class AgentJob:
+    """One queued agent run and its outcome"""
+
+    def __init__(self, owner_id: uuid.UUID, conversation_id: uuid.UUID, fn: Callable[["AgentJob"], Awaitable[Any]]):
+        self.id = str(uuid.uuid4())
+        self.owner_id = owner_id
+        self.conversation_id = conversation_id
+        self.fn = fn
+        self.status = "queued"  # queued -> running -> done | failed
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def finish(self, result: Any) -> None:
+        """Publish the result; the job function may keep running follow-up work afterwards"""
+        self.result = result
+        self.status = "done"
+        self.finished_at = time.time()
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.status = "failed"
+        self.finished_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "conversation_id": str(self.conversation_id),
+            "status": self.status,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class AgentJobQueue:
+    """Priority queue plus a fixed pool of worker tasks"""
+
+    def __init__(self, workers: int, max_queue: int, job_ttl_seconds: int):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.job_ttl_seconds = job_ttl_seconds
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, AgentJob] = {}
+        self._order = itertools.count()  # FIFO within a priority
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def queued(self) -> int:
+        """Jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_seconds: float = 30) -> None:
+        """Let queued jobs finish for up to drain_seconds (HIGH-keyword jobs always), then stop the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_seconds)
+        except asyncio.TimeoutError:
+            waiting = []
+            while not self._queue.empty():
+                waiting.append(self._queue.get_nowait())
+                self._queue.task_done()
+            dropped = [job for priority, _, job in waiting if priority != URGENT]
+            for item in waiting:
+                if item[0] == URGENT:
+                    self._queue.put_nowait(item)
+            for job in dropped:
+                job.fail("Dropped at shutdown")
+            if dropped:
+                metrics.incr("agent_jobs_dropped", len(dropped))
+                conversations = ", ".join(sorted({str(job.conversation_id) for job in dropped}))
+                print(f"Warning: {len(dropped)} agent jobs dropped at shutdown (conversations: {conversations})")
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self,
+        owner_id: uuid.UUID,
+        conversation_id: uuid.UUID,
+        fn: Callable[[AgentJob], Awaitable[Any]],
+        priority: int = 1
+    ) -> AgentJob:
+        """
+        Queue a job; fn(job) returns the result (or calls job.finish early)
+
+        Raises:
+            QueueFull: if max_queue jobs are already waiting
+        """
+        if not self._tasks:
+            raise RuntimeError("Agent job queue is not running")
+        self._purge()
+        job = AgentJob(owner_id, conversation_id, fn)
+        try:
+            self._queue.put_nowait((priority, next(self._order), job))
+        except asyncio.QueueFull:
+            metrics.incr("agent_jobs_rejected")
+            raise QueueFull()
+        self._jobs[job.id] = job
+        metrics.incr("agent_jobs_submitted")
+        metrics.set_gauge("agent_jobs_queued", self._queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[AgentJob]:
+        return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            metrics.set_gauge("agent_jobs_queued", self._queue.qsize())
+            job.status = "running"
+            started = time.perf_counter()
+            try:
+                result = await job.fn(job)
+                if job.status == "running":
+                    job.finish(result)
+                metrics.incr("agent_jobs_done")
+            except Exception as e:
+                print(f"Error in agent job {job.id}: {e}")
+                if job.status == "running":
+                    job.fail(str(e))
+                metrics.incr("agent_jobs_failed")
+            finally:
+                metrics.set_gauge("agent_job_last_seconds", time.perf_counter() - started)
+                self._queue.task_done()
+
+
+# Singleton instance
+agent_jobs = AgentJobQueue(
+    workers=settings.agent_worker_concurrency,
+    max_queue=settings.agent_job_queue_max,
+    job_ttl_seconds=settings.agent_job_ttl_seconds
+)
@@ -1,19 +1,295 @@
+import asyncio
+import glob
 import hashlib
+import json
+import os
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.models.audit_log import AuditLog
+from backend.config import get_settings
+from backend.models.audit_log import AuditLog, AuditChainHead
+from backend.services.metrics import metrics
 import uuid
 
+settings = get_settings()
+
+# prev_hash of the first chained entry
+GENESIS_HASH = "0" * 64
+
+# Fields covered by entry_hash, in canonical order
+CHAIN_FIELDS = ("seq", "id", "user_id", "action", "resource_type", "resource_id", "metadata_hash", "timestamp")
+
+
+def canonical_entry(row: Dict) -> str:
+    """Stable string form of the chained fields of one audit row"""
+    return "|".join(
+        row[field].isoformat() if isinstance(row[field], datetime) else str(row[field])
+        for field in CHAIN_FIELDS
+    )
+
+
+def compute_entry_hash(prev_hash: str, row: Dict) -> str:
+    """entry_hash = SHA-256(prev_hash + canonical row)"""
+    return hashlib.sha256((prev_hash + canonical_entry(row)).encode()).hexdigest()
+
+
+async def append_chained(conn, rows: List[Dict]) -> None:
+    """
+    Link rows onto the end of the audit hash chain and insert them
+
+    Takes a transaction-scoped advisory lock so that only one writer extends
+    the chain at a time (across workers), then assigns seq, prev_hash and
+    entry_hash in order. The tail is read from audit_chain_head rather than
+    from audit_logs so that no partition has to be searched.
+
+    The lock is held until the transaction ends, serializing every audit write
+    behind it, so call this in a transaction of its own (see _insert_rows).
+
+    Args:
+        conn: AsyncConnection or AsyncSession with an open transaction
+        rows: Audit rows (dicts with the AuditLog columns); updated in place
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"),
+        {"key": "audit_chain"}
+    )
+    result = await conn.execute(
+        select(AuditChainHead.seq, AuditChainHead.entry_hash).where(AuditChainHead.id == 1)
+    )
+    tail = result.first()
+    seq, prev_hash = (tail[0], tail[1]) if tail else (0, GENESIS_HASH)
+
+    for row in rows:
+        seq += 1
+        row["seq"] = seq
+        row["prev_hash"] = prev_hash
+        row["entry_hash"] = prev_hash = compute_entry_hash(prev_hash, row)
+
+    await conn.execute(insert(AuditLog), rows)
+    await conn.execute(
+        pg_insert(AuditChainHead)
+        .values(id=1, seq=seq, entry_hash=prev_hash)
+        .on_conflict_do_update(index_elements=["id"], set_={"seq": seq, "entry_hash": prev_hash})
+    )
+
+
+async def _insert_rows(rows: List[Dict]) -> None:
+    """Chain and bulk-insert audit rows in their own transaction (one executemany round trip)"""
+    from backend.database import engine
+
+    async with engine.begin() as conn:
+        await append_chained(conn, rows)
+
+
+def _row_to_json(row: Dict) -> str:
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, uuid.UUID) else value
+        for key, value in row.items()
+    })
+
+
+def _is_transient(error: Exception) -> bool:
+    """The database could not be reached, as opposed to rejecting the rows"""
+    if isinstance(error, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def _row_from_json(line: str) -> Dict:
+    row = json.loads(line)
+    for key in ("id", "user_id", "resource_id"):
+        row[key] = uuid.UUID(row[key])
+    row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class AuditSink:
+    """
+    Group-commit writer for audit events
+
+    Events are queued in memory and bulk-inserted in batches, either when
+    `batch_size` events are waiting or every `flush_interval_ms`, so request
+    latency no longer includes an audit round trip. On shutdown the queue is
+    drained; anything that cannot be written is spilled to an NDJSON file and
+    replayed on the next start.
+
+    A batch the database rejects (rather than one it cannot be reached for)
+    is split in halves until the offending rows are isolated; those are moved
+    to the dead-letter file so they do not hold up the rest of the queue.
+    Each worker spills to its own file, and a starting worker claims a spill
+    file by renaming it before replaying it, so no event is replayed twice.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval_ms: int,
+        max_queue: int,
+        spill_path: str,
+        dead_letter_path: Optional[str] = None,
+        writer: Callable[[List[Dict]], Awaitable[None]] = _insert_rows
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path or f"{spill_path}.dead"
+        self.writer = writer
+        self._queue: List[Dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enqueue(self, row: Dict) -> bool:
+        """
+        Queue one audit row
+
+        Returns:
+            False when the sink is not running or the queue is full (caller must write directly)
+        """
+        if not self.running or len(self._queue) >= self.max_queue:
+            return False
+        self._queue.append(row)
+        metrics.incr("audit.enqueued")
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def start(self) -> None:
+        """Replay any spilled events and start the background flusher"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._replay_spill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher, drain the queue and spill whatever could not be written"""
+        if self._task is not None:
+            # Let an in-flight batch finish rather than cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+        try:
+            while self._queue:
+                if not await self.flush():
+                    break
+        finally:
+            self._spill()
+
+    async def flush(self) -> bool:
+        """
+        Write up to one batch of queued events
+
+        Returns:
+            False if the database could not be reached (the unwritten events stay queued)
+        """
+        async with self._flush_lock:
+            if not self._queue:
+                return True
+            batch = self._queue[:self.batch_size]
+            del self._queue[:len(batch)]
+
+            # Chunks still to write, in order; a rejected chunk is replaced by its halves
+            chunks = [batch]
+            while chunks:
+                chunk = chunks.pop(0)
+                try:
+                    await self.writer(chunk)
+                except Exception as e:
+                    print(f"Error flushing audit batch: {e}")
+                    metrics.incr("audit.flush_errors")
+                    if _is_transient(e):
+                        self._queue[:0] = [row for pending in [chunk] + chunks for row in pending]  # Keep order
+                        return False
+                    if len(chunk) == 1:
+                        self._dead_letter(chunk)
+                    else:
+                        middle = len(chunk) // 2
+                        chunks[:0] = [chunk[:middle], chunk[middle:]]
+                    continue
+
+                metrics.incr("audit.flush_batches")
+                metrics.incr("audit.flushed_rows", len(chunk))
+
+            metrics.set_gauge("audit.queue_depth", len(self._queue))
+            return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._queue and not self._stopping:
+                if not await self.flush():
+                    break  # DB unavailable; back off until the next interval
+                if len(self._queue) < self.batch_size:
+                    break
+
+    @staticmethod
+    def _write_ndjson(path: str, rows: List[Dict], mode: str) -> None:
+        with open(path, mode, encoding="utf-8") as out:
+            out.write("".join(_row_to_json(row) + "\n" for row in rows))
+            out.flush()
+            os.fsync(out.fileno())
+
+    def _dead_letter(self, rows: List[Dict]) -> None:
+        self._write_ndjson(self.dead_letter_path, rows, "a")
+        metrics.incr("audit.dead_lettered_rows", len(rows))
+        print(f"Warning: Moved {len(rows)} rejected audit events to {self.dead_letter_path}")
+
+    def _spill(self) -> None:
+        if not self._queue:
+            return
+        # Written under a temporary name so a starting worker never claims a partial file
+        path = f"{self.spill_path}.{os.getpid()}.{uuid.uuid4().hex[:8]}"
+        self._write_ndjson(path + ".tmp", self._queue, "w")
+        os.replace(path + ".tmp", path)
+        metrics.incr("audit.spilled_rows", len(self._queue))
+        print(f"[WARN] Spilled {len(self._queue)} audit events to {path}")
+        self._queue.clear()
+
+    def _replay_spill(self) -> None:
+        rows = []
+        for path in sorted([self.spill_path] + glob.glob(glob.escape(self.spill_path) + ".*")):
+            if path.endswith((".tmp", ".claimed", ".dead")):
+                continue
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)  # Only one worker wins the rename
+            except FileNotFoundError:
+                continue
+            with open(claimed, encoding="utf-8") as spill:
+                rows += [_row_from_json(line) for line in spill if line.strip()]
+            os.remove(claimed)
+        if rows:
+            self._queue[:0] = rows
+            print(f"[OK] Replaying {len(rows)} spilled audit events")
+
 
 class AuditService:
     """Audit logging service - metadata only, NO PHI"""
-    
+
     @staticmethod
     def _hash_content(content: str) -> str:
         """Create SHA-256 hash of content"""
         return hashlib.sha256(content.encode()).hexdigest()
-    
+
     @staticmethod
     async def log_action(
         db: AsyncSession,
@@ -25,39 +301,61 @@ class AuditService:
     ) -> AuditLog:
         """
         Log an action to audit trail
-        
+
+        When the batched sink is running the event is queued and written by the
+        next group commit; otherwise it is chained and inserted in its own short
+        transaction, so the global chain lock is never held for the rest of the
+        caller's request transaction.
+
         Args:
-            db: Database session
+            db: Caller's session (not used for the write, see above)
             user_id: User performing the action
             action: Action type (e.g., "MESSAGE_SENT", "PROFILE_UPDATED")
             resource_type: Type of resource (e.g., "Message", "PatientProfile")
             resource_id: ID of the resource
             content: Optional content to hash (NOT stored, only hash)
-            
+
         Returns:
             Created AuditLog entry
         """
         metadata_hash = AuditService._hash_content(content) if content else ""
-        
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            metadata_hash=metadata_hash,
-            timestamp=datetime.utcnow()
-        )
-        
-        db.add(audit_log)
-        await db.flush()
-        
-        return audit_log
-    
+
+        row = {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "metadata_hash": metadata_hash,
+            "timestamp": datetime.utcnow()
+        }
+        if audit_sink.enqueue(row):
+            return AuditLog(**row)
+
+        await _insert_rows([row])
+
+        return AuditLog(**row)
+
     @staticmethod
     async def verify_content(content: str, stored_hash: str) -> bool:
         """Verify content matches stored hash"""
         return AuditService._hash_content(content) == stored_hash
 
+    @staticmethod
+    def verify_entry(audit_log: AuditLog) -> bool:
+        """Verify one chained entry against its own prev_hash (see audit_verify for the full chain)"""
+        if audit_log.seq is None:
+            return False
+        row = {field: getattr(audit_log, field) for field in CHAIN_FIELDS}
+        return compute_entry_hash(audit_log.prev_hash, row) == audit_log.entry_hash
+
 
-# Singleton instance
+# Singleton instances
+audit_sink = AuditSink(
+    batch_size=settings.audit_batch_size,
+    flush_interval_ms=settings.audit_flush_interval_ms,
+    max_queue=settings.audit_max_queue,
+    spill_path=settings.audit_spill_path,
+    dead_letter_path=settings.audit_dead_letter_path
+)
 audit_service = AuditService()
@@ -0,0 +1,314 @@
+"""
+Audit log sealing and bulk verification
+
+Every audit entry carries entry_hash = SHA-256(prev_hash + canonical row) and
+a gapless seq (see backend/services/audit.py). Closed time segments are sealed
+into audit_segments with the Merkle root of their entry hashes, so a segment
+can be checked on its own and roots can be handed to auditors.
+
+The verifier streams audit_logs once in seq (index) order and fans segments
+out to a process pool; the parent only groups rows, workers do the hashing.
+
+Run:
+    python -m backend.services.audit_verify seal
+    python -m backend.services.audit_verify verify [--workers N]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, func, insert
+from backend.config import get_settings
+from backend.models.audit_log import AuditLog, AuditSegment
+from backend.services.audit import CHAIN_FIELDS, GENESIS_HASH, compute_entry_hash
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+# Columns streamed to the workers: chained fields, then prev_hash and entry_hash
+_ROW_COLUMNS = [getattr(AuditLog, field) for field in CHAIN_FIELDS] + [AuditLog.prev_hash, AuditLog.entry_hash]
+
+# Unsealed rows are verified in chunks of this many rows
+TAIL_CHUNK_ROWS = 50000
+
+
+def merkle_root(hashes: Sequence[str]) -> str:
+    """Merkle root of hex SHA-256 leaves (an odd node is carried up unchanged)"""
+    if not hashes:
+        return GENESIS_HASH
+    level = [bytes.fromhex(h) for h in hashes]
+    while len(level) > 1:
+        paired = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+def _segment_start(timestamp: datetime, minutes: int) -> datetime:
+    bucket = timedelta(minutes=minutes)
+    return datetime.min + ((timestamp - datetime.min) // bucket) * bucket
+
+
+def verify_segment(job: Dict) -> Dict:
+    """
+    Check one run of consecutive audit rows (runs in a worker process)
+
+    Args:
+        job: {"start_seq", "prev_hash", "rows", "last_entry_hash"?, "merkle_root"?}
+            where rows are tuples in _ROW_COLUMNS order
+
+    Returns:
+        {"start_seq", "rows", "ok", "error"} - error names the first bad seq
+    """
+    expected_seq = job["start_seq"]
+    prev_hash = job["prev_hash"]
+    hashes = []
+    error = None
+
+    for values in job["rows"]:
+        row = dict(zip(CHAIN_FIELDS, values))
+        stored_prev, stored_hash = values[-2], values[-1]
+        if row["seq"] != expected_seq:
+            error = f"seq {expected_seq}: missing (next row is seq {row['seq']})"
+            break
+        if stored_prev != prev_hash:
+            error = f"seq {row['seq']}: prev_hash does not match the previous entry"
+            break
+        if compute_entry_hash(prev_hash, row) != stored_hash:
+            error = f"seq {row['seq']}: entry_hash does not match row contents"
+            break
+        hashes.append(stored_hash)
+        prev_hash = stored_hash
+        expected_seq += 1
+
+    if error is None and job.get("last_entry_hash") is not None:
+        if prev_hash != job["last_entry_hash"]:
+            error = f"segment {job['start_seq']}: ends at seq {expected_seq - 1}, sealed last entry differs"
+        elif merkle_root(hashes) != job["merkle_root"]:
+            error = f"segment {job['start_seq']}: Merkle root mismatch"
+
+    return {"start_seq": job["start_seq"], "rows": len(hashes), "ok": error is None, "error": error}
+
+
+async def seal_segments(segment_minutes: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """
+    Seal every closed time segment after the last sealed one
+
+    A segment is a run of consecutive seqs whose timestamps fall in the same
+    `segment_minutes` bucket; it is sealed once the bucket has ended (plus one
+    flush interval so the batched sink has caught up).
+
+    Returns:
+        Number of segments sealed
+    """
+    from backend.database import AsyncSessionLocal
+
+    minutes = segment_minutes or settings.audit_segment_minutes
+    cutoff = (now or datetime.utcnow()) - timedelta(milliseconds=settings.audit_flush_interval_ms)
+    sealed = 0
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(AuditSegment.end_seq, AuditSegment.last_entry_hash)
+            .order_by(AuditSegment.end_seq.desc())
+            .limit(1)
+        )
+        last = result.first()
+        after_seq, prev_hash = (last[0], last[1]) if last else (0, GENESIS_HASH)
+
+        stream = await db.stream(
+            select(AuditLog.seq, AuditLog.entry_hash, AuditLog.timestamp)
+            .where(AuditLog.seq > after_seq)
+            .order_by(AuditLog.seq)
+            .execution_options(yield_per=5000)
+        )
+
+        segment: List[Tuple] = []
+        period_start = None
+        async for seq, entry_hash, timestamp in stream:
+            bucket = _segment_start(timestamp, minutes)
+            if period_start is None:
+                period_start = bucket
+            if bucket > period_start:
+                await _insert_segment(db, segment, period_start, minutes, prev_hash)
+                sealed += 1
+                prev_hash = segment[-1][1]
+                segment, period_start = [], bucket
+            if period_start + timedelta(minutes=minutes) > cutoff:
+                break  # Current segment is still open
+            segment.append((seq, entry_hash))
+
+        if segment and period_start + timedelta(minutes=minutes) <= cutoff:
+            await _insert_segment(db, segment, period_start, minutes, prev_hash)
+            sealed += 1
+
+        await db.commit()
+
+    metrics.incr("audit.segments_sealed", sealed)
+    return sealed
+
+
+async def _insert_segment(db, segment: List[Tuple], period_start: datetime, minutes: int, prev_hash: str) -> None:
+    await db.execute(insert(AuditSegment).values(
+        start_seq=segment[0][0],
+        end_seq=segment[-1][0],
+        period_start=period_start,
+        period_end=period_start + timedelta(minutes=minutes),
+        prev_hash=prev_hash,
+        last_entry_hash=segment[-1][1],
+        merkle_root=merkle_root([entry_hash for _, entry_hash in segment])
+    ))
+
+
+async def verify_audit_log(workers: Optional[int] = None) -> Dict:
+    """
+    Verify the whole chain and every sealed segment in one pass
+
+    Segments older than the first row still in audit_logs are counted as
+    archived (see backend/services/partitions.py); the archived NDJSON keeps
+    the hashes, so those months can be checked offline with verify_segment.
+
+    Returns:
+        {"rows", "segments", "archived_segments", "first_seq", "unchained_rows", "ok", "errors"}
+    """
+    from backend.database import AsyncSessionLocal
+
+    workers = workers or settings.audit_verify_workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    totals = {"rows": 0, "segments": 0, "archived_segments": 0, "first_seq": None, "unchained_rows": 0, "ok": True, "errors": []}
+    pending = set()
+
+    def missing(segment: AuditSegment, previous_seq: Optional[int]) -> None:
+        if previous_seq is None:
+            totals["archived_segments"] += 1
+        elif segment.start_seq > previous_seq:
+            totals["ok"] = False
+            totals["errors"].append(f"segment {segment.start_seq}: sealed rows are missing")
+
+    def collect(done) -> None:
+        for future in done:
+            outcome = future.result()
+            totals["rows"] += outcome["rows"]
+            if not outcome["ok"]:
+                totals["ok"] = False
+                totals["errors"].append(outcome["error"])
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(func.count()).select_from(AuditLog).where(AuditLog.seq.is_(None)))
+        totals["unchained_rows"] = result.scalar_one()
+
+        result = await db.execute(select(AuditSegment).order_by(AuditSegment.start_seq))
+        segments = list(result.scalars().all())
+        totals["segments"] = len(segments)
+
+        # Sealed segments must tile the chain from seq 1 without gaps
+        expected_start, expected_prev = 1, GENESIS_HASH
+        for segment in segments:
+            if segment.start_seq != expected_start or segment.prev_hash != expected_prev:
+                totals["ok"] = False
+                totals["errors"].append(f"segment {segment.start_seq}: does not continue from seq {expected_start - 1}")
+            expected_start, expected_prev = segment.end_seq + 1, segment.last_entry_hash
+
+        stream = await db.stream(
+            select(*_ROW_COLUMNS)
+            .where(AuditLog.seq.isnot(None))
+            .order_by(AuditLog.seq)
+            .execution_options(yield_per=5000)
+        )
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            segment_index = 0
+            job = None
+
+            async def submit(job: Dict) -> None:
+                nonlocal pending
+                if len(pending) >= workers * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    collect(done)
+                pending.add(loop.run_in_executor(pool, verify_segment, job))
+
+            previous_seq, previous_hash = None, None
+            async for values in stream:
+                seq = values[0]
+                if previous_seq is None:
+                    totals["first_seq"] = seq
+                if job is not None and (
+                    seq > job["end_seq"] if job["end_seq"] is not None else len(job["rows"]) >= TAIL_CHUNK_ROWS
+                ):
+                    await submit(job)
+                    job = None
+
+                if job is None:
+                    while segment_index < len(segments) and segments[segment_index].end_seq < seq:
+                        missing(segments[segment_index], previous_seq)
+                        segment_index += 1
+                    if segment_index < len(segments) and segments[segment_index].start_seq <= seq:
+                        segment = segments[segment_index]
+                        job = {
+                            "start_seq": segment.start_seq,
+                            "end_seq": segment.end_seq,
+                            "prev_hash": segment.prev_hash,
+                            "last_entry_hash": segment.last_entry_hash,
+                            "merkle_root": segment.merkle_root,
+                            "rows": []
+                        }
+                    else:
+                        # Unsealed tail: chain checks only
+                        job = {
+                            "start_seq": seq if previous_seq is None else previous_seq + 1,
+                            "end_seq": None,
+                            "prev_hash": values[-2] if previous_seq is None else previous_hash,
+                            "rows": []
+                        }
+
+                job["rows"].append(tuple(values))
+                previous_seq, previous_hash = seq, values[-1]
+
+            for segment in segments[segment_index:]:
+                missing(segment, previous_seq)
+            if job is not None:
+                await submit(job)
+            if pending:
+                done, _ = await asyncio.wait(pending)
+                collect(done)
+
+    metrics.incr("audit.verify_runs")
+    metrics.set_gauge("audit.verify_last_rows", totals["rows"])
+    return totals
+
+
+async def seal_loop(interval_seconds: int):
+    """Seal closed segments periodically inside a worker (optional, see settings)"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            sealed = await seal_segments()
+            if sealed:
+                print(f"[OK] Sealed {sealed} audit segments")
+        except Exception as e:
+            print(f"Error sealing audit segments: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seal or verify the audit hash chain")
+    parser.add_argument("command", choices=["seal", "verify"])
+    parser.add_argument("--workers", type=int, default=None, help="Verifier processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.command == "seal":
+        sealed = asyncio.run(seal_segments())
+        print(f"[OK] Sealed {sealed} audit segments")
+    else:
+        totals = asyncio.run(verify_audit_log(args.workers))
+        print(f"[{'OK' if totals['ok'] else 'FAILED'}] Audit log verification")
+        print(f"  Chained rows verified: {totals['rows']}")
+        print(f"  Sealed segments:       {totals['segments']} ({totals['archived_segments']} archived)")
+        print(f"  First seq on disk:     {totals['first_seq']}")
+        print(f"  Unchained (legacy):    {totals['unchained_rows']}")
+        for error in totals["errors"]:
+            print(f"  Error: {error}")
+        raise SystemExit(0 if totals["ok"] else 1)
@@ -0,0 +1,160 @@
+"""
+Automatic, load-balanced assignment of escalation tickets to clinicians
+
+Clinicians mark themselves available (PUT /escalations/availability). Each
+new ticket is assigned, in the transaction that creates it, to the available
+clinician with the fewest open tickets (ties go to whoever was assigned
+least recently). The clinician row is selected with FOR UPDATE SKIP LOCKED:
+concurrent escalations lock different clinicians instead of queueing on the
+same one, so assignment throughput grows with the number of clinicians
+online. When every available clinician is locked or at capacity the ticket
+stays unassigned and is handed out by POST /escalations/next.
+
+open_tickets is kept up to date as tickets are assigned, taken over and
+resolved; it is recounted from escalation_tickets whenever a clinician
+changes availability and by `python -m backend.services.clinician_assignment recount`.
+
+Run:
+    python -m backend.services.clinician_assignment recount
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.database import session_scope
+from backend.models.clinician_availability import ClinicianAvailability
+from backend.models.escalation import EscalationTicket, EscalationStatus
+from backend.services.escalation_dispatch import OPEN_STATUSES
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+
+def _open_ticket_count(clinician_id):
+    """Scalar subquery: open tickets assigned to clinician_id (a value or a column)"""
+    return (
+        select(func.count())
+        .select_from(EscalationTicket)
+        .where(
+            EscalationTicket.assigned_clinician_id == clinician_id,
+            EscalationTicket.status.in_(OPEN_STATUSES)
+        )
+        .scalar_subquery()
+    )
+
+
+async def assign_ticket(db: AsyncSession, ticket: EscalationTicket) -> Optional[uuid.UUID]:
+    """Assign ticket to the least-loaded available clinician with spare capacity, if any"""
+    capacity = func.coalesce(ClinicianAvailability.max_open_tickets, settings.escalation_max_open_per_clinician)
+    result = await db.execute(
+        select(ClinicianAvailability)
+        .where(
+            ClinicianAvailability.available.is_(True),
+            ClinicianAvailability.open_tickets < capacity
+        )
+        .order_by(
+            ClinicianAvailability.open_tickets,
+            ClinicianAvailability.last_assigned_at.asc().nulls_first()
+        )
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    clinician = result.scalar_one_or_none()
+    if clinician is None:
+        metrics.incr("escalation_left_unassigned")
+        return None
+
+    clinician.open_tickets += 1
+    clinician.last_assigned_at = datetime.utcnow()
+    ticket.assigned_clinician_id = clinician.clinician_id
+    metrics.incr("escalation_auto_assigned")
+    return clinician.clinician_id
+
+
+async def adjust_load(db: AsyncSession, clinician_id: Optional[uuid.UUID], delta: int) -> None:
+    """Add delta to a clinician's open ticket count (no-op for clinicians without an availability row)"""
+    if clinician_id is None or delta == 0:
+        return
+    await db.execute(
+        update(ClinicianAvailability)
+        .where(ClinicianAvailability.clinician_id == clinician_id)
+        .values(open_tickets=func.greatest(ClinicianAvailability.open_tickets + delta, 0))
+    )
+
+
+async def update_ticket(
+    db: AsyncSession,
+    ticket: EscalationTicket,
+    status: EscalationStatus,
+    assigned_clinician_id: Optional[uuid.UUID]
+) -> None:
+    """Set a ticket's status and assignee, moving the open-ticket count between clinicians as needed"""
+    before = ticket.assigned_clinician_id if ticket.status in OPEN_STATUSES else None
+    ticket.status = status
+    ticket.assigned_clinician_id = assigned_clinician_id
+    after = assigned_clinician_id if status in OPEN_STATUSES else None
+    if before != after:
+        await adjust_load(db, before, -1)
+        await adjust_load(db, after, 1)
+
+
+async def set_availability(
+    db: AsyncSession,
+    clinician_id: uuid.UUID,
+    available: bool,
+    max_open_tickets: Optional[int] = None
+) -> List[uuid.UUID]:
+    """
+    Mark a clinician (un)available and recount their load
+
+    Going unavailable hands their pending (not yet started) tickets back to
+    the shared queue; returns the ids of those tickets.
+    """
+    released = []
+    if not available:
+        result = await db.execute(
+            update(EscalationTicket)
+            .where(
+                EscalationTicket.assigned_clinician_id == clinician_id,
+                EscalationTicket.status == EscalationStatus.PENDING
+            )
+            .values(assigned_clinician_id=None)
+            .returning(EscalationTicket.id)
+        )
+        released = [row[0] for row in result.all()]
+
+    now = datetime.utcnow()
+    values = {"available": available, "open_tickets": _open_ticket_count(clinician_id), "updated_at": now}
+    if max_open_tickets is not None:
+        values["max_open_tickets"] = max_open_tickets
+    await db.execute(
+        pg_insert(ClinicianAvailability)
+        .values(clinician_id=clinician_id, **values)
+        .on_conflict_do_update(index_elements=["clinician_id"], set_=values)
+    )
+    return released
+
+
+async def recount_load(db: Optional[AsyncSession] = None) -> int:
+    """Recompute every clinician's open ticket count from escalation_tickets"""
+    async with session_scope(db) as write_db:
+        result = await write_db.execute(
+            update(ClinicianAvailability)
+            .values(open_tickets=_open_ticket_count(ClinicianAvailability.clinician_id))
+        )
+        return result.rowcount
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clinician assignment maintenance")
+    parser.add_argument("command", choices=["recount"])
+    args = parser.parse_args()
+
+    clinicians = asyncio.run(recount_load())
+    print(f"[OK] Recounted open tickets for {clinicians} clinicians")
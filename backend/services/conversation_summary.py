@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Optional
+import uuid
+from sqlalchemy import select, update
+from backend.config import get_settings
+from backend.models.conversation import Conversation
+from backend.services.llm import llm
+from backend.services.patient_lock import KeyedLock
+
+settings = get_settings()
+
+
+class ConversationSummaryService:
+    """
+    Rolling per-conversation summary used as context for risk gating and responses
+
+    The summary is rebuilt after each turn from the previous summary plus the new
+    (redacted) exchange only, so its size - and the cost of using it - stays
+    bounded no matter how long the conversation gets.
+
+    Conversation.rolling_summary is the source of truth: a refresh always
+    starts from the stored summary and only writes if summary_turns has not
+    moved meanwhile (another worker refreshed first), otherwise it folds its
+    exchange into the newer summary. The in-process cache only serves reads.
+    """
+
+    def __init__(self, max_tokens: int, cache_size: int):
+        self.max_tokens = max_tokens
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._locks = KeyedLock()
+
+    def _truncate(self, text: str) -> str:
+        """Keep the most recent part of the text within the token budget (~4 chars/token)"""
+        max_chars = self.max_tokens * 4
+        text = text.strip()
+        if len(text) <= max_chars:
+            return text
+        return "..." + text[-(max_chars - 3):]
+
+    def _remember(self, conversation_id: str, summary: str) -> None:
+        self._cache[conversation_id] = summary
+        self._cache.move_to_end(conversation_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_cached(self, conversation_id: str) -> Optional[str]:
+        """Summary from the in-process cache, if this worker has seen the conversation"""
+        return self._cache.get(str(conversation_id))
+
+    def get(self, conversation: Conversation) -> Optional[str]:
+        """Current summary for a loaded conversation (the stored column, else this worker's cache)"""
+        return conversation.rolling_summary or self.get_cached(str(conversation.id))
+
+    async def summarize(self, previous_summary: Optional[str], patient_message: str, ai_response: Optional[str]) -> str:
+        """
+        Fold one exchange into the previous summary
+
+        Args:
+            previous_summary: Summary before this turn (None for the first turn)
+            patient_message: Redacted patient message
+            ai_response: Reply sent to the patient, if any
+
+        Returns:
+            New summary, at most `max_tokens` long
+        """
+        prompt = f"""Update the running clinical summary of a patient conversation.
+
+Previous Summary: {previous_summary or "None (first message)"}
+
+New Patient Message: "{patient_message}"
+Assistant Reply: "{ai_response or "None"}"
+
+Write the updated summary in at most {self.max_tokens // 2} words. Keep symptoms, their timing and
+severity, medications mentioned, and any escalation. Drop small talk. Plain text only.
+"""
+        try:
+            return self._truncate(await llm.generate("summary", prompt))
+        except Exception as e:
+            print(f"Error updating conversation summary: {e}")
+            fallback = f"{previous_summary or ''} Patient: {patient_message}"
+            return self._truncate(fallback)
+
+    async def refresh(self, conversation_id: uuid.UUID, patient_message: str, ai_response: Optional[str], max_attempts: int = 3) -> None:
+        """
+        Update and persist the summary after a turn (runs after the response is sent)
+        """
+        from backend.database import AsyncSessionLocal
+
+        key = str(conversation_id)
+        async with self._locks.hold(key):
+            for _ in range(max_attempts):
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        select(Conversation.rolling_summary, Conversation.summary_turns)
+                        .where(Conversation.id == conversation_id)
+                    )
+                    row = result.first()
+                if row is None:
+                    return
+                previous_summary, turns = row
+
+                # No DB connection is held while the LLM runs
+                summary = await self.summarize(previous_summary, patient_message, ai_response)
+
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(Conversation)
+                        .where(Conversation.id == conversation_id, Conversation.summary_turns == turns)
+                        .values(
+                            rolling_summary=summary,
+                            summary_turns=turns + 1,
+                            updated_at=Conversation.updated_at
+                        )
+                    )
+                    await db.commit()
+
+                if result.rowcount:
+                    self._remember(key, summary)
+                    return
+                # Another worker stored a newer summary first: fold this turn into that one
+
+            print(f"Warning: Conversation summary for {key} not updated (concurrent refreshes)")
+
+
+# Singleton instance
+conversation_summary_service = ConversationSummaryService(
+    max_tokens=settings.conversation_summary_max_tokens,
+    cache_size=settings.conversation_summary_cache_size
+)
@@ -0,0 +1,246 @@
+"""
+Coalescing of repeated escalations within one conversation
+
+While a conversation has an open ticket (PENDING or IN_PROGRESS), further
+escalating messages are appended to it as follow-ups instead of creating a
+new ticket with a new SBAR. The SBAR is regenerated incrementally (the
+current summary plus the follow-ups it does not cover yet) only when a
+follow-up is a material change: a higher risk level, or a risk keyword the
+ticket has not mentioned so far. A higher risk level regenerates the SBAR
+right away and moves the ticket up the queue; other material changes are
+debounced so regenerations are at least escalation_sbar_debounce_seconds
+apart, and one that lands inside the window is summarized when it closes
+(trailing_sbar_updates), even if the patient sends nothing more.
+
+Trailing updates are scheduled in the worker that received the follow-up and
+are lost if it stops first; the next follow-up on the ticket schedules them
+again.
+
+Within a worker, agent runs for a patient are serialized (patient_locks);
+across workers, ticket creation takes a per-conversation advisory lock and
+follow-ups lock the ticket row, so one crisis ends up as one ticket.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.database import session_scope
+from backend.models.escalation import EscalationTicket
+from backend.services.escalation_dispatch import OPEN_STATUSES, RISK_RANK, escalation_dispatcher
+from backend.services.llm import llm
+from backend.services.metrics import metrics
+from backend.services.risk_assessment import RiskAssessmentService
+
+settings = get_settings()
+
+RISK_KEYWORDS = RiskAssessmentService.HIGH_RISK_KEYWORDS + RiskAssessmentService.MEDIUM_RISK_KEYWORDS
+RISK_RAISED = "risk level raised to"
+
+
+async def find_open_ticket(db: AsyncSession, conversation_id: uuid.UUID, for_update: bool = False) -> Optional[EscalationTicket]:
+    """The conversation's open ticket (most recent), if any"""
+    query = (
+        select(EscalationTicket)
+        .where(
+            EscalationTicket.conversation_id == conversation_id,
+            EscalationTicket.status.in_(OPEN_STATUSES)
+        )
+        .order_by(EscalationTicket.created_at.desc())
+        .limit(1)
+    )
+    if for_update:
+        query = query.with_for_update().execution_options(populate_existing=True)
+    result = await db.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def lock_ticket(db: AsyncSession, ticket_id: uuid.UUID) -> Optional[EscalationTicket]:
+    """Re-read a ticket with a row lock (follow-ups from concurrent runs apply one at a time)"""
+    result = await db.execute(
+        select(EscalationTicket)
+        .where(EscalationTicket.id == ticket_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+async def acquire_escalation_advisory_lock(db: AsyncSession, conversation_id: uuid.UUID) -> None:
+    """Serialize ticket creation for a conversation across workers (released on commit/rollback)"""
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"),
+        {"key": f"escalation:{conversation_id}"}
+    )
+
+
+def _ticket_text(ticket: EscalationTicket) -> str:
+    parts = [ticket.reason or "", ticket.clinical_summary or ""]
+    parts += [follow_up.get("message", "") for follow_up in ticket.follow_ups or []]
+    return " ".join(parts).lower()
+
+
+def material_change(ticket: EscalationTicket, message: str, risk_assessment: Dict) -> Optional[str]:
+    """Why this follow-up changes the clinical picture, or None if it repeats what the ticket says"""
+    risk_level = risk_assessment.get("risk_level")
+    if RISK_RANK.get(risk_level, len(RISK_RANK)) < RISK_RANK.get(ticket.risk_level, len(RISK_RANK)):
+        return f"{RISK_RAISED} {risk_level}"
+
+    known = _ticket_text(ticket)
+    new_terms = [keyword for keyword in RISK_KEYWORDS if keyword in message.lower() and keyword not in known]
+    if new_terms:
+        return "new: " + ", ".join(new_terms)
+    return None
+
+
+def follow_up_entry(message: str, risk_assessment: Dict, material: Optional[str]) -> Dict:
+    return {
+        "message": message,
+        "risk_level": risk_assessment.get("risk_level", "UNKNOWN"),
+        "reason": risk_assessment.get("reason", ""),
+        "material": material,
+        "received_at": datetime.utcnow().isoformat()
+    }
+
+
+def add_follow_up(ticket: EscalationTicket, follow_up: Dict) -> None:
+    """Append a follow-up to the ticket and raise its risk level if the follow-up's is higher"""
+    ticket.follow_ups = list(ticket.follow_ups or []) + [follow_up]  # New list so the JSONB change is saved
+    if RISK_RANK.get(follow_up["risk_level"], len(RISK_RANK)) < RISK_RANK.get(ticket.risk_level, len(RISK_RANK)):
+        ticket.risk_level = follow_up["risk_level"]
+
+
+def unsummarized(ticket: EscalationTicket) -> List[Dict]:
+    """Follow-ups the current SBAR does not cover yet"""
+    return list(ticket.follow_ups or [])[ticket.summarized_follow_ups or 0:]
+
+
+def seconds_until_sbar_due(ticket: EscalationTicket, pending: List[Dict], now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Seconds until the SBAR should be regenerated (0 = now), or None if no pending follow-up is material
+    
+    A raised risk level is due at once; other material changes wait for the
+    debounce interval since the last SBAR.
+    """
+    material = [follow_up["material"] for follow_up in pending if follow_up.get("material")]
+    if not material:
+        return None
+    if any(reason.startswith(RISK_RAISED) for reason in material):
+        return 0.0
+    last = ticket.summary_updated_at or ticket.created_at
+    if last is None:
+        return 0.0
+    elapsed = (now or datetime.utcnow()) - last
+    return max(0.0, settings.escalation_sbar_debounce_seconds - elapsed.total_seconds())
+
+
+def sbar_due(ticket: EscalationTicket, pending: List[Dict], now: Optional[datetime] = None) -> bool:
+    """A pending follow-up raised the risk level, or is material and the debounce interval has passed"""
+    return seconds_until_sbar_due(ticket, pending, now) == 0
+
+
+def sbar_update_prompt(ticket: EscalationTicket, follow_ups: List[Dict]) -> str:
+    """Prompt for an incremental SBAR update: the current summary plus the new follow-ups"""
+    lines = "\n".join(
+        f'- "{follow_up["message"]}" (risk {follow_up["risk_level"]}: {follow_up["reason"]})'
+        for follow_up in follow_ups
+    )
+    risk_level = min(
+        [ticket.risk_level] + [follow_up["risk_level"] for follow_up in follow_ups],
+        key=lambda level: RISK_RANK.get(level, len(RISK_RANK))
+    )
+    return f"""Update this SBAR clinical summary with the patient's follow-up messages.
+
+Current Risk Level: {risk_level}
+
+Current SBAR:
+{ticket.clinical_summary}
+
+Follow-up messages since this summary (oldest first):
+{lines}
+
+Keep the SBAR format (**Situation**, **Background**, **Assessment**, **Recommendation**).
+Change only what the follow-ups change, and say what is new in the Situation.
+Keep it concise and professional.
+"""
+
+
+async def refresh_sbar(ticket_id: uuid.UUID) -> Optional[float]:
+    """
+    Regenerate a ticket's SBAR from its uncovered follow-ups if that is due
+    
+    Reads and writes in separate short sessions (no connection is held during
+    the LLM call); the write only applies if no follow-up arrived meanwhile.
+    Returns the seconds until the next regeneration is due, or None if none is.
+    """
+    async with session_scope() as read_db:
+        ticket = await read_db.get(EscalationTicket, ticket_id)
+    if ticket is None or ticket.status not in OPEN_STATUSES:
+        return None
+    pending = unsummarized(ticket)
+    if not sbar_due(ticket, pending):
+        return seconds_until_sbar_due(ticket, pending)
+    
+    summarized, seen = ticket.summarized_follow_ups or 0, len(ticket.follow_ups or [])
+    clinical_summary = (await llm.generate("sbar", sbar_update_prompt(ticket, pending))).strip()
+    
+    async with session_scope() as write_db:
+        current = await lock_ticket(write_db, ticket_id)
+        if current is None or current.status not in OPEN_STATUSES:
+            return None
+        if current.summarized_follow_ups == summarized and len(current.follow_ups or []) == seen:
+            current.clinical_summary = clinical_summary
+            current.summarized_follow_ups = len(current.follow_ups)
+            current.summary_updated_at = datetime.utcnow()
+            metrics.incr("escalation_sbar_updates")
+    
+    escalation_dispatcher.track(current)
+    return seconds_until_sbar_due(current, unsummarized(current))
+
+
+class TrailingSbarUpdates:
+    """Per-worker timers that regenerate a debounced SBAR when its window closes"""
+    
+    def __init__(self):
+        self._scheduled: Dict[uuid.UUID, asyncio.Task] = {}
+        self._tasks = set()  # Keeps running updates referenced until they finish
+    
+    @property
+    def scheduled(self) -> int:
+        return len(self._scheduled)
+    
+    def schedule(self, ticket_id: uuid.UUID, delay: float) -> None:
+        """Regenerate the ticket's SBAR in `delay` seconds (once, however often it is scheduled meanwhile)"""
+        if ticket_id in self._scheduled:
+            return
+        task = asyncio.create_task(self._run(ticket_id, delay))
+        self._scheduled[ticket_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, ticket_id: uuid.UUID, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._scheduled.pop(ticket_id, None)
+        try:
+            remaining = await refresh_sbar(ticket_id)
+        except Exception as e:
+            print(f"Error updating SBAR: {e}")
+            return
+        if remaining is not None:
+            self.schedule(ticket_id, remaining)
+    
+    async def stop(self) -> None:
+        """Cancel pending updates (the next follow-up on each ticket schedules its update again)"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._scheduled.clear()
+
+
+# Singleton instance
+trailing_sbar_updates = TrailingSbarUpdates()
@@ -0,0 +1,197 @@
+"""
+In-memory priority queue for the clinician escalation queue
+
+Open tickets are ordered by risk level, then SLA deadline (created_at plus the
+SLA for the risk level), then age, so the most dangerous and most overdue
+ticket is on top instead of the newest. The queue is built from the database
+on startup (O(n) heapify) and kept up to date as tickets are created and
+change status in this worker; popping the next ticket is O(log n). Pending
+tickets are kept in one heap for unassigned tickets and one per clinician
+they were assigned to (backend/services/clinician_assignment.py), so a
+clinician is handed their own tickets or unassigned ones, never another
+clinician's.
+
+Each worker holds its own queue. Tickets created by other workers are picked
+up by `catch_up` (tickets created since the last sync) before the queue is
+read, stale entries are dropped when the dashboard loads the tickets, and a
+claim only succeeds if the ticket is still pending and unassigned in the
+database, so two clinicians never get the same ticket.
+"""
+import asyncio
+import heapq
+import itertools
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.database import session_scope
+from backend.models.escalation import EscalationTicket, EscalationStatus
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+RISK_RANK = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
+OPEN_STATUSES = (EscalationStatus.PENDING, EscalationStatus.IN_PROGRESS)
+
+# Tickets created up to this long before the last sync are re-read by catch_up,
+# covering clock skew between workers (created_at is set by the writing worker)
+CATCH_UP_OVERLAP = timedelta(seconds=30)
+
+_REMOVED = None  # Placeholder for a heap entry that was superseded or claimed
+
+
+def sla_minutes(risk_level: str) -> int:
+    """Time within which a clinician should pick up a ticket of this risk level"""
+    return {
+        "HIGH": settings.escalation_sla_high_minutes,
+        "MEDIUM": settings.escalation_sla_medium_minutes,
+    }.get(risk_level, settings.escalation_sla_low_minutes)
+
+
+def priority(risk_level: str, created_at: datetime) -> Tuple[int, datetime, datetime]:
+    """Sort key: risk level, then SLA deadline, then age (smallest first)"""
+    deadline = created_at + timedelta(minutes=sla_minutes(risk_level))
+    return (RISK_RANK.get(risk_level, len(RISK_RANK)), deadline, created_at)
+
+
+class EscalationDispatcher:
+    """Open tickets by priority, plus heaps of the pending ones (unassigned, and per assigned clinician)"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.reset()
+
+    @property
+    def ready(self) -> bool:
+        return self._synced_at is not None
+
+    @property
+    def pending(self) -> int:
+        return len(self._entries)
+
+    def reset(self) -> None:
+        self._open: Dict[uuid.UUID, Tuple] = {}  # ticket id -> priority key, for the dashboard view
+        self._entries: Dict[uuid.UUID, list] = {}  # ticket id -> its live entry in a pending heap
+        self._heaps: Dict[Optional[uuid.UUID], List[list]] = {None: []}  # assignee -> [key, seq, assignee, ticket id]
+        self._order = itertools.count()  # FIFO between equal keys
+        self._synced_at: Optional[datetime] = None
+
+    def invalidate(self) -> None:
+        """Rebuild from the database on next use (after a failed claim, for instance)"""
+        self._synced_at = None
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("escalation_queue_open", len(self._open))
+        metrics.set_gauge("escalation_queue_pending", len(self._entries))
+        metrics.set_gauge("escalation_queue_unassigned", sum(1 for entry in self._entries.values() if entry[2] is None))
+
+    def _unqueue(self, ticket_id: uuid.UUID) -> None:
+        entry = self._entries.pop(ticket_id, None)
+        if entry is not None:
+            entry[-1] = _REMOVED
+
+    def _track(self, ticket: EscalationTicket, push: bool = True) -> None:
+        self._unqueue(ticket.id)
+        if ticket.status not in OPEN_STATUSES:
+            self._open.pop(ticket.id, None)
+            return
+        key = priority(ticket.risk_level, ticket.created_at or datetime.utcnow())  # Unset until flushed
+        self._open[ticket.id] = key
+        if ticket.status == EscalationStatus.PENDING:
+            assignee = ticket.assigned_clinician_id
+            entry = [key, next(self._order), assignee, ticket.id]
+            self._entries[ticket.id] = entry
+            heap = self._heaps.setdefault(assignee, [])
+            if push:
+                heapq.heappush(heap, entry)
+            else:
+                heap.append(entry)
+
+    def track(self, ticket: EscalationTicket) -> None:
+        """Record a created ticket or a status/assignment change, O(log n)"""
+        self._track(ticket)
+        self._gauges()
+
+    def discard(self, ticket_id: uuid.UUID) -> None:
+        """Forget a ticket (resolved or deleted elsewhere)"""
+        self._unqueue(ticket_id)
+        self._open.pop(ticket_id, None)
+        self._gauges()
+
+    def _top(self, assignee: Optional[uuid.UUID]) -> Optional[list]:
+        heap = self._heaps.get(assignee)
+        while heap and heap[0][-1] is _REMOVED:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def pop(self, clinician_id: Optional[uuid.UUID] = None) -> Optional[Tuple[uuid.UUID, Optional[uuid.UUID]]]:
+        """
+        Take the most urgent pending ticket that is unassigned or assigned to
+        clinician_id off the queue, O(log n); returns (ticket id, assignee)
+        """
+        candidates = [entry for entry in (self._top(None), self._top(clinician_id) if clinician_id else None) if entry]
+        if not candidates:
+            return None
+        entry = min(candidates)
+        heapq.heappop(self._heaps[entry[2]])
+        del self._entries[entry[-1]]
+        self._gauges()
+        return entry[-1], entry[2]
+
+    def ordered(self) -> List[uuid.UUID]:
+        """Open ticket ids, highest priority first"""
+        return sorted(self._open, key=self._open.__getitem__)
+
+    async def rebuild(self, db: Optional[AsyncSession] = None) -> int:
+        """Replace the queue with the open tickets in the database"""
+        async with self._lock:
+            synced_at = datetime.utcnow()
+            async with session_scope(db) as read_db:
+                result = await read_db.execute(
+                    select(EscalationTicket).where(EscalationTicket.status.in_(OPEN_STATUSES))
+                )
+                tickets = result.scalars().all()
+            self.reset()
+            for ticket in tickets:
+                self._track(ticket, push=False)
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+            self._synced_at = synced_at
+            self._gauges()
+            return len(self._open)
+
+    async def catch_up(self, db: Optional[AsyncSession] = None) -> int:
+        """Add tickets created since the last sync (e.g. by another worker); rebuilds if never loaded"""
+        if not self.ready:
+            return await self.rebuild(db)
+        async with self._lock:
+            synced_at = datetime.utcnow()
+            async with session_scope(db) as read_db:
+                result = await read_db.execute(
+                    select(EscalationTicket).where(
+                        EscalationTicket.status.in_(OPEN_STATUSES),
+                        EscalationTicket.created_at >= self._synced_at - CATCH_UP_OVERLAP
+                    )
+                )
+                tickets = [ticket for ticket in result.scalars().all() if ticket.id not in self._open]
+            for ticket in tickets:
+                self._track(ticket)
+            self._synced_at = synced_at
+            self._gauges()
+            return len(tickets)
+
+
+async def resync_loop(interval_seconds: int):
+    """Rebuild the queue periodically, picking up status changes made by other workers"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await escalation_dispatcher.rebuild()
+        except Exception as e:
+            print(f"Error rebuilding escalation queue: {e}")
+
+
+# Singleton instance
+escalation_dispatcher = EscalationDispatcher()
@@ -0,0 +1,114 @@
+"""
+Tolerant incremental JSON parser for LLM output
+
+Feed the reply text as it streams in; `partial()` returns every value that is
+complete so far, closing any open objects and arrays, so a field can be acted
+on as soon as it has been emitted. Text around the JSON (markdown fences,
+preambles) is skipped, and a reply cut short (max tokens, timeout) still
+yields its complete fields instead of failing the whole call.
+"""
+import json
+import re
+from typing import List, Optional
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class IncrementalJSONParser:
+    """Scans fed text once, remembering the last point where a value was complete"""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._start: Optional[int] = None  # Index of the first "{"
+        self._end: Optional[int] = None  # Index just past the closing "}" of the top-level object
+        self._stack: List[list] = []  # [bracket, expecting_key] per open container
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._in_literal = False
+        self._cut: Optional[tuple] = None  # (index, closing brackets) after the last complete value
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        while self._pos < len(self.text) and self._end is None:
+            self._scan(self._pos, self.text[self._pos])
+            self._pos += 1
+
+    def _mark(self, index: int) -> None:
+        closers = "".join("}" if bracket == "{" else "]" for bracket, _ in reversed(self._stack))
+        self._cut = (index, closers)
+
+    def _end_literal(self, index: int) -> None:
+        if self._in_literal:
+            self._in_literal = False
+            self._mark(index)
+
+    def _scan(self, index: int, char: str) -> None:
+        if self._start is None:
+            if char == "{":
+                self._start = index
+                self._stack.append(["{", True])
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if not self._string_is_key:
+                    self._mark(index + 1)
+            return
+
+        top = self._stack[-1]
+        if char == '"':
+            self._in_string = True
+            self._string_is_key = top[0] == "{" and top[1]
+        elif char in "{[":
+            self._stack.append([char, char == "{"])
+        elif char in "}]":
+            self._end_literal(index)
+            self._stack.pop()
+            if not self._stack:
+                self._end = index + 1
+            self._mark(index + 1)
+        elif char == ":":
+            top[1] = False
+        elif char == ",":
+            self._end_literal(index)
+            if top[0] == "{":
+                top[1] = True
+        elif char.isspace():
+            self._end_literal(index)
+        else:
+            self._in_literal = True  # number, true, false, null
+
+    def partial(self) -> dict:
+        """Every complete value seen so far ({} before the first one)"""
+        if self._cut is None:
+            return {}
+        index, closers = self._cut
+        try:
+            value = json.loads(self.text[self._start:index] + closers)
+        except ValueError:
+            return {}
+        return value if isinstance(value, dict) else {}
+
+    def result(self) -> dict:
+        """The whole object once complete (tolerating trailing commas), else the partial view"""
+        if self._end is not None:
+            document = self.text[self._start:self._end]
+            for candidate in (document, _TRAILING_COMMA.sub(r"\1", document)):
+                try:
+                    value = json.loads(candidate)
+                    return value if isinstance(value, dict) else {}
+                except ValueError:
+                    continue
+        return self.partial()
+
@@ -0,0 +1,197 @@
+"""
+Lazily initialized Gemini provider
+
+google.generativeai is imported and configured on the first model request,
+not at import time, so importing the API, running the tests or running the
+database scripts neither pays the SDK import cost nor needs GOOGLE_API_KEY.
+GenerativeModel instances are cached per model name.
+
+Each agent node calls a tier ("risk", "extraction", "response", "sbar") with
+its own model, timeout and max output tokens (llm_<tier>_* settings); the
+rolling conversation summary uses the "summary" tier. The JSON-only
+classification tiers and the summary default to the fast model. When the worker is
+shedding load (too many LLM calls in flight, or a deep agent job queue) every
+tier falls back to gemini_fast_model.
+
+Passing a pydantic model as `schema` requests schema-constrained JSON output
+(see backend/services/llm_schemas.py); `stream` yields the reply as it is
+generated so callers can act on fields before the reply is complete.
+"""
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional, Type
+from pydantic import BaseModel
+from backend.config import get_settings
+from backend.services.llm_schemas import response_schema
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+TIERS = ("risk", "extraction", "response", "sbar", "summary")
+
+
+def tier_config(tier: str) -> Dict:
+    """Model name, timeout and max output tokens configured for a tier"""
+    if tier not in TIERS:
+        raise ValueError(f"Unknown LLM tier: {tier}")
+    return {
+        "model": getattr(settings, f"llm_{tier}_model") or settings.gemini_model,
+        "timeout_seconds": getattr(settings, f"llm_{tier}_timeout_seconds"),
+        "max_tokens": getattr(settings, f"llm_{tier}_max_tokens")
+    }
+
+
+def generation_config(config: Dict, schema: Optional[Type[BaseModel]] = None) -> Dict:
+    """Gemini generation config for a resolved tier, JSON-constrained when a schema is given"""
+    generation = {"max_output_tokens": config["max_tokens"]}
+    if schema is not None:
+        generation["response_mime_type"] = "application/json"
+        generation["response_schema"] = response_schema(schema)
+    return generation
+
+
+class GeminiProvider:
+    """One-time SDK configuration plus a per-name GenerativeModel cache"""
+
+    def __init__(self):
+        self._genai = None
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def configured(self) -> bool:
+        return self._genai is not None
+
+    def sdk(self):
+        """The configured google.generativeai module (imported on first use)"""
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    if not settings.google_api_key:
+                        raise RuntimeError("GOOGLE_API_KEY is not set")
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=settings.google_api_key)
+                    self._genai = genai
+        return self._genai
+
+    def model(self, name: Optional[str] = None):
+        """
+        Cached GenerativeModel for `name` (defaults to settings.gemini_model)
+
+        Raises:
+            RuntimeError: if no API key is configured
+        """
+        name = name or settings.gemini_model
+        model = self._models.get(name)
+        if model is None:
+            genai = self.sdk()
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._models[name] = genai.GenerativeModel(name)
+        return model
+
+    def shedding_load(self) -> bool:
+        """True when new calls should use the fast tier (thresholds of 0 disable a check)"""
+        if 0 < settings.llm_fast_tier_in_flight <= self._in_flight:
+            return True
+        if settings.llm_fast_tier_queue_depth > 0:
+            from backend.services.agent_jobs import agent_jobs
+            return agent_jobs.queued >= settings.llm_fast_tier_queue_depth
+        return False
+
+    def resolve(self, tier: str) -> Dict:
+        """Tier config for the next call, switched to the fast model while shedding load"""
+        config = tier_config(tier)
+        config["fallback"] = config["model"] != settings.gemini_fast_model and self.shedding_load()
+        if config["fallback"]:
+            config["model"] = settings.gemini_fast_model
+        return config
+
+    async def generate(self, tier: str, prompt: str, schema: Optional[Type[BaseModel]] = None) -> str:
+        """
+        Run `prompt` on the tier's model and return the response text
+
+        Raises:
+            asyncio.TimeoutError: if the call exceeds the tier's timeout
+            RuntimeError: if no API key is configured
+        """
+        config = self.resolve(tier)
+        model = self.model(config["model"])
+        if config["fallback"]:
+            metrics.incr(f"llm_fast_tier_fallbacks.{tier}")
+        self._in_flight += 1
+        metrics.set_gauge("llm_calls_in_flight", self._in_flight)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, generation_config=generation_config(config, schema)),
+                timeout=config["timeout_seconds"]
+            )
+        except asyncio.TimeoutError:
+            metrics.incr(f"llm_timeouts.{tier}")
+            raise
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("llm_calls_in_flight", self._in_flight)
+            metrics.set_gauge(f"llm_last_seconds.{tier}", time.perf_counter() - started)
+        metrics.incr(f"llm_calls.{tier}")
+        return response.text
+
+    async def stream(self, tier: str, prompt: str, schema: Optional[Type[BaseModel]] = None) -> AsyncIterator[str]:
+        """
+        Yield the reply text of `prompt` on the tier's model as it is generated
+
+        The tier's timeout covers the whole reply. Close the iterator (e.g.
+        contextlib.aclosing) when stopping early; that also ends the request.
+
+        Raises:
+            asyncio.TimeoutError: if the reply is not complete within the tier's timeout
+            RuntimeError: if no API key is configured
+        """
+        config = self.resolve(tier)
+        model = self.model(config["model"])
+        if config["fallback"]:
+            metrics.incr(f"llm_fast_tier_fallbacks.{tier}")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config["timeout_seconds"]
+        self._in_flight += 1
+        metrics.set_gauge("llm_calls_in_flight", self._in_flight)
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                model.generate_content_async(prompt, generation_config=generation_config(config, schema), stream=True),
+                timeout=config["timeout_seconds"]
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                try:
+                    text = chunk.text
+                except ValueError:  # chunk without text parts (e.g. only a finish reason)
+                    continue
+                yield text
+        except asyncio.TimeoutError:
+            metrics.incr(f"llm_timeouts.{tier}")
+            raise
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("llm_calls_in_flight", self._in_flight)
+            metrics.set_gauge(f"llm_last_seconds.{tier}", time.perf_counter() - started)
+        metrics.incr(f"llm_calls.{tier}")
+
+    def reset(self) -> None:
+        """Drop cached models (e.g. after changing the API key in tests)"""
+        with self._lock:
+            self._models.clear()
+            self._genai = None
+
+
+# Singleton instance
+llm = GeminiProvider()
@@ -0,0 +1,126 @@
+"""
+Pydantic models for the JSON the LLM returns, and the Gemini response schemas derived from them
+
+Requests for triage and fact extraction ask for application/json constrained
+by these schemas; replies are read with the tolerant parser in
+backend/services/json_stream.py and validated here, keeping whatever is valid.
+
+Gemini emits schema properties in alphabetical order (this SDK cannot send a
+property ordering), so the triage reason is serialized as "triage_reason" to
+come after "risk_level": the risk level arrives before the free-text reason.
+"""
+from typing import Any, Dict, List, Literal, Optional, Type
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+RiskLevelValue = Literal["HIGH", "MEDIUM", "LOW"]
+ESCALATING_LEVELS = ("HIGH", "MEDIUM")
+
+
+class RiskAssessmentOutput(BaseModel):
+    """Triage reply"""
+    model_config = ConfigDict(populate_by_name=True)
+
+    risk_level: RiskLevelValue
+    reason: str = Field(default="", alias="triage_reason", description="Brief explanation of the risk level")
+    confidence: Literal["HIGH", "MEDIUM", "LOW"] = "LOW"
+    requires_escalation: bool = False
+
+    @field_validator("risk_level", "confidence", mode="before")
+    @classmethod
+    def _upper(cls, value):
+        return value.strip().upper() if isinstance(value, str) else value
+
+    def to_assessment(self) -> Dict:
+        """Dict used by the agent; HIGH and MEDIUM always escalate"""
+        assessment = self.model_dump()
+        assessment["requires_escalation"] = self.requires_escalation or self.risk_level in ESCALATING_LEVELS
+        return assessment
+
+
+class MedicationFact(BaseModel):
+    name: str
+    action: Literal["ADD", "STOP", "UPDATE"]
+    status: Optional[Literal["ACTIVE", "STOPPED"]] = None
+
+
+class SymptomFact(BaseModel):
+    description: str
+    action: Literal["ADD", "REMOVE"]
+    severity: Optional[Literal["MILD", "MODERATE", "SEVERE"]] = None
+
+
+class AllergyFact(BaseModel):
+    allergen: str
+    action: Literal["ADD", "REMOVE"]
+    reaction: Optional[str] = None
+
+
+class ConditionFact(BaseModel):
+    name: str
+    action: Literal["ADD", "UPDATE"]
+    status: Optional[str] = None
+
+
+class ExtractedFactsOutput(BaseModel):
+    """Fact-extraction reply (empty lists when nothing new was mentioned)"""
+    medications: List[MedicationFact] = []
+    symptoms: List[SymptomFact] = []
+    allergies: List[AllergyFact] = []
+    conditions: List[ConditionFact] = []
+
+
+def parse_facts(data: Any) -> Dict[str, List[Dict]]:
+    """Validate facts item by item: a malformed entry is dropped, the rest are kept"""
+    facts = {field: [] for field in ExtractedFactsOutput.model_fields}
+    if not isinstance(data, dict):
+        return facts
+    for field, info in ExtractedFactsOutput.model_fields.items():
+        item_model = info.annotation.__args__[0]
+        items = data.get(field)
+        for item in items if isinstance(items, list) else []:
+            try:
+                facts[field].append(item_model.model_validate(item).model_dump(exclude_none=True))
+            except ValidationError:
+                continue
+    return facts
+
+
+# JSON Schema keywords the Gemini response schema understands
+_SCHEMA_KEYS = {"type", "format", "description", "nullable", "enum", "items", "properties", "required"}
+
+
+def response_schema(model: Type[BaseModel]) -> Dict:
+    """
+    Gemini response schema (OpenAPI subset) for a pydantic model
+
+    Inlines $ref/$defs, turns Optional[...] into nullable and Literal into
+    string enums, and drops keywords Gemini rejects (title, default, ...).
+    Properties use their aliases.
+    """
+    schema = model.model_json_schema(by_alias=True)
+    definitions = schema.pop("$defs", {})
+
+    def convert(node: Dict) -> Dict:
+        if "$ref" in node:
+            return convert(definitions[node["$ref"].split("/")[-1]])
+        variants = node.get("anyOf")
+        if variants:
+            concrete = [variant for variant in variants if variant.get("type") != "null"]
+            converted = convert(concrete[0])
+            if len(concrete) < len(variants):
+                converted["nullable"] = True
+            if node.get("description"):
+                converted["description"] = node["description"]
+            return converted
+        converted = {key: value for key, value in node.items() if key in _SCHEMA_KEYS}
+        if "enum" in converted:
+            converted["type"] = "string"
+            converted["format"] = "enum"
+        if "properties" in converted:
+            converted["type"] = "object"
+            converted["properties"] = {name: convert(value) for name, value in converted["properties"].items()}
+        if "items" in converted:
+            converted["items"] = convert(converted["items"])
+        return converted
+
+    return convert(schema)
@@ -0,0 +1,101 @@
+"""
+Debounced per-conversation batching of patient messages
+
+Patients often send several short messages in a row ("I have a rash",
+"on my arm", "since Tuesday"). With a coalescing window, messages that arrive
+within `window_ms` of each other are collected and the LLM stages of the
+agent run once over the batch. The window restarts on every message but a
+batch never waits longer than `max_wait_ms` after its first message or grows
+beyond `max_messages`.
+
+Callers that need an immediate run (a HIGH-risk keyword match) submit with
+`immediate=True`, which closes the batch and runs it right away together with
+any messages already waiting.
+
+Batches live in this worker process: messages for one conversation that land
+on different workers are batched separately.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from backend.config import get_settings
+
+settings = get_settings()
+
+BatchRunner = Callable[[List[Any]], Awaitable[Any]]
+
+
+class _Batch:
+    def __init__(self, runner: BatchRunner):
+        self.items: List[Any] = []
+        self.runner = runner
+        self.started_at = time.monotonic()
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MessageCoalescer:
+    """Collect items per key and run each batch once"""
+
+    def __init__(self, window_ms: int, max_wait_ms: int, max_messages: int):
+        self.window = window_ms / 1000
+        self.max_wait = max(window_ms, max_wait_ms) / 1000
+        self.max_messages = max(1, max_messages)
+        self._batches: Dict[str, _Batch] = {}
+        self._running = set()  # Keeps batch tasks referenced until they finish (the loop holds only weak references)
+
+    async def submit(self, key: str, item: Any, runner: BatchRunner, immediate: bool = False) -> Tuple[List[Any], Any]:
+        """
+        Add an item to the key's open batch (opening one if needed) and wait for the batch to run
+
+        The runner of the batch's first item is used. Every submitter of a
+        batch receives the same (items, result); if the runner raises, every
+        submitter gets the exception.
+        """
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(runner)
+        batch.items.append(item)
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+        remaining = batch.started_at + self.max_wait - time.monotonic()
+        if immediate or len(batch.items) >= self.max_messages or remaining <= 0:
+            self._close(key, batch)
+        else:
+            batch.timer = asyncio.get_running_loop().call_later(min(self.window, remaining), self._close, key, batch)
+
+        # shield: a disconnecting client must not cancel the run for the whole batch
+        return batch.items, await asyncio.shield(batch.result)
+
+    def pending(self, key: str) -> int:
+        """Number of items waiting in the key's open batch"""
+        batch = self._batches.get(key)
+        return len(batch.items) if batch else 0
+
+    @property
+    def running(self) -> int:
+        """Number of closed batches whose run has not finished"""
+        return len(self._running)
+
+    def _close(self, key: str, batch: _Batch) -> None:
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run(batch: _Batch) -> None:
+        try:
+            batch.result.set_result(await batch.runner(list(batch.items)))
+        except Exception as e:
+            batch.result.set_exception(e)
+
+
+# Singleton instance
+message_coalescer = MessageCoalescer(
+    window_ms=settings.message_coalesce_window_ms,
+    max_wait_ms=settings.message_coalesce_max_wait_ms,
+    max_messages=settings.message_coalesce_max_messages
+)
@@ -0,0 +1,40 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class MetricsRegistry:
+    """In-process counters and gauges exposed on /metrics (no PHI, names and numbers only)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+    
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increment a monotonic counter"""
+        with self._lock:
+            self._counters[name] += value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a point-in-time gauge value"""
+        with self._lock:
+            self._gauges[name] = value
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Return a copy of all metrics"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges)
+            }
+    
+    def reset(self) -> None:
+        """Clear all metrics (used by tests and benchmarks)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+# Singleton instance
+metrics = MetricsRegistry()
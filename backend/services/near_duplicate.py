@@ -0,0 +1,171 @@
+"""
+Near-duplicate detection for reusing risk and fact-extraction results
+
+Chronic-care patients send many messages that differ only in punctuation,
+casing or filler words ("Blood sugar 140 this morning." / "blood sugar 140 this
+morning, thanks"). Each redacted message gets a 64-bit SimHash over its
+normalized words and word bigrams. Results of the LLM triage and fact
+extraction are cached per signature, and a new message whose signature is
+within `max_distance` bits of a recent one reuses them.
+
+Lookups use the pigeonhole principle: the signature is split into
+max_distance + 1 bands and two signatures within max_distance bits share at
+least one band exactly, so only entries in matching bands are compared.
+
+Numbers and negations change the clinical meaning while barely moving a
+SimHash ("sugar 40" vs "sugar 140", "no chest pain"), so they must match
+exactly. Messages shorter than `min_words` are never matched. Callers keep
+HIGH-risk keyword messages out of the cache entirely, and pass a `scope` when
+a result also depends on more than the message: triage is scoped to the
+conversation and a hash of its rolling summary (the same words can be LOW in
+one context and HIGH in another), fact extraction to patient and profile
+version. Results are never shared across patients.
+
+The cache is per worker process and holds redacted text signatures and
+results only.
+"""
+import copy
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from backend.config import get_settings
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+SIGNATURE_BITS = 64
+
+FILLER_WORDS = {
+    "um", "uh", "er", "hmm", "like", "just", "so", "well", "hi", "hello", "hey",
+    "please", "thanks", "thank", "ok", "okay", "actually", "basically", "anyway"
+}
+NEGATIONS = {"no", "not", "never", "none", "nothing", "without", "cannot", "can't", "don't", "didn't", "isn't", "wasn't", "won't"}
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_NUMBER = re.compile(r"\d")
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercased words without punctuation and filler words"""
+    return [word for word in _TOKEN.findall(text.lower()) if word not in FILLER_WORDS]
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(words: List[str]) -> int:
+    """64-bit SimHash of the words and word bigrams"""
+    counts = [0] * SIGNATURE_BITS
+    for feature in words + [f"{first} {second}" for first, second in zip(words, words[1:])]:
+        hashed = _hash64(feature)
+        for bit in range(SIGNATURE_BITS):
+            counts[bit] += 1 if hashed >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIGNATURE_BITS) if counts[bit] > 0)
+
+
+def signature(text: str) -> Tuple[int, Tuple[str, ...], int]:
+    """(SimHash, numbers and negations that must match exactly, word count)"""
+    words = normalize(text)
+    guard = tuple(word for word in words if word in NEGATIONS or _NUMBER.search(word))
+    return simhash(words), guard, len(words)
+
+
+class NearDuplicateCache:
+    """TTL + LRU cache of results per message signature with banded near-duplicate lookup"""
+
+    def __init__(self, max_entries: int, max_distance: int, ttl_seconds: int, min_words: int):
+        self.max_entries = max_entries
+        self.max_distance = max(0, min(max_distance, SIGNATURE_BITS // 2 - 1))
+        self.ttl_seconds = ttl_seconds
+        self.min_words = min_words
+        self._bands = self.max_distance + 1
+        self._band_bits = -(-SIGNATURE_BITS // self._bands)  # ceil
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._index: Dict[Tuple[int, int], Set[Tuple]] = {}
+        self._lookups: Dict[str, List[int]] = {}  # kind -> [hits, lookups]
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _band_keys(self, simhash_value: int) -> List[Tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(band, simhash_value >> (band * self._band_bits) & mask) for band in range(self._bands)]
+
+    def _find(self, text: str, scope: str) -> Optional[Tuple]:
+        simhash_value, guard, words = signature(text)
+        if words < self.min_words:
+            return None
+        now = time.monotonic()
+        best, best_distance = None, None
+        for band_key in self._band_keys(simhash_value):
+            for key in self._index.get(band_key, ()):
+                if key[1] != guard or key[2] != scope or self._entries[key]["expires"] < now:
+                    continue
+                distance = bin(key[0] ^ simhash_value).count("1")
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best, best_distance = key, distance
+        return best
+
+    def get(self, kind: str, text: str, scope: str = "") -> Optional[Any]:
+        """Cached `kind` result of a near-duplicate of `text` within `scope`, or None"""
+        if not self.enabled:
+            return None
+        key = self._find(text, scope)
+        result = self._entries[key]["results"].get(kind) if key else None
+        self._record(kind, hit=result is not None)
+        if result is None:
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(result)
+
+    def put(self, kind: str, text: str, result: Any, scope: str = "") -> None:
+        """Remember the `kind` result computed for `text`"""
+        if not self.enabled:
+            return
+        simhash_value, guard, words = signature(text)
+        if words < self.min_words:
+            return
+        key = (simhash_value, guard, scope)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {"results": {}}
+            for band_key in self._band_keys(simhash_value):
+                self._index.setdefault(band_key, set()).add(key)
+        entry["expires"] = time.monotonic() + self.ttl_seconds
+        entry["results"][kind] = copy.deepcopy(result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._index.clear()
+
+    def _evict(self, key: Tuple) -> None:
+        del self._entries[key]
+        for band_key in self._band_keys(key[0]):
+            members = self._index.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._index[band_key]
+
+    def _record(self, kind: str, hit: bool) -> None:
+        stats = self._lookups.setdefault(kind, [0, 0])
+        stats[0] += hit
+        stats[1] += 1
+        metrics.incr(f"near_duplicate_cache.{kind}.{'hits' if hit else 'misses'}")
+        metrics.set_gauge(f"near_duplicate_cache.{kind}.hit_rate", stats[0] / stats[1])
+
+
+# Singleton instance
+near_duplicate_cache = NearDuplicateCache(
+    max_entries=settings.near_duplicate_cache_size,
+    max_distance=settings.near_duplicate_max_distance,
+    ttl_seconds=settings.near_duplicate_ttl_seconds,
+    min_words=settings.near_duplicate_min_words
+)
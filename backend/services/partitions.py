@@ -0,0 +1,213 @@
+"""
+Monthly range partitions for messages and audit_logs
+
+Both tables are declared PARTITION BY RANGE on their timestamp column. This
+module keeps partitions for the next few months in place (run by the baseline
+migration / init_db and periodically from the app) and archives old months: the partition is detached,
+exported to gzip-compressed NDJSON next to a small manifest, and dropped.
+
+Run:
+    python -m backend.services.partitions ensure
+    python -m backend.services.partitions archive [--retention-months N]
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from backend.config import get_settings
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    "messages": "created_at",
+    "audit_logs": "timestamp",
+}
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + (moment.month - 1) + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_{start.year:04d}_{start.month:02d}"
+
+
+def _partition_month(table: str, name: str) -> Optional[datetime]:
+    match = re.fullmatch(rf"{table}_(\d{{4}})_(\d{{2}})", name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_ddl(now: Optional[datetime] = None, months_ahead: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    (partition name, CREATE statement) pairs for the current month, the next
+    `months_ahead` months and the default partition of every partitioned table
+
+    The default partition only catches rows outside every range (clock skew);
+    it should stay empty, otherwise creating a partition for that range fails.
+    """
+    first = month_start(now or datetime.utcnow())
+    ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    statements = []
+
+    for table in PARTITIONED_TABLES:
+        for offset in range(ahead + 1):
+            start = add_months(first, offset)
+            name = partition_name(table, start)
+            statements.append((name, (
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+            )))
+        statements.append((f"{table}_default", f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+    return statements
+
+
+async def ensure_partitions(conn, now: Optional[datetime] = None, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Create any missing monthly partitions (no-op for existing ones)
+
+    Returns:
+        Names of the monthly partitions that were checked/created
+    """
+    names = []
+    for name, statement in partition_ddl(now, months_ahead):
+        await conn.execute(text(statement))
+        if not name.endswith("_default"):
+            names.append(name)
+    return names
+
+
+async def _export_partition(conn, table: str, name: str, archive_dir: str) -> Dict:
+    """Stream one (detached) partition into <archive_dir>/<name>.ndjson.gz"""
+    path = os.path.join(archive_dir, f"{name}.ndjson.gz")
+    tmp_path = path + ".tmp"
+    rows = 0
+
+    stream = await conn.stream(
+        text(f"SELECT row_to_json(t)::text FROM {name} t ORDER BY {PARTITIONED_TABLES[table]}")
+        .execution_options(yield_per=5000)
+    )
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+        async for (line,) in stream:
+            archive.write(line + "\n")
+            rows += 1
+    with open(tmp_path, "rb") as written:
+        os.fsync(written.fileno())
+        digest = hashlib.sha256(written.read()).hexdigest()
+    os.replace(tmp_path, path)
+
+    start = _partition_month(table, name)
+    manifest = {
+        "table": table,
+        "partition": name,
+        "range_start": start.isoformat(),
+        "range_end": add_months(start, 1).isoformat(),
+        "rows": rows,
+        "file": os.path.basename(path),
+        "sha256": digest,
+        "archived_at": datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(archive_dir, f"{name}.manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+async def archive_partitions(
+    retention_months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Detach, export and drop every monthly partition older than the retention window
+
+    Each step commits on its own, and a partition is dropped only after its
+    export is on disk. A run interrupted after the detach picks the detached
+    table up again next time.
+
+    Returns:
+        One manifest per archived partition
+    """
+    from backend.database import engine
+
+    retention = settings.partition_retention_months if retention_months is None else retention_months
+    archive_dir = archive_dir or settings.partition_archive_dir
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention)
+    os.makedirs(archive_dir, exist_ok=True)
+    manifests = []
+
+    for table in PARTITIONED_TABLES:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT relname, relispartition FROM pg_class WHERE relkind = 'r' AND relname LIKE :pattern"),
+                {"pattern": f"{table}\\_%"}
+            )
+            candidates = sorted(
+                (name, attached) for name, attached in result.all()
+                if (_partition_month(table, name) or cutoff) < cutoff
+            )
+
+        for name, attached in candidates:
+            if attached:
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+
+            async with engine.connect() as conn:
+                manifest = await _export_partition(conn, table, name, archive_dir)
+
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP TABLE {name}"))
+
+            manifests.append(manifest)
+            metrics.incr("partitions.archived")
+            metrics.incr("partitions.archived_rows", manifest["rows"])
+            print(f"[OK] Archived {name} ({manifest['rows']} rows)")
+
+    return manifests
+
+
+async def partition_maintenance_loop(interval_seconds: int):
+    """Keep upcoming partitions in place inside a worker: once at startup, then every interval_seconds"""
+    from backend.database import engine
+
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await ensure_partitions(conn)
+        except Exception as e:
+            print(f"Error creating partitions: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def _ensure() -> List[str]:
+    from backend.database import engine
+
+    async with engine.begin() as conn:
+        return await ensure_partitions(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of messages and audit_logs")
+    parser.add_argument("command", choices=["ensure", "archive"])
+    parser.add_argument("--retention-months", type=int, default=None, help="Months to keep attached")
+    parser.add_argument("--archive-dir", default=None, help="Where archived partitions are written")
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        names = asyncio.run(_ensure())
+        print(f"[OK] {len(names)} partitions in place")
+    else:
+        manifests = asyncio.run(archive_partitions(args.retention_months, args.archive_dir))
+        print(f"[OK] Archived {len(manifests)} partitions")
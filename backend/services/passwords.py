@@ -0,0 +1,79 @@
+"""
+Password hashing off the event loop
+
+bcrypt costs ~100ms+ of CPU per hash or check. Run inline, every login stalls
+the worker's event loop (and every chat request on it) for that long. Here
+both operations run on a small, bounded thread pool; bcrypt releases the GIL
+while hashing, so threads give real parallelism without process start-up or
+pickling costs.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import bcrypt
+from backend.config import get_settings
+from backend.services.metrics import metrics
+
+settings = get_settings()
+
+
+def hash_password_sync(password: str) -> str:
+    """Hash a password with a fresh salt (blocking)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def verify_password_sync(password: str, password_hash: str) -> bool:
+    """Check a password against a bcrypt hash (blocking)"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool; at most `workers` hashes run at once, the rest queue"""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        with self._lock:
+            self._in_flight += 1
+            metrics.set_gauge("password_hash_in_flight", self._in_flight)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                metrics.set_gauge("password_hash_in_flight", self._in_flight)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop"""
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Verify a password without blocking the event loop"""
+        return await self._run(verify_password_sync, password, password_hash)
+
+    def shutdown(self) -> None:
+        """Stop the pool (queued checks finish first)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# Singleton instance
+password_hasher = PasswordHasher(settings.password_hash_workers)
@@ -0,0 +1,57 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.services.metrics import metrics
+
+
+class KeyedLock:
+    """
+    In-process async lock per key (e.g., patient_id)
+    
+    Work for the same key runs one at a time; different keys never wait on
+    each other. Lock objects are dropped as soon as nobody holds or waits on
+    them, so memory stays proportional to in-flight patients.
+    """
+    
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+    
+    @asynccontextmanager
+    async def hold(self, key: str):
+        """Hold the lock for `key` for the duration of the block"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        elif lock.locked():
+            metrics.incr("patient_lock.contended")
+        self._users[key] = self._users.get(key, 0) + 1
+        
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if self._users[key] == 0:
+                del self._users[key]
+                del self._locks[key]
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+async def acquire_profile_advisory_lock(db: AsyncSession, patient_id) -> None:
+    """
+    Serialize profile writers across workers with a transaction-scoped
+    Postgres advisory lock (released automatically on commit/rollback)
+    """
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"),
+        {"key": f"patient_profile:{patient_id}"}
+    )
+
+
+# Singleton instance
+patient_locks = KeyedLock()
@@ -0,0 +1,234 @@
+"""
+Profile compaction job - keeps PatientProfile.symptoms bounded
+
+Resolved symptoms and repeated mentions of the same symptom are collapsed into
+summarized entries; raw entries that leave the active profile are archived to
+the symptom_history table so provenance is never lost.
+
+Run once:
+    python -m backend.services.profile_compaction
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.models.patient_profile import PatientProfile
+from backend.models.symptom_history import SymptomHistory
+from backend.services.metrics import metrics
+from backend.services.profile_history import make_event, record_profile_events, SYMPTOMS_COMPACTED, PROFILE_FIELDS
+from backend.services.patient_lock import acquire_profile_advisory_lock
+from backend.services.profile_store import invalidate_after_commit, profile_to_dict
+
+settings = get_settings()
+
+SEVERITY_RANK = {"MILD": 0, "MODERATE": 1, "SEVERE": 2}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def profile_size(profile: Dict) -> Tuple[int, int]:
+    """
+    Measure how much a profile costs when serialized into a prompt
+
+    Returns:
+        Tuple of (bytes, estimated_prompt_tokens) for the json.dumps of every field,
+        which is what the fact-extraction and SBAR prompts embed.
+    """
+    serialized = "".join(json.dumps(profile.get(field) or []) for field in PROFILE_FIELDS)
+    return len(serialized.encode("utf-8")), estimate_tokens(serialized)
+
+
+def _normalize_description(description: Optional[str]) -> str:
+    return " ".join((description or "").lower().split())
+
+
+def compact_symptoms(symptoms: List[Dict], window: int) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+    """
+    Collapse a symptom list into a bounded active list
+
+    - Entries with status RESOLVED are archived
+    - Repeated mentions of the same description are merged into one summarized
+      entry (highest severity, occurrence count, first and latest provenance)
+    - Only the `window` most recently mentioned symptoms stay active
+
+    Args:
+        symptoms: Current PatientProfile.symptoms (oldest first)
+        window: Maximum number of active entries to keep
+
+    Returns:
+        Tuple of (active_symptoms, archived) where archived is a list of
+        (raw_entry, archive_reason) pairs
+    """
+    archived: List[Tuple[Dict, str]] = []
+    groups: Dict[str, List[Dict]] = {}
+
+    for entry in symptoms:
+        if not isinstance(entry, dict):
+            continue
+        if entry.get("status") == "RESOLVED":
+            archived.append((entry, "RESOLVED"))
+            continue
+        groups.setdefault(_normalize_description(entry.get("description")), []).append(entry)
+
+    # Order groups by their most recent mention so the window keeps the freshest symptoms
+    merged: List[Tuple[int, Dict]] = []
+    position = {id(entry): index for index, entry in enumerate(symptoms)}
+    for entries in groups.values():
+        latest = entries[-1]
+        if len(entries) == 1:
+            merged.append((position[id(latest)], latest))
+            continue
+
+        severity = max(
+            (entry.get("severity", "MODERATE") for entry in entries),
+            key=lambda value: SEVERITY_RANK.get(value, 1)
+        )
+        first = entries[0]
+        merged.append((position[id(latest)], {
+            "description": latest.get("description"),
+            "severity": severity,
+            "occurrences": sum(entry.get("occurrences", 1) for entry in entries),
+            "provenance_message_id": latest.get("provenance_message_id"),
+            "first_provenance_message_id": first.get("first_provenance_message_id", first.get("provenance_message_id")),
+            "summarized": True
+        }))
+        archived.extend((entry, "DUPLICATE") for entry in entries)
+
+    merged.sort(key=lambda item: item[0])
+    active = [entry for _, entry in merged]
+
+    if window >= 0 and len(active) > window:
+        overflow = len(active) - window
+        archived.extend((entry, "WINDOW") for entry in active[:overflow])
+        active = active[overflow:]
+
+    return active, archived
+
+
+async def compact_profile(db: AsyncSession, profile: PatientProfile, window: Optional[int] = None) -> Dict:
+    """
+    Compact a single patient profile in place and archive removed entries
+
+    Returns:
+        Dict with archived count and before/after bytes and prompt tokens
+    """
+    window = settings.profile_active_symptom_window if window is None else window
+    
+    # Take the same lock as memory_update_node and re-read so no concurrent fact is lost
+    await acquire_profile_advisory_lock(db, profile.patient_id)
+    await db.refresh(profile)
+    
+    bytes_before, tokens_before = profile_size(profile_to_dict(profile))
+
+    active, archived = compact_symptoms(profile.symptoms or [], window)
+
+    if archived:
+        for entry, reason in archived:
+            db.add(SymptomHistory(
+                patient_id=profile.patient_id,
+                entry=entry,
+                archive_reason=reason
+            ))
+        await record_profile_events(db, profile, [
+            make_event(SYMPTOMS_COMPACTED, {"symptoms": active, "archived": len(archived)})
+        ])
+        await db.flush()
+        invalidate_after_commit(db, profile.patient_id)
+
+    bytes_after, tokens_after = profile_size(profile_to_dict(profile))
+
+    return {
+        "archived": len(archived),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after
+    }
+
+
+async def run_compaction(window: Optional[int] = None, batch_size: int = 200) -> Dict:
+    """
+    Compact every profile that has symptoms, committing per profile
+
+    Returns:
+        Aggregate metrics for the whole run
+    """
+    from backend.database import AsyncSessionLocal
+
+    totals = {
+        "profiles_scanned": 0,
+        "profiles_compacted": 0,
+        "archived": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+        "tokens_before": 0,
+        "tokens_after": 0
+    }
+
+    last_id = None
+    while True:
+        # batch_size only pages the candidate query; the ids are read without holding any lock
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(PatientProfile.id)
+                .where(func.jsonb_array_length(PatientProfile.symptoms) > 0)
+                .order_by(PatientProfile.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(PatientProfile.id > last_id)
+
+            result = await db.execute(query)
+            profile_ids = result.scalars().all()
+        if not profile_ids:
+            break
+
+        for profile_id in profile_ids:
+            # One transaction per profile, so its advisory lock is released right after its commit
+            async with AsyncSessionLocal() as db:
+                profile = await db.get(PatientProfile, profile_id)
+                if profile is None:
+                    continue
+                stats = await compact_profile(db, profile, window)
+                await db.commit()
+
+            totals["profiles_scanned"] += 1
+            if stats["archived"]:
+                totals["profiles_compacted"] += 1
+            for key in ("archived", "bytes_before", "bytes_after", "tokens_before", "tokens_after"):
+                totals[key] += stats[key]
+
+        last_id = profile_ids[-1]
+
+    metrics.incr("profile_compaction.runs")
+    metrics.incr("profile_compaction.archived_entries", totals["archived"])
+    for key in ("bytes_before", "bytes_after", "tokens_before", "tokens_after"):
+        metrics.set_gauge(f"profile_compaction.last_{key}", totals[key])
+
+    return totals
+
+
+async def compaction_loop(interval_seconds: int):
+    """Run compaction periodically inside a worker (optional, see settings)"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            totals = await run_compaction()
+            print(f"[OK] Profile compaction: {totals}")
+        except Exception as e:
+            print(f"Error in profile compaction: {e}")
+
+
+if __name__ == "__main__":
+    totals = asyncio.run(run_compaction())
+    print("[OK] Profile compaction complete")
+    print(f"  Profiles scanned:   {totals['profiles_scanned']}")
+    print(f"  Profiles compacted: {totals['profiles_compacted']}")
+    print(f"  Entries archived:   {totals['archived']}")
+    print(f"  Profile bytes:      {totals['bytes_before']} -> {totals['bytes_after']}")
+    print(f"  Prompt tokens:      {totals['tokens_before']} -> {totals['tokens_after']}")
@@ -0,0 +1,202 @@
+"""
+Precomputed prompt context for a patient profile
+
+The digest is stored on PatientProfile.context_digest and kept in step with
+the profile: every profile event updates only the category it touches, so the
+response, fact-extraction and SBAR prompt builders read ready-made strings
+instead of re-walking (or json.dumps-ing) the whole profile on every turn.
+"""
+import copy
+from typing import Dict, List, Optional
+from backend.config import get_settings
+from backend.services.profile_history import (
+    MEDICATION_ADDED,
+    MEDICATION_STOPPED,
+    SYMPTOM_ADDED,
+    SYMPTOM_RESOLVED,
+    ALLERGY_ADDED,
+    CONDITION_ADDED,
+    SYMPTOMS_COMPACTED,
+)
+
+settings = get_settings()
+
+# Bump when the digest layout or wording changes; stale digests are rebuilt
+DIGEST_FORMAT = 1
+
+NO_HISTORY = "No prior medical history available."
+
+_CONTEXT_LABELS = {
+    "medications": "Current medications",
+    "conditions": "Known conditions",
+    "allergies": "Allergies",
+    "symptoms": "Recent symptoms",
+}
+
+_BLOCK_LABELS = {
+    "medications": "Medications",
+    "symptoms": "Symptoms",
+    "allergies": "Allergies",
+    "conditions": "Conditions",
+}
+
+
+def _medication_item(entry) -> Optional[str]:
+    if isinstance(entry, dict) and entry.get("name") and entry.get("status", "ACTIVE") != "STOPPED":
+        return entry["name"]
+    return None
+
+
+def _symptom_item(entry) -> Optional[List]:
+    if isinstance(entry, dict) and entry.get("description") and entry.get("status") != "RESOLVED":
+        return [entry["description"], entry.get("severity", "MODERATE")]
+    return None
+
+
+def _allergy_item(entry) -> Optional[str]:
+    if isinstance(entry, str):
+        return entry
+    if isinstance(entry, dict) and entry.get("allergen"):
+        reaction = entry.get("reaction")
+        return f"{entry['allergen']} ({reaction})" if reaction and reaction != "Unknown" else entry["allergen"]
+    return None
+
+
+def _condition_item(entry) -> Optional[str]:
+    if isinstance(entry, str):
+        return entry
+    if isinstance(entry, dict) and entry.get("name"):
+        return entry["name"]
+    return None
+
+
+_ITEM_BUILDERS = {
+    "medications": _medication_item,
+    "symptoms": _symptom_item,
+    "allergies": _allergy_item,
+    "conditions": _condition_item,
+}
+
+
+def _render_items(field: str, items: List) -> str:
+    if field == "symptoms":
+        return ", ".join(f"{description} ({severity})" for description, severity in items)
+    return ", ".join(items)
+
+
+def _add_unique(items: List, item) -> None:
+    if item is not None and item not in items:
+        items.append(item)
+
+
+def _bound_symptoms(items: List) -> List:
+    window = settings.profile_active_symptom_window
+    return items[-window:] if window > 0 else items
+
+
+def _render_field(digest: Dict, field: str) -> None:
+    items = digest["items"][field]
+    rendered = _render_items(field, items)
+    digest["context_lines"][field] = f"{_CONTEXT_LABELS[field]}: {rendered}" if items else ""
+    digest["block_lines"][field] = f"- {_BLOCK_LABELS[field]}: {rendered or 'None recorded'}"
+
+
+def _join(digest: Dict) -> None:
+    context_lines = [digest["context_lines"][name] for name in _CONTEXT_LABELS if digest["context_lines"][name]]
+    digest["context"] = "\n".join(context_lines) if context_lines else NO_HISTORY
+    digest["block"] = "\n".join(digest["block_lines"][name] for name in _BLOCK_LABELS)
+
+
+def _render(digest: Dict, field: str) -> None:
+    """Re-render one category and the joined strings (constant work per event)"""
+    _render_field(digest, field)
+    _join(digest)
+
+
+def build_digest(profile: Dict, version: int = 0) -> Dict:
+    """Build a digest from a full profile dict (used for backfill and empty profiles)"""
+    digest = {
+        "format": DIGEST_FORMAT,
+        "version": version,
+        "items": {field: [] for field in _ITEM_BUILDERS},
+        "context_lines": {},
+        "block_lines": {},
+    }
+    for field, builder in _ITEM_BUILDERS.items():
+        for entry in profile.get(field) or []:
+            _add_unique(digest["items"][field], builder(entry))
+    digest["items"]["symptoms"] = _bound_symptoms(digest["items"]["symptoms"])
+
+    for field in _ITEM_BUILDERS:
+        _render_field(digest, field)
+    _join(digest)
+    return digest
+
+
+def is_current(digest: Optional[Dict], version: int) -> bool:
+    """True when a stored digest matches the profile version and digest format"""
+    return bool(digest) and digest.get("format") == DIGEST_FORMAT and digest.get("version") == version
+
+
+def apply_event_to_digest(digest: Dict, event: Dict, profile: Dict) -> None:
+    """
+    Update a digest in place for one profile event
+
+    Args:
+        digest: Current digest (must be current for the profile before the event)
+        event: Profile event (see backend/services/profile_history.py)
+        profile: Profile dict *after* the event was applied
+    """
+    event_type = event["event_type"]
+    payload = event["payload"]
+    items = digest["items"]
+
+    if event_type == MEDICATION_ADDED:
+        field = "medications"
+        _add_unique(items[field], _medication_item(payload))
+    elif event_type == MEDICATION_STOPPED:
+        field = "medications"
+        name = (payload.get("name") or "").lower()
+        items[field] = [item for item in items[field] if item.lower() != name]
+    elif event_type == SYMPTOM_ADDED:
+        field = "symptoms"
+        _add_unique(items[field], _symptom_item(payload))
+        items[field] = _bound_symptoms(items[field])
+    elif event_type == SYMPTOM_RESOLVED:
+        field = "symptoms"
+        description = (payload.get("description") or "").lower()
+        items[field] = [item for item in items[field] if item[0].lower() != description]
+    elif event_type == SYMPTOMS_COMPACTED:
+        field = "symptoms"
+        items[field] = []
+        for entry in profile.get("symptoms") or []:
+            _add_unique(items[field], _symptom_item(entry))
+        items[field] = _bound_symptoms(items[field])
+    elif event_type == ALLERGY_ADDED:
+        field = "allergies"
+        _add_unique(items[field], _allergy_item(payload))
+    elif event_type == CONDITION_ADDED:
+        field = "conditions"
+        _add_unique(items[field], _condition_item(payload))
+    else:
+        raise ValueError(f"Unknown profile event type: {event_type}")
+
+    _render(digest, field)
+
+
+def advance_digest(digest: Optional[Dict], base_version: int, events: List[Dict], profile: Dict) -> Dict:
+    """
+    Digest for the profile after `events`, updated incrementally when possible
+
+    Falls back to a full rebuild when the stored digest is missing, stale or
+    from an older format.
+    """
+    new_version = base_version + len(events)
+    if not is_current(digest, base_version):
+        return build_digest(profile, new_version)
+
+    digest = copy.deepcopy(digest)
+    for event in events:
+        apply_event_to_digest(digest, event, profile)
+    digest["version"] = new_version
+    return digest
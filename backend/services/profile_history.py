@@ -0,0 +1,246 @@
+"""
+Event-sourced patient profile history
+
+PatientProfile stays the materialized current state (single indexed lookup by
+patient_id). Every change to it is also appended to profile_events, and a full
+ProfileSnapshot is written every `profile_snapshot_interval` events so that
+"the profile as of date X" is the last snapshot before X plus its tail of events.
+"""
+import copy
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import attributes
+from backend.config import get_settings
+from backend.models.patient_profile import PatientProfile
+from backend.models.profile_history import ProfileEvent, ProfileSnapshot
+
+settings = get_settings()
+
+PROFILE_FIELDS = ("medications", "symptoms", "allergies", "conditions")
+
+# Event types
+MEDICATION_ADDED = "MEDICATION_ADDED"
+MEDICATION_STOPPED = "MEDICATION_STOPPED"
+SYMPTOM_ADDED = "SYMPTOM_ADDED"
+SYMPTOM_RESOLVED = "SYMPTOM_RESOLVED"
+ALLERGY_ADDED = "ALLERGY_ADDED"
+CONDITION_ADDED = "CONDITION_ADDED"
+SYMPTOMS_COMPACTED = "SYMPTOMS_COMPACTED"
+
+_APPEND_TARGETS = {
+    MEDICATION_ADDED: "medications",
+    SYMPTOM_ADDED: "symptoms",
+    ALLERGY_ADDED: "allergies",
+    CONDITION_ADDED: "conditions",
+}
+
+
+def empty_profile() -> Dict[str, List]:
+    """Profile dict with every field present and empty"""
+    return {field: [] for field in PROFILE_FIELDS}
+
+
+def make_event(event_type: str, payload: Dict, message_id: Optional[uuid.UUID] = None) -> Dict:
+    """Build an (unsaved) profile event"""
+    return {
+        "event_type": event_type,
+        "payload": payload,
+        "provenance_message_id": str(message_id) if message_id else None
+    }
+
+
+def facts_to_events(extracted_facts: Dict, message_id: uuid.UUID) -> List[Dict]:
+    """
+    Translate fact-extraction output into profile events
+
+    Args:
+        extracted_facts: Output of fact_extraction_node
+        message_id: Message the facts were extracted from (provenance)
+
+    Returns:
+        Ordered list of events to apply
+    """
+    if not isinstance(extracted_facts, dict):
+        return []
+
+    provenance = str(message_id)
+    added_at = datetime.utcnow().isoformat()
+    events = []
+
+    for med_update in extracted_facts.get("medications", []):
+        action = med_update.get("action")
+        if action == "ADD":
+            events.append(make_event(MEDICATION_ADDED, {
+                "name": med_update.get("name"),
+                "status": med_update.get("status", "ACTIVE"),
+                "provenance_message_id": provenance,
+                "added_at": added_at
+            }, message_id))
+        elif action == "STOP":
+            events.append(make_event(MEDICATION_STOPPED, {"name": med_update.get("name")}, message_id))
+
+    for symptom_update in extracted_facts.get("symptoms", []):
+        action = symptom_update.get("action")
+        if action == "ADD":
+            events.append(make_event(SYMPTOM_ADDED, {
+                "description": symptom_update.get("description"),
+                "severity": symptom_update.get("severity", "MODERATE"),
+                "provenance_message_id": provenance
+            }, message_id))
+        elif action == "REMOVE":
+            events.append(make_event(SYMPTOM_RESOLVED, {"description": symptom_update.get("description")}, message_id))
+
+    for allergy_update in extracted_facts.get("allergies", []):
+        if allergy_update.get("action") == "ADD":
+            events.append(make_event(ALLERGY_ADDED, {
+                "allergen": allergy_update.get("allergen"),
+                "reaction": allergy_update.get("reaction", "Unknown"),
+                "provenance_message_id": provenance
+            }, message_id))
+
+    for condition_update in extracted_facts.get("conditions", []):
+        if condition_update.get("action") == "ADD":
+            events.append(make_event(CONDITION_ADDED, {
+                "name": condition_update.get("name"),
+                "status": condition_update.get("status", "Active"),
+                "provenance_message_id": provenance
+            }, message_id))
+
+    return events
+
+
+def apply_event(profile: Dict[str, List], event: Dict) -> None:
+    """
+    Apply one event to a profile dict in place
+
+    This is the only place profile mutation semantics live; it is used both for
+    live updates and for point-in-time replay.
+    """
+    event_type = event["event_type"]
+    payload = event["payload"]
+    provenance = event.get("provenance_message_id")
+    if provenance is not None:
+        provenance = str(provenance)
+
+    if event_type in _APPEND_TARGETS:
+        profile[_APPEND_TARGETS[event_type]].append(copy.deepcopy(payload))
+
+    elif event_type == MEDICATION_STOPPED:
+        name = (payload.get("name") or "").lower()
+        for med in profile["medications"]:
+            if (med.get("name") or "").lower() == name:
+                med["status"] = "STOPPED"
+                med["provenance_message_id"] = provenance
+
+    elif event_type == SYMPTOM_RESOLVED:
+        # Mark as resolved; the compaction job archives resolved entries
+        description = (payload.get("description") or "").lower()
+        for symptom in profile["symptoms"]:
+            if (symptom.get("description") or "").lower() == description:
+                symptom["status"] = "RESOLVED"
+                symptom["provenance_message_id"] = provenance
+
+    elif event_type == SYMPTOMS_COMPACTED:
+        profile["symptoms"] = copy.deepcopy(payload["symptoms"])
+
+    else:
+        raise ValueError(f"Unknown profile event type: {event_type}")
+
+
+async def record_profile_events(db: AsyncSession, profile: PatientProfile, events: List[Dict]) -> None:
+    """
+    Apply events to the ORM profile and append them to the event log
+
+    Events are bulk-inserted in a single executemany; a snapshot is added when
+    the profile version crosses a multiple of `profile_snapshot_interval`.
+    The profile's context digest is advanced to the new version as well.
+    The caller is responsible for flushing/committing.
+    """
+    if not events:
+        return
+
+    for field in PROFILE_FIELDS:
+        if getattr(profile, field) is None:
+            setattr(profile, field, [])
+
+    state = {field: getattr(profile, field) for field in PROFILE_FIELDS}
+    base_version = profile.version or 0
+    interval = max(settings.profile_snapshot_interval, 1)
+
+    # Profiles that existed before the event log get a version-0 baseline snapshot
+    snapshots = []
+    if base_version == 0 and any(state.values()):
+        snapshots.append({"patient_id": profile.patient_id, "version": 0, "state": copy.deepcopy(state)})
+
+    rows = []
+    for offset, event in enumerate(events, start=1):
+        apply_event(state, event)
+        seq = base_version + offset
+        rows.append({
+            "patient_id": profile.patient_id,
+            "seq": seq,
+            "event_type": event["event_type"],
+            "payload": event["payload"],
+            "provenance_message_id": uuid.UUID(event["provenance_message_id"]) if event.get("provenance_message_id") else None
+        })
+        if seq % interval == 0:
+            snapshots.append({"patient_id": profile.patient_id, "version": seq, "state": copy.deepcopy(state)})
+
+    for field in PROFILE_FIELDS:
+        setattr(profile, field, state[field])
+        attributes.flag_modified(profile, field)
+    profile.version = base_version + len(events)
+    
+    # Keep the prompt context digest in step (only touched categories are re-rendered)
+    from backend.services.profile_digest import advance_digest
+    profile.context_digest = advance_digest(profile.context_digest, base_version, events, state)
+
+    await db.execute(insert(ProfileEvent), rows)
+    if snapshots:
+        await db.execute(insert(ProfileSnapshot), snapshots)
+
+
+async def get_profile_as_of(db: AsyncSession, patient_id: uuid.UUID, as_of: datetime) -> Dict:
+    """
+    Reconstruct a patient's profile as it was at `as_of`
+
+    Reads the last snapshot taken at or before `as_of` plus the events after it.
+
+    Returns:
+        Dict with the four profile fields and the reconstructed "version"
+    """
+    result = await db.execute(
+        select(ProfileSnapshot)
+        .where(ProfileSnapshot.patient_id == patient_id, ProfileSnapshot.created_at <= as_of)
+        .order_by(ProfileSnapshot.version.desc())
+        .limit(1)
+    )
+    snapshot = result.scalar_one_or_none()
+
+    state = copy.deepcopy(snapshot.state) if snapshot else empty_profile()
+    for field in PROFILE_FIELDS:
+        state.setdefault(field, [])
+    version = snapshot.version if snapshot else 0
+
+    result = await db.execute(
+        select(ProfileEvent)
+        .where(
+            ProfileEvent.patient_id == patient_id,
+            ProfileEvent.seq > version,
+            ProfileEvent.created_at <= as_of
+        )
+        .order_by(ProfileEvent.seq)
+    )
+    for event in result.scalars().all():
+        apply_event(state, {
+            "event_type": event.event_type,
+            "payload": event.payload,
+            "provenance_message_id": event.provenance_message_id
+        })
+        version = event.seq
+
+    state["version"] = version
+    return state
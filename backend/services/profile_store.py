@@ -0,0 +1,181 @@
+"""
+Patient profile access for the agent and the /profile endpoint
+
+ProfileUnitOfWork is created once per agent run: the profile row is loaded a
+single time, the same ORM object and dict view are handed to every node, and
+all staged changes are written once at the end of the run. The read and the
+write may happen in different short-lived sessions (no connection is held
+while the LLM runs): commit re-reads the row under the patient's advisory
+lock and applies the staged events to that latest version.
+
+ProfileReadCache is an optional cross-request cache for the read-only
+/profile endpoint, invalidated when a transaction that wrote the profile
+commits. It is per-process, so other workers may serve a stale profile for
+up to the TTL.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.models.patient_profile import PatientProfile
+from backend.services.metrics import metrics
+from backend.services.patient_lock import acquire_profile_advisory_lock
+from backend.services.profile_history import record_profile_events, PROFILE_FIELDS
+from backend.services.profile_digest import build_digest, is_current
+
+settings = get_settings()
+
+
+def profile_to_dict(profile: Optional[PatientProfile]) -> Dict[str, List]:
+    """Dict view of a profile row (empty lists when the patient has no profile yet)"""
+    if profile is None:
+        return {field: [] for field in PROFILE_FIELDS}
+    return {field: getattr(profile, field) or [] for field in PROFILE_FIELDS}
+
+
+class ProfileReadCache:
+    """Small TTL + LRU cache of rendered profile responses keyed by patient_id"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, patient_id) -> Optional[Dict]:
+        if self.ttl_seconds <= 0:
+            return None
+        key = str(patient_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            metrics.incr("profile_cache.misses")
+            return None
+        self._entries.move_to_end(key)
+        metrics.incr("profile_cache.hits")
+        return entry[1]
+
+    def put(self, patient_id, value: Dict) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        key = str(patient_id)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, patient_id) -> None:
+        self._entries.pop(str(patient_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def invalidate_after_commit(db: AsyncSession, patient_id: uuid.UUID) -> None:
+    """
+    Drop the patient's cached profile once db's transaction commits
+
+    Invalidating earlier (after flush) would let a /profile read in between
+    cache the pre-commit row again for the whole TTL.
+    """
+    event.listen(db.sync_session, "after_commit", lambda session: profile_cache.invalidate(patient_id), once=True)
+
+
+class ProfileUnitOfWork:
+    """Load-once / write-once access to one patient's profile during an agent run"""
+
+    def __init__(self, patient_id: uuid.UUID):
+        self.patient_id = patient_id
+        self.profile: Optional[PatientProfile] = None
+        self._loaded = False
+        self._locked = False
+        self._view: Optional[Dict] = None
+        self._digest: Optional[Dict] = None
+        self._pending_events: List[Dict] = []
+
+    async def load(self, db: AsyncSession, for_update: bool = False) -> Optional[PatientProfile]:
+        """
+        Fetch the profile row (only the first call hits the database)
+
+        Args:
+            db: Database session
+            for_update: Take the patient's advisory lock first; use when this
+                run is going to write the profile
+        """
+        if not self._loaded:
+            if for_update:
+                await acquire_profile_advisory_lock(db, self.patient_id)
+                self._locked = True
+            result = await db.execute(
+                select(PatientProfile).where(PatientProfile.patient_id == self.patient_id)
+            )
+            self.profile = result.scalar_one_or_none()
+            self._loaded = True
+        return self.profile
+
+    async def view(self, db: AsyncSession) -> Dict[str, List]:
+        """Dict view shared by every node (built once)"""
+        if self._view is None:
+            self._view = profile_to_dict(await self.load(db))
+        return self._view
+
+    async def digest(self, db: AsyncSession) -> Dict:
+        """Prompt context digest for the loaded profile (stored one when current)"""
+        if self._digest is None:
+            profile = await self.load(db)
+            version = (profile.version or 0) if profile else 0
+            stored = profile.context_digest if profile else None
+            self._digest = stored if is_current(stored, version) else build_digest(await self.view(db), version)
+        return self._digest
+
+    async def get_or_create(self, db: AsyncSession) -> PatientProfile:
+        """Profile row to mutate, creating an empty one if the patient has none"""
+        profile = await self.load(db, for_update=True)
+        if profile is None:
+            profile = PatientProfile(
+                patient_id=self.patient_id,
+                medications=[],
+                symptoms=[],
+                allergies=[],
+                conditions=[],
+                version=0
+            )
+            db.add(profile)
+            self.profile = profile
+        return profile
+
+    def stage(self, events: List[Dict]) -> None:
+        """Queue profile events to be written on commit"""
+        self._pending_events.extend(events)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self._pending_events)
+
+    async def commit(self, db: AsyncSession) -> None:
+        """Apply and persist all staged events in one write"""
+        if not self._pending_events:
+            return
+
+        if not self._locked:
+            # Read earlier without the lock (possibly in another session): re-read
+            # under it so the events land on the latest version
+            self._loaded = False
+        profile = await self.get_or_create(db)
+        events, self._pending_events = self._pending_events, []
+        await record_profile_events(db, profile, events)
+        await db.flush()
+
+        self._locked = False  # the advisory lock ends with the caller's transaction
+        self._view = None
+        self._digest = None
+        invalidate_after_commit(db, self.patient_id)
+
+
+# Singleton instance
+profile_cache = ProfileReadCache(
+    ttl_seconds=settings.profile_cache_ttl_seconds,
+    max_entries=settings.profile_cache_max_entries
+)
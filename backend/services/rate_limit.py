@@ -0,0 +1,206 @@
+"""
+Token-bucket rate limiting
+
+Each key (e.g. a login username) gets a bucket of `capacity` tokens that
+refills at `refill_per_second`. A request takes one token; when the bucket is
+empty the caller gets the number of seconds until the next token, for a
+Retry-After header. Buckets are kept in an LRU bounded by `max_keys`, so a
+flood of distinct keys cannot grow memory without limit (an evicted key just
+starts again with a full bucket).
+
+TokenBucketLimiter limits are per worker process. Patient messages go through
+message_limiter, which checks a per-conversation and a per-patient bucket and
+can keep them in Redis (message_rate_limit_backend="redis") so the limits hold
+across workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+from backend.config import get_settings
+
+settings = get_settings()
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets"""
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        max_keys: int = 10000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1) -> float:
+        """
+        Take `cost` tokens from the key's bucket
+
+        Returns:
+            0 if allowed, otherwise the seconds to wait before retrying
+        """
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+            retry_after = self._wait(tokens, cost)
+            if retry_after == 0:
+                tokens -= cost
+
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def peek(self, key: str, cost: float = 1) -> float:
+        """Like acquire, but without taking tokens"""
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            return self._wait(min(self.capacity, tokens + (now - updated_at) * self.refill_per_second), cost)
+
+    def _wait(self, tokens: float, cost: float) -> float:
+        if tokens >= cost:
+            return 0.0
+        if self.refill_per_second > 0:
+            return (cost - tokens) / self.refill_per_second
+        return float("inf")
+
+    def reset(self, key: str = None) -> None:
+        """Forget one key's bucket, or all of them"""
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class MessageRateLimiter:
+    """Per-conversation and per-patient buckets in this process; a message takes a token from both or neither"""
+
+    def __init__(self, conversation: Optional[TokenBucketLimiter], patient: Optional[TokenBucketLimiter]):
+        self._buckets = [
+            (prefix, limiter)
+            for prefix, limiter in (("conversation", conversation), ("patient", patient))
+            if limiter is not None
+        ]
+        self._lock = threading.Lock()
+
+    async def acquire(self, patient_id: str, conversation_id: str) -> float:
+        """0 if the message may go to the agent, otherwise seconds until it may"""
+        keys = {"conversation": conversation_id, "patient": patient_id}
+        with self._lock:
+            retry_after = max((limiter.peek(keys[prefix]) for prefix, limiter in self._buckets), default=0.0)
+            if retry_after == 0:
+                for prefix, limiter in self._buckets:
+                    limiter.acquire(keys[prefix])
+        return retry_after
+
+
+class RedisMessageRateLimiter:
+    """
+    The same two buckets kept in Redis, shared by all workers
+
+    Both buckets are checked and charged in one Lua script, using the Redis
+    server clock. If Redis is unreachable, messages are let through: the
+    limiter protects LLM quota and must not take the chat down.
+    """
+
+    # KEYS: bucket keys; ARGV: cost, then capacity/refill_per_second pairs per key
+    _SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        local needed = 86400
+        if rate > 0 then needed = (cost - tokens) / rate end
+        if needed > wait then wait = needed end
+    end
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        redis.call('HSET', key, 'tokens', levels[i] - cost, 'updated_at', now)
+        local ttl = 86400
+        if rate > 0 then ttl = math.ceil(capacity / rate) + 1 end
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+return tostring(wait)
+"""
+
+    def __init__(self, redis_url: str, buckets: List[Tuple[str, float, float]], key_prefix: str = "ratelimit:"):
+        # buckets: (name, capacity, refill_per_second); "conversation" and/or "patient"
+        self.redis_url = redis_url
+        self._buckets = buckets
+        self.key_prefix = key_prefix
+        self._client = None
+        self._script = None
+
+    def _redis(self):
+        if self._client is None:
+            # Optional dependency, only needed for this backend
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(self.redis_url)
+            self._script = self._client.register_script(self._SCRIPT)
+        return self._script
+
+    async def acquire(self, patient_id: str, conversation_id: str) -> float:
+        """0 if the message may go to the agent, otherwise seconds until it may"""
+        if not self._buckets:
+            return 0.0
+        ids = {"conversation": conversation_id, "patient": patient_id}
+        keys = [f"{self.key_prefix}{name}:{ids[name]}" for name, _, _ in self._buckets]
+        args = [1]
+        for _, capacity, refill_per_second in self._buckets:
+            args += [capacity, refill_per_second]
+        try:
+            return float(await self._redis()(keys=keys, args=args))
+        except Exception as e:
+            print(f"Warning: Redis rate limiter unavailable, allowing message: {e}")
+            return 0.0
+
+
+def _message_limiter():
+    conversation = (settings.message_rate_limit_burst, settings.message_rate_limit_per_minute / 60)
+    patient = (settings.patient_rate_limit_burst, settings.patient_rate_limit_per_minute / 60)
+    if settings.message_rate_limit_backend == "redis":
+        return RedisMessageRateLimiter(settings.redis_url, [
+            (name, burst, rate)
+            for name, (burst, rate) in (("conversation", conversation), ("patient", patient))
+            if burst > 0
+        ])
+    return MessageRateLimiter(
+        conversation=TokenBucketLimiter(*conversation) if conversation[0] > 0 else None,
+        patient=TokenBucketLimiter(*patient) if patient[0] > 0 else None
+    )
+
+
+# Singleton instance (login attempts per username)
+login_limiter = TokenBucketLimiter(
+    capacity=settings.login_rate_limit_burst,
+    refill_per_second=settings.login_rate_limit_per_minute / 60
+)
+
+# Singleton instance (patient messages per conversation and per patient)
+message_limiter = _message_limiter()
@@ -1,13 +1,19 @@
+import hashlib
+from contextlib import aclosing
 from typing import Dict, Optional
-import google.generativeai as genai
+from pydantic import ValidationError
 from backend.config import get_settings
+from backend.services.json_stream import IncrementalJSONParser
+from backend.services.llm import llm
+from backend.services.llm_schemas import RiskAssessmentOutput
+from backend.services.metrics import metrics
+from backend.services.near_duplicate import near_duplicate_cache
 
 settings = get_settings()
-genai.configure(api_key=settings.google_api_key)
 
 
 class RiskAssessmentService:
-    """Risk assessment using Gemini 2.5 Pro for structured output"""
+    """Risk assessment on the fast "risk" LLM tier with structured output"""
     
     # High-risk keywords and patterns
     HIGH_RISK_KEYWORDS = [
@@ -25,9 +31,6 @@ class RiskAssessmentService:
         "confusion", "disoriented", "severe nausea"
     ]
     
-    def __init__(self):
-        self.model = genai.GenerativeModel(settings.gemini_model)
-    
     def _quick_keyword_check(self, message: str) -> Optional[str]:
         """Quick keyword-based risk check before LLM call"""
         message_lower = message.lower()
@@ -42,20 +45,63 @@ class RiskAssessmentService:
         
         return None
     
-    async def assess_risk(self, message: str, conversation_context: Optional[str] = None) -> Dict:
+    def _clear_low(self, message: str, conversation_context: Optional[str]) -> bool:
+        """Local pre-classifier verdict; False when no classifier is configured"""
+        if not settings.risk_classifier_path:
+            return False
+        from backend.services.risk_classifier import risk_pre_classifier  # NumPy only when enabled
+        
+        classifier = risk_pre_classifier.get()
+        return classifier is not None and classifier.is_clear_low(message, conversation_context)
+    
+    def keyword_risk_level(self, message: str) -> Optional[str]:
+        """Keyword-only risk level ("HIGH", "MEDIUM" or None); no LLM call, safe to use before rate limiting"""
+        return self._quick_keyword_check(message)
+    
+    async def assess_risk(self, message: str, conversation_context: Optional[str] = None, scope: Optional[str] = None) -> Dict:
         """
         Assess risk level of patient message
         
         Args:
             message: Patient's message
             conversation_context: Optional previous conversation context
+            scope: Conversation id; near-duplicate results are only reused within it
+                (and the same context). None disables reuse.
             
         Returns:
-            Dict with risk_level, reason, confidence, requires_escalation
+            Dict with risk_level, reason, confidence, requires_escalation and
+            source (a RiskSource value: what produced the level)
         """
         # Quick keyword check first
         quick_risk = self._quick_keyword_check(message)
         
+        # Near-duplicate of a recently triaged message in the same conversation and
+        # context: reuse its assessment. The same words can mean LOW after one
+        # context and HIGH after another, so results never cross conversations.
+        # HIGH keywords (in the message or the summary) always get a full evaluation.
+        reusable = (
+            scope is not None
+            and quick_risk != "HIGH"
+            and self._quick_keyword_check(conversation_context or "") != "HIGH"
+        )
+        if reusable:
+            context_digest = hashlib.blake2b((conversation_context or "").encode(), digest_size=8).hexdigest()
+            cache_scope = f"{scope}:{context_digest}"
+            cached = near_duplicate_cache.get("risk", message, cache_scope)
+            if cached is not None:
+                return {**cached, "source": "CACHE"}
+        
+        # Clear-cut LOW messages skip the LLM call (never when a keyword matched)
+        if quick_risk is None and self._clear_low(message, conversation_context):
+            metrics.incr("risk_triage_llm_skipped")
+            return {
+                "risk_level": "LOW",
+                "reason": "Local pre-classifier: no risk indicators",
+                "confidence": "MEDIUM",
+                "requires_escalation": False,
+                "source": "CLASSIFIER"
+            }
+        
         # Build prompt for LLM
         prompt = f"""You are a medical triage AI. Analyze this patient message and determine the risk level.
 
@@ -68,10 +114,10 @@ Classify the risk level as:
 - MEDIUM: Urgent but not immediately life-threatening (high fever, severe pain, persistent symptoms)
 - LOW: General health questions, mild symptoms, medication questions
 
-Respond in JSON format:
+Respond in JSON, starting with risk_level:
 {{
     "risk_level": "HIGH|MEDIUM|LOW",
-    "reason": "Brief explanation of why this risk level",
+    "triage_reason": "Brief explanation of why this risk level",
     "confidence": "HIGH|MEDIUM|LOW",
     "requires_escalation": true/false
 }}
@@ -79,44 +125,59 @@ Respond in JSON format:
 HIGH and MEDIUM risk ALWAYS require escalation (requires_escalation: true).
 """
         
+        # Schema-constrained JSON, read as it streams: a HIGH level is acted on as
+        # soon as it is emitted, and a reply cut short still counts once it has
+        # the level
+        parser = IncrementalJSONParser()
+        early = False
         try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            # Parse JSON
-            import json
-            result = json.loads(result_text)
-            
-            # Override with keyword check if it found HIGH risk
-            if quick_risk == "HIGH":
-                result["risk_level"] = "HIGH"
-                result["requires_escalation"] = True
-            
-            return result
-            
+            async with aclosing(llm.stream("risk", prompt, schema=RiskAssessmentOutput)) as chunks:
+                async for chunk in chunks:
+                    parser.feed(chunk)
+                    if not parser.complete and str(parser.partial().get("risk_level", "")).upper() == "HIGH":
+                        early = True
+                        metrics.incr("risk_triage_early_high")
+                        break
         except Exception as e:
-            # Fallback to keyword-based assessment
             print(f"Error in LLM risk assessment: {e}")
-            if quick_risk:
-                return {
-                    "risk_level": quick_risk,
-                    "reason": "Keyword-based detection",
-                    "confidence": "MEDIUM",
-                    "requires_escalation": quick_risk in ["HIGH", "MEDIUM"]
-                }
-            else:
-                return {
-                    "risk_level": "LOW",
-                    "reason": "No concerning keywords detected",
-                    "confidence": "LOW",
-                    "requires_escalation": False
-                }
+        
+        try:
+            result = RiskAssessmentOutput.model_validate(parser.result()).to_assessment()
+            result["source"] = "LLM"
+        except ValidationError:
+            # No usable risk level: fall back to keyword-based assessment
+            return self._keyword_assessment(quick_risk)
+        
+        if early and not result["reason"]:
+            result["reason"] = "High risk detected by triage"
+        
+        # Override with keyword check if it found HIGH risk
+        if quick_risk == "HIGH" and result["risk_level"] != "HIGH":
+            result["risk_level"] = "HIGH"
+            result["requires_escalation"] = True
+            result["source"] = "KEYWORD"
+        
+        if reusable and parser.complete:
+            near_duplicate_cache.put("risk", message, result, cache_scope)
+        return result
+    
+    @staticmethod
+    def _keyword_assessment(quick_risk: Optional[str]) -> Dict:
+        if quick_risk:
+            return {
+                "risk_level": quick_risk,
+                "reason": "Keyword-based detection",
+                "confidence": "MEDIUM",
+                "requires_escalation": quick_risk in ["HIGH", "MEDIUM"],
+                "source": "KEYWORD"
+            }
+        return {
+            "risk_level": "LOW",
+            "reason": "No concerning keywords detected",
+            "confidence": "LOW",
+            "requires_escalation": False,
+            "source": "FALLBACK"
+        }
 
 
 # Singleton instance
@@ -0,0 +1,332 @@
+"""
+Local risk pre-classifier - skips LLM triage for clear-cut LOW-risk messages
+
+A logistic regression over hashed word, word-bigram and character-trigram
+features (NumPy only, CPU) scores how likely a redacted patient message is to
+need escalation (HIGH or MEDIUM). It never decides HIGH or MEDIUM on its own:
+a message skips the Gemini triage call only when its score is below a
+threshold calibrated so that at least `target_recall` of the HIGH/MEDIUM
+messages in held-out data score above it. Everything else, including any
+keyword match, still goes to the LLM.
+
+Training data is the stored patient messages (already redacted) whose risk
+level came from LLM triage or risk keywords (Message.risk_source). Train writes a model file only when the
+held-out recall meets the target; point RISK_CLASSIFIER_PATH at it to enable
+the gate.
+
+Run:
+    python -m backend.services.risk_classifier train --out risk_classifier.npz
+    python -m backend.services.risk_classifier evaluate --model risk_classifier.npz [--days 30]
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.config import get_settings
+
+settings = get_settings()
+
+DEFAULT_DIM = 2 ** 18
+ESCALATING_LEVELS = ("HIGH", "MEDIUM")
+TRAINING_SOURCES = ("LLM", "KEYWORD")  # Message.risk_source values trusted as labels
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def extract_features(text: str) -> List[str]:
+    """Word unigrams, word bigrams and character trigrams of each word"""
+    words = _WORD.findall(text.lower())
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return features
+
+
+def vectorize(texts: Sequence[str], dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hashed, signed, length-normalized features for a batch of texts
+
+    Returns:
+        (rows, columns, values) of the sparse batch matrix; duplicates add up
+    """
+    rows, columns, values = [], [], []
+    for row, text in enumerate(texts):
+        features = extract_features(text)
+        if not features:
+            continue
+        weight = 1.0 / np.sqrt(len(features))
+        for feature in features:
+            hashed = zlib.crc32(feature.encode("utf-8"))  # stable across processes, unlike hash()
+            rows.append(row)
+            columns.append(hashed % dim)
+            values.append(weight if hashed & 0x80000000 else -weight)
+    return (
+        np.asarray(rows, dtype=np.int64),
+        np.asarray(columns, dtype=np.int64),
+        np.asarray(values, dtype=np.float64)
+    )
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class RiskPreClassifier:
+    """Linear model over hashed n-grams plus the calibrated skip threshold"""
+
+    def __init__(self, weights: np.ndarray, bias: float, threshold: float = 0.0, meta: Optional[Dict] = None):
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold  # Scores below this skip LLM triage (0 = never skip)
+        self.meta = meta or {}
+
+    @property
+    def dim(self) -> int:
+        return len(self.weights)
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Probability that each text needs escalation (HIGH or MEDIUM)"""
+        rows, columns, values = vectorize(texts, self.dim)
+        logits = np.bincount(rows, weights=values * self.weights[columns], minlength=len(texts))
+        return _sigmoid(logits + self.bias)
+
+    def is_clear_low(self, *texts: str) -> bool:
+        """True when every text scores below the threshold (safe to skip LLM triage)"""
+        texts = [text for text in texts if text]
+        if self.threshold <= 0 or not texts:
+            return False
+        return bool(np.all(self.scores(texts) < self.threshold))
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        escalating: Sequence[bool],
+        dim: int = DEFAULT_DIM,
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-5
+    ) -> "RiskPreClassifier":
+        """
+        Fit by full-batch gradient descent on class-balanced log loss
+
+        Balancing weighs the (rarer) HIGH/MEDIUM messages up, which is where
+        recall matters.
+        """
+        rows, columns, values = vectorize(texts, dim)
+        y = np.asarray(escalating, dtype=np.float64)
+        n = len(y)
+        positives = max(1.0, y.sum())
+        sample_weight = np.where(y == 1, n / (2 * positives), n / (2 * max(1.0, n - positives)))
+
+        weights = np.zeros(dim)
+        bias = 0.0
+        for _ in range(epochs):
+            logits = np.bincount(rows, weights=values * weights[columns], minlength=n) + bias
+            error = (_sigmoid(logits) - y) * sample_weight / n
+            gradient = np.bincount(columns, weights=values * error[rows], minlength=dim) + l2 * weights
+            weights -= learning_rate * gradient
+            bias -= learning_rate * error.sum()
+        return cls(weights, bias)
+
+    def calibrate(self, texts: Sequence[str], escalating: Sequence[bool], target_recall: float, min_positives: int = 20) -> float:
+        """
+        Pick a skip threshold that keeps recall on HIGH/MEDIUM >= target_recall
+
+        The threshold may not exceed the score that keeps target_recall of the
+        escalating examples above it. Below that limit it sits just above the
+        highest-scoring LOW example: the same LOW messages skip the LLM, with
+        the widest margin to unseen HIGH/MEDIUM messages. With fewer than
+        `min_positives` escalating examples the threshold is 0 (nothing skips
+        the LLM) because recall cannot be estimated reliably.
+        """
+        scores = self.scores(texts)
+        escalating = np.asarray(escalating, dtype=bool)
+        positive = np.sort(scores[escalating])
+        self.threshold = 0.0
+        if len(positive) >= min_positives:
+            # At most floor((1 - target) * n) positives may fall below the limit
+            allowed_misses = int(np.floor((1 - target_recall) * len(positive) + 1e-9))
+            limit = positive[allowed_misses]
+            low = scores[~escalating]
+            low = low[low < limit]
+            if len(low):
+                self.threshold = float(np.nextafter(low.max(), 1.0))
+        return self.threshold
+
+    def evaluate(self, texts: Sequence[str], levels: Sequence[str]) -> Dict:
+        """Recall per escalating level and the share of LOW messages that would skip the LLM"""
+        skipped = self.scores(texts) < self.threshold if self.threshold > 0 else np.zeros(len(texts), dtype=bool)
+        levels = np.asarray(levels)
+        report = {"messages": len(levels), "threshold": self.threshold}
+        for level in ESCALATING_LEVELS + ("LOW",):
+            mask = levels == level
+            report[f"{level.lower()}_messages"] = int(mask.sum())
+            if level == "LOW":
+                report["low_skip_rate"] = float(skipped[mask].mean()) if mask.any() else 0.0
+            else:
+                report[f"{level.lower()}_recall"] = float(1 - skipped[mask].mean()) if mask.any() else None
+        escalating = np.isin(levels, ESCALATING_LEVELS)
+        report["recall"] = float(1 - skipped[escalating].mean()) if escalating.any() else None
+        report["missed"] = int((skipped & escalating).sum())
+        report["llm_calls_saved"] = float(skipped.mean()) if len(levels) else 0.0
+        return report
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=np.float64(self.bias),
+            threshold=np.float64(self.threshold),
+            target_recall=np.float64(self.meta.get("target_recall", 0.0)),
+            trained_at=np.float64(self.meta.get("trained_at", time.time())),
+            examples=np.int64(self.meta.get("examples", 0))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RiskPreClassifier":
+        with np.load(path) as data:
+            return cls(
+                data["weights"],
+                float(data["bias"]),
+                float(data["threshold"]),
+                {
+                    "target_recall": float(data["target_recall"]),
+                    "trained_at": float(data["trained_at"]),
+                    "examples": int(data["examples"])
+                }
+            )
+
+
+def split(texts: List[str], levels: List[str], seed: int = 7) -> Dict[str, Tuple[List[str], List[str]]]:
+    """Deterministic 70/15/15 train/calibration/test split"""
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut_train, cut_calibration = int(len(order) * 0.7), int(len(order) * 0.85)
+    parts = {"train": order[:cut_train], "calibration": order[cut_train:cut_calibration], "test": order[cut_calibration:]}
+    return {name: ([texts[i] for i in idx], [levels[i] for i in idx]) for name, idx in parts.items()}
+
+
+def fit(texts: List[str], levels: List[str], target_recall: float, dim: int = DEFAULT_DIM) -> Tuple[RiskPreClassifier, Dict]:
+    """Train, calibrate on held-out data and report on a separate test split"""
+    parts = split(texts, levels)
+    train_texts, train_levels = parts["train"]
+    classifier = RiskPreClassifier.train(train_texts, [level in ESCALATING_LEVELS for level in train_levels], dim=dim)
+    calibration_texts, calibration_levels = parts["calibration"]
+    classifier.calibrate(calibration_texts, [level in ESCALATING_LEVELS for level in calibration_levels], target_recall)
+    classifier.meta = {"target_recall": target_recall, "trained_at": time.time(), "examples": len(train_texts)}
+    return classifier, classifier.evaluate(*parts["test"])
+
+
+async def load_labelled_messages(days: Optional[int] = None, limit: Optional[int] = None) -> Tuple[List[str], List[str]]:
+    """
+    Redacted patient messages with a triage label (LOW/MEDIUM/HIGH), newest first
+
+    Only labels from LLM triage or risk keywords count: the classifier's own
+    verdicts, reused near-duplicate results and coalesced batches would feed
+    its output (or another message's label) back into training.
+    """
+    from sqlalchemy import select
+    from backend.database import AsyncSessionLocal
+    from backend.models.message import Message, RiskLevel, RiskSource, SenderType
+
+    query = (
+        select(Message.content, Message.risk_level)
+        .where(
+            Message.sender_type == SenderType.PATIENT,
+            Message.risk_level.in_([RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH]),
+            Message.risk_source.in_(TRAINING_SOURCES)
+        )
+        .order_by(Message.created_at.desc())
+    )
+    if days:
+        query = query.where(Message.created_at >= datetime.utcnow() - timedelta(days=days))
+    if limit:
+        query = query.limit(limit)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query)
+        rows = result.all()
+    return [content for content, _ in rows], [level.value for _, level in rows]
+
+
+def _print_report(report: Dict, target_recall: float) -> None:
+    def pct(value):
+        return "n/a" if value is None else f"{value * 100:.2f}%"
+
+    print(f"Messages: {report['messages']} (HIGH {report['high_messages']}, MEDIUM {report['medium_messages']}, LOW {report['low_messages']})")
+    print(f"Threshold: {report['threshold']:.4f}")
+    print(f"Recall HIGH: {pct(report['high_recall'])}  MEDIUM: {pct(report['medium_recall'])}  "
+          f"HIGH+MEDIUM: {pct(report['recall'])} (target {pct(target_recall)}, missed {report['missed']})")
+    print(f"LOW messages skipping LLM triage: {pct(report['low_skip_rate'])}  (all LLM triage calls saved: {pct(report['llm_calls_saved'])})")
+
+
+def _meets_target(report: Dict, target_recall: float) -> bool:
+    return all(report[key] is None or report[key] >= target_recall for key in ("high_recall", "medium_recall"))
+
+
+class PreClassifierGate:
+    """Lazily loaded classifier from settings.risk_classifier_path (None when unset or unreadable)"""
+
+    def __init__(self):
+        self._classifier: Optional[RiskPreClassifier] = None
+        self._loaded = False
+
+    def get(self) -> Optional[RiskPreClassifier]:
+        if not self._loaded:
+            self._loaded = True
+            if settings.risk_classifier_path:
+                try:
+                    self._classifier = RiskPreClassifier.load(settings.risk_classifier_path)
+                    print(f"[OK] Risk pre-classifier loaded (threshold {self._classifier.threshold:.4f})")
+                except Exception as e:
+                    print(f"Warning: Could not load risk pre-classifier, every message gets LLM triage: {e}")
+        return self._classifier
+
+    def reset(self) -> None:
+        self._classifier = None
+        self._loaded = False
+
+
+# Singleton instance
+risk_pre_classifier = PreClassifierGate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local risk pre-classifier")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train_parser = subcommands.add_parser("train", help="Train on stored messages and write a model file")
+    train_parser.add_argument("--out", default="risk_classifier.npz")
+    train_parser.add_argument("--days", type=int, help="Only messages from the last N days")
+    train_parser.add_argument("--limit", type=int)
+    train_parser.add_argument("--target-recall", type=float, default=settings.risk_classifier_target_recall)
+    train_parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    evaluate_parser = subcommands.add_parser("evaluate", help="Report recall of a model file on stored messages")
+    evaluate_parser.add_argument("--model", default=settings.risk_classifier_path or "risk_classifier.npz")
+    evaluate_parser.add_argument("--days", type=int)
+    evaluate_parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    texts, levels = asyncio.run(load_labelled_messages(args.days, args.limit))
+    if args.command == "train":
+        classifier, report = fit(texts, levels, args.target_recall, args.dim)
+        _print_report(report, args.target_recall)
+        if classifier.threshold <= 0 or not _meets_target(report, args.target_recall):
+            print("Error: held-out recall is below the target, model not written")
+            sys.exit(1)
+        classifier.save(args.out)
+        print(f"[OK] Model written to {args.out}")
+    else:
+        classifier = RiskPreClassifier.load(args.model)
+        target_recall = classifier.meta["target_recall"]
+        report = classifier.evaluate(texts, levels)
+        _print_report(report, target_recall)
+        if not _meets_target(report, target_recall):
+            print("Error: recall is below the target the model was calibrated for")
+            sys.exit(1)
@@ -0,0 +1,179 @@
+"""
+Signed session tokens (HS256 JWT, stdlib only)
+
+Login issues a short-lived token carrying the user id and role. Requests are
+authorized by checking the HMAC signature and expiry in-process, so there is
+no per-request user lookup. Logged-out tokens are kept in a bounded list of
+revoked token ids until they would have expired anyway; only expired entries
+are ever removed, and a logout that finds the list full of live revocations
+is refused rather than evicting one (which would silently un-revoke it).
+
+Revocations are per worker process: a logout handled by one worker does not
+revoke the token on the others, where it stays valid until it expires. Keep
+session_token_ttl_minutes short.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from pydantic import BaseModel
+from backend.config import get_settings
+from backend.models.user import UserRole
+
+settings = get_settings()
+
+_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+class InvalidToken(Exception):
+    """Token is malformed, has a bad signature, has expired or was revoked"""
+
+
+class RevocationListFull(Exception):
+    """No room to record a logout: every remembered revocation is still live"""
+
+
+class SessionUser(BaseModel):
+    """Caller identity taken from a verified token"""
+    user_id: uuid.UUID
+    role: UserRole
+    token_id: str
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class RevocationList:
+    """Revoked token ids, bounded; entries drop out once the token has expired"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._revoked: Dict[str, int] = {}  # token_id -> expires_at
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: int, now: Optional[float] = None) -> None:
+        """
+        Remember a revoked token until it expires
+
+        Raises:
+            RevocationListFull: if max_entries unexpired tokens are already revoked
+        """
+        with self._lock:
+            if token_id not in self._revoked and len(self._revoked) >= self.max_entries:
+                now = now or time.time()
+                for expired in [key for key, expiry in self._revoked.items() if expiry <= now]:
+                    del self._revoked[expired]
+                if len(self._revoked) >= self.max_entries:
+                    raise RevocationListFull()
+            self._revoked[token_id] = expires_at
+
+    def is_revoked(self, token_id: str, now: Optional[float] = None) -> bool:
+        with self._lock:
+            expires_at = self._revoked.get(token_id)
+            if expires_at is None:
+                return False
+            if expires_at <= (now or time.time()):
+                del self._revoked[token_id]
+                return False
+            return True
+
+
+class TokenService:
+    """Issue and verify HS256 session tokens"""
+
+    def __init__(self, secret: str, ttl_seconds: int, revocations: RevocationList):
+        self._secret = secret.encode("utf-8")
+        self.ttl_seconds = ttl_seconds
+        self.revocations = revocations
+
+    def _sign(self, signing_input: str) -> str:
+        return _b64encode(hmac.new(self._secret, signing_input.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, user_id: uuid.UUID, role: UserRole, now: Optional[float] = None) -> str:
+        """Signed token for a user, valid for ttl_seconds"""
+        issued_at = int(now or time.time())
+        claims = {
+            "sub": str(user_id),
+            "role": role.value,
+            "jti": secrets.token_hex(16),
+            "iat": issued_at,
+            "exp": issued_at + self.ttl_seconds
+        }
+        signing_input = ".".join(
+            _b64encode(json.dumps(part, separators=(",", ":")).encode("utf-8"))
+            for part in (_HEADER, claims)
+        )
+        return f"{signing_input}.{self._sign(signing_input)}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> SessionUser:
+        """
+        Check signature, expiry and revocation
+
+        Raises:
+            InvalidToken: if the token must not be accepted
+        """
+        try:
+            header, payload, signature = token.split(".")
+        except ValueError:
+            raise InvalidToken("Malformed token")
+
+        if not hmac.compare_digest(signature, self._sign(f"{header}.{payload}")):
+            raise InvalidToken("Bad signature")
+
+        try:
+            if json.loads(_b64decode(header)).get("alg") != "HS256":
+                raise InvalidToken("Unsupported algorithm")
+            claims = json.loads(_b64decode(payload))
+            user = SessionUser(
+                user_id=uuid.UUID(claims["sub"]),
+                role=UserRole(claims["role"]),
+                token_id=claims["jti"],
+                expires_at=int(claims["exp"])
+            )
+        except InvalidToken:
+            raise
+        except Exception:
+            raise InvalidToken("Malformed claims")
+
+        now = now or time.time()
+        if user.expires_at <= now:
+            raise InvalidToken("Token expired")
+        if self.revocations.is_revoked(user.token_id, now):
+            raise InvalidToken("Token revoked")
+        return user
+
+    def revoke(self, user: SessionUser) -> None:
+        """
+        Reject this token from now on, in this worker (logout)
+
+        Raises:
+            RevocationListFull: if the logout could not be recorded
+        """
+        self.revocations.revoke(user.token_id, user.expires_at)
+
+
+def _secret() -> str:
+    if settings.session_token_secret:
+        return settings.session_token_secret
+    print("Warning: SESSION_TOKEN_SECRET is not set; using a random secret "
+          "(tokens will not survive a restart or work across workers)")
+    return secrets.token_urlsafe(32)
+
+
+# Singleton instance
+token_service = TokenService(
+    secret=_secret(),
+    ttl_seconds=settings.session_token_ttl_minutes * 60,
+    revocations=RevocationList(settings.session_revocation_cache_size)
+)
@@ -0,0 +1,82 @@
+"""
+Load harness for audit logging: per-event flush vs. batched AuditSink
+
+Each simulated request logs one audit event. The database is modelled as a
+fixed round-trip latency per statement, so the numbers show what the request
+path pays and how many statements the database has to absorb.
+
+Run:
+    python -m benchmarks.bench_audit_sink
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime
+from backend.services.audit import AuditSink
+
+DB_ROUND_TRIP_SECONDS = 0.002
+REQUESTS = 5000
+CONCURRENCY = 100
+
+
+def _row():
+    return {
+        "id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "action": "MESSAGE_SENT",
+        "resource_type": "Message",
+        "resource_id": uuid.uuid4(),
+        "metadata_hash": "0" * 64,
+        "timestamp": datetime.utcnow()
+    }
+
+
+async def _run(log_one):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def request():
+        async with semaphore:
+            started = time.perf_counter()
+            await log_one()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[request() for _ in range(REQUESTS)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return REQUESTS / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+async def main():
+    statements = {"count": 0}
+
+    async def per_event_flush():
+        # db.add + await db.flush() inside the request transaction
+        statements["count"] += 1
+        await asyncio.sleep(DB_ROUND_TRIP_SECONDS)
+
+    throughput, p50, p99 = await _run(per_event_flush)
+    print(f"{'per-event flush':<18} {throughput:>9.0f} req/s  p50={p50 * 1000:6.2f}ms  p99={p99 * 1000:6.2f}ms  statements={statements['count']}")
+
+    statements["count"] = 0
+
+    async def writer(rows):
+        statements["count"] += 1
+        await asyncio.sleep(DB_ROUND_TRIP_SECONDS)
+
+    sink = AuditSink(batch_size=500, flush_interval_ms=200, max_queue=50000,
+                     spill_path="bench_audit_spill.ndjson", writer=writer)
+    await sink.start()
+
+    async def batched():
+        sink.enqueue(_row())
+
+    throughput, p50, p99 = await _run(batched)
+    await sink.stop()
+    print(f"{'batched sink':<18} {throughput:>9.0f} req/s  p50={p50 * 1000:6.2f}ms  p99={p99 * 1000:6.2f}ms  statements={statements['count']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
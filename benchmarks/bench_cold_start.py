@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark for an app worker (backend.main:app)
+
+Each run is a fresh interpreter that imports backend.main and runs the
+startup handler, i.e. what one uvicorn worker pays before it can serve.
+The database does not need to be reachable: a failed pool warm-up is logged
+and startup continues, which is also what a worker does.
+
+For comparison, the seeding work the old startup did on an empty database
+(one bcrypt hash per test user) is timed in-process.
+
+Run:
+    python -m benchmarks.bench_cold_start
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+import bcrypt
+
+RUNS = 5
+TEST_USERS = 6
+
+# Target for import + startup of one worker
+COLD_START_TARGET_SECONDS = 3.0
+
+_WORKER = """
+import asyncio, contextlib, io, json, time
+started = time.perf_counter()
+import backend.main as main
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    asyncio.run(main.startup_event())
+ready = time.perf_counter()
+print(json.dumps({"import": imported - started, "startup": ready - imported}))
+"""
+
+
+def _cold_start() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _WORKER],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = [_cold_start() for _ in range(RUNS)]
+    import_seconds = statistics.median(run["import"] for run in runs)
+    startup_seconds = statistics.median(run["startup"] for run in runs)
+    total = import_seconds + startup_seconds
+
+    started = time.perf_counter()
+    for _ in range(TEST_USERS):
+        bcrypt.hashpw(b"test123", bcrypt.gensalt())
+    seeding_seconds = time.perf_counter() - started
+
+    print(f"Worker cold start (median of {RUNS}):")
+    print(f"  import backend.main:  {import_seconds:6.3f}s")
+    print(f"  startup_event:        {startup_seconds:6.3f}s")
+    print(f"  total:                {total:6.3f}s  (target {COLD_START_TARGET_SECONDS:.1f}s: "
+          f"{'PASS' if total <= COLD_START_TARGET_SECONDS else 'FAIL'})")
+    print(f"Removed from every worker on an empty database: {TEST_USERS} bcrypt hashes = {seeding_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
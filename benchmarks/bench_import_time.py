@@ -0,0 +1,67 @@
+"""
+Import-time benchmark for backend.main
+
+Runs `python -X importtime -c "import backend.main"` in fresh interpreters
+(without GOOGLE_API_KEY) and reports the total, the heaviest top-level
+packages, and whether the Gemini SDK was imported. For comparison it also
+times importing google.generativeai on its own, which is what every process
+used to pay up front.
+
+Run:
+    python -m benchmarks.bench_import_time
+"""
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RUNS = 5
+TOP_PACKAGES = 8
+
+
+def _importtime(statement: str) -> tuple:
+    """Microseconds per top-level package (self time) and the set of imported modules"""
+    env = {key: value for key, value in os.environ.items() if key != "GOOGLE_API_KEY"}
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env
+    ).stderr
+
+    packages = defaultdict(int)
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        # Self times are exclusive, so they add up to the total per package
+        packages[name.strip().split(".")[0]] += int(self_us)
+        modules.add(name.strip())
+    return packages, modules
+
+
+def main():
+    results = [_importtime("import backend.main") for _ in range(RUNS)]
+    runs = [packages for packages, _ in results]
+    totals = [sum(run.values()) / 1e6 for run in runs]
+    sdk_loaded = any("google.generativeai" in modules for _, modules in results)
+
+    typical = runs[totals.index(statistics.median(totals))] if RUNS % 2 else runs[0]
+    heaviest = sorted(typical.items(), key=lambda item: item[1], reverse=True)[:TOP_PACKAGES]
+
+    sdk_seconds = statistics.median(
+        sum(_importtime("import google.generativeai")[0].values()) / 1e6 for _ in range(RUNS)
+    )
+
+    print(f"import backend.main (median of {RUNS}): {statistics.median(totals):.3f}s")
+    for name, micros in heaviest:
+        print(f"  {name:<24} {micros / 1e6:6.3f}s")
+    print(f"Gemini SDK imported by backend.main: {'yes' if sdk_loaded else 'no'}")
+    print(f"Deferred to the first LLM call: import google.generativeai = {sdk_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Gemini latency per LLM tier (needs GOOGLE_API_KEY and network access)
+
+Runs the real agent nodes (risk assessment, fact extraction, response, SBAR)
+over a few sample patient messages, first with each tier's configured model
+and then with every tier forced onto gemini_fast_model (what the load-shedding
+fallback does). Reports p50/p95 latency and failures per tier.
+
+Run:
+    GOOGLE_API_KEY=... python -m benchmarks.bench_llm_tiers
+"""
+import asyncio
+import statistics
+import sys
+import time
+from collections import defaultdict
+from backend.agent.nodes.escalation_node import escalation_node
+from backend.agent.nodes.memory_nodes import fact_extraction_node
+from backend.agent.nodes.response_node import response_node
+from backend.services import llm as llm_module
+from backend.services.llm import TIERS, llm, tier_config
+from backend.services.profile_digest import build_digest
+from backend.services.risk_assessment import risk_assessment_service
+
+MESSAGES = [
+    "I have had a mild headache since this morning, I took some Tylenol",
+    "I started taking lisinopril last week and now I have a dry cough",
+    "My 4 year old has a fever of 101 and is not eating much",
+    "I'm allergic to penicillin, can I take amoxicillin for my sore throat?",
+    "I've been feeling dizzy when I stand up since I started my new blood pressure pill"
+]
+
+
+def _state(message):
+    profile = {"medications": [], "symptoms": [], "allergies": [], "conditions": []}
+    return {
+        "conversation_id": "00000000-0000-0000-0000-000000000000",
+        "patient_id": "00000000-0000-0000-0000-000000000000",
+        "raw_message": message,
+        "conversation_summary": None,
+        "redacted_message": message,
+        "phi_detected": False,
+        "risk_assessment": {"risk_level": "MEDIUM", "reason": "benchmark"},
+        "patient_profile": profile,
+        "profile_context": build_digest(profile),
+        "extracted_facts": None,
+        "response": None,
+        "should_escalate": False,
+        "escalation_ticket_id": None,
+        "error": None
+    }
+
+
+class _NoDb:
+    """Stands in for the ticket write so the SBAR tier can be timed without a database"""
+
+    def add(self, ticket):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def execute(self, *args, **kwargs):
+        class _Result:
+            def scalar_one_or_none(self):
+                return None
+        return _Result()
+
+
+async def _run_nodes(timings, failures):
+    generate = llm.generate
+
+    async def timed(tier, prompt):
+        started = time.perf_counter()
+        try:
+            return await generate(tier, prompt)
+        except Exception:
+            failures[tier] += 1
+            raise
+        finally:
+            timings[tier].append(time.perf_counter() - started)
+
+    llm.generate = timed
+    try:
+        for message in MESSAGES:
+            await risk_assessment_service.assess_risk(message)
+            await fact_extraction_node(_state(message))
+            await response_node(_state(message))
+            state = _state(message)
+            state["should_escalate"] = True
+            await escalation_node(state, _NoDb())
+    finally:
+        llm.generate = generate
+
+
+def _report(label, timings, failures):
+    print(label)
+    for tier in TIERS:
+        samples = sorted(timings[tier])
+        if not samples:
+            continue
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(
+            f"  {tier:10s} {tier_config(tier)['model']:24s} "
+            f"p50 {statistics.median(samples) * 1000:7.0f}ms   p95 {p95 * 1000:7.0f}ms   "
+            f"failed {failures[tier]}/{len(samples)}"
+        )
+
+
+async def main():
+    settings = llm_module.settings
+    if not settings.google_api_key:
+        print("Error: GOOGLE_API_KEY is not set")
+        sys.exit(1)
+
+    timings, failures = defaultdict(list), defaultdict(int)
+    await _run_nodes(timings, failures)
+    _report("Configured tiers:", timings, failures)
+
+    for tier in TIERS:
+        setattr(settings, f"llm_{tier}_model", settings.gemini_fast_model)
+    timings, failures = defaultdict(list), defaultdict(int)
+    await _run_nodes(timings, failures)
+    _report("All tiers on the fast model:", timings, failures)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
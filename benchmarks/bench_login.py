@@ -0,0 +1,85 @@
+"""
+Login throughput under concurrency: inline bcrypt vs. the password_hasher pool
+
+A burst of logins (shift change) is fired at the login handler while a chat
+request stand-in measures event-loop stalls: how late a 10ms timer fires.
+The database is a mock, so the numbers isolate the bcrypt cost and where it
+runs.
+
+Run:
+    python -m benchmarks.bench_login
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+from backend.api.v1 import auth
+from backend.api.v1.auth import LoginRequest, login
+from backend.models.user import User, UserRole
+from backend.services.passwords import PasswordHasher, verify_password_sync
+
+LOGINS = 64
+CONCURRENCY = 64
+TICK_SECONDS = 0.01
+
+
+class _InlineHasher:
+    """The old behaviour: bcrypt.checkpw on the event loop"""
+
+    async def verify(self, password, password_hash):
+        return verify_password_sync(password, password_hash)
+
+
+def _session():
+    user = User(username="clinician1", name="Clinician", role=UserRole.CLINICIAN)
+    user.set_password("test123")
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    session = AsyncMock()
+    session.execute.return_value = result
+    return session
+
+
+async def _run(hasher):
+    auth.password_hasher = hasher
+    session = _session()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    stalls = []
+    done = asyncio.Event()
+
+    async def chat_request():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            stalls.append(time.perf_counter() - started - TICK_SECONDS)
+
+    async def one_login(i):
+        async with semaphore:
+            await login(LoginRequest(username=f"clinician{i}", password="test123"), db=session)
+
+    ticker = asyncio.create_task(chat_request())
+    started = time.perf_counter()
+    await asyncio.gather(*[one_login(i) for i in range(LOGINS)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    return LOGINS / elapsed, max(stalls)
+
+
+async def main():
+    auth.settings.login_rate_limit_burst = 0  # measure hashing only
+    original = auth.password_hasher
+
+    throughput, stall = await _run(_InlineHasher())
+    print(f"{'inline bcrypt':<22} {throughput:7.1f} logins/s  worst event-loop stall={stall * 1000:8.1f}ms")
+
+    for workers in (2, 4, 8):
+        hasher = PasswordHasher(workers)
+        throughput, stall = await _run(hasher)
+        hasher.shutdown()
+        print(f"{f'pool ({workers} threads)':<22} {throughput:7.1f} logins/s  worst event-loop stall={stall * 1000:8.1f}ms")
+
+    auth.password_hasher = original
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Contention benchmark for per-patient serialization (backend/services/patient_lock.py)
+
+Simulates agent runs that read a patient profile, wait on the LLM, and write
+the profile back (the read-modify-write that used to lose facts).
+
+Run:
+    python -m benchmarks.bench_patient_lock
+"""
+import asyncio
+import statistics
+import time
+from contextlib import asynccontextmanager
+from backend.services.patient_lock import KeyedLock
+
+LLM_LATENCY_SECONDS = 0.02
+MESSAGES_PER_PATIENT = 20
+
+
+@asynccontextmanager
+async def _no_lock(key):
+    yield
+
+
+async def _agent_run(profiles, patient, fact, hold):
+    async with hold(patient):
+        facts = list(profiles[patient])  # memory_retrieval_node
+        await asyncio.sleep(LLM_LATENCY_SECONDS)  # fact extraction / response generation
+        facts.append(fact)
+        profiles[patient] = facts  # memory_update_node + commit
+
+
+async def run_scenario(patients: int, messages_per_patient: int, use_lock: bool):
+    """Fire every message for every patient at once and measure throughput and lost facts"""
+    profiles = {f"patient-{p}": [] for p in range(patients)}
+    hold = KeyedLock().hold if use_lock else _no_lock
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _agent_run(profiles, patient, f"fact-{m}", hold)
+        for patient in profiles
+        for m in range(messages_per_patient)
+    ])
+    elapsed = time.perf_counter() - started
+
+    total = patients * messages_per_patient
+    lost = total - sum(len(facts) for facts in profiles.values())
+    return total / elapsed, lost
+
+
+async def main():
+    print(f"{'scenario':<40}{'runs/s':>10}{'lost facts':>12}")
+
+    # Same patient: the lock trades throughput for correctness
+    for use_lock in (False, True):
+        throughput, lost = await run_scenario(1, MESSAGES_PER_PATIENT, use_lock)
+        label = f"1 patient x {MESSAGES_PER_PATIENT} msgs, lock={use_lock}"
+        print(f"{label:<40}{throughput:>10.1f}{lost:>12}")
+
+    # Different patients (one message each): throughput must be unaffected by the lock
+    await run_scenario(500, 1, True)  # warm up
+    results = {}
+    for use_lock in (False, True):
+        runs = [await run_scenario(500, 1, use_lock) for _ in range(5)]
+        throughput = statistics.median(run[0] for run in runs)
+        lost = sum(run[1] for run in runs)
+        results[use_lock] = throughput
+        print(f"{f'500 patients x 1 msg, lock={use_lock}':<40}{throughput:>10.1f}{lost:>12}")
+
+    print(f"\nCross-patient throughput with lock: {results[True] / results[False]:.0%} of unlocked")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
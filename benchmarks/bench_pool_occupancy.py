@@ -0,0 +1,147 @@
+"""
+DB pool occupancy of concurrent agent runs: one session per run vs. short sessions
+
+N chats arriving ARRIVAL_SECONDS apart run the real agent graph with the LLM nodes replaced by fixed delays
+(Gemini latency) and a pool of POOL_SIZE fake connections with a small query
+delay. Holding one session for the whole run needs a connection per chat for
+the full LLM wait; short sessions only check one out around the profile read
+and write. Runs once with a pool as large as the number of chats (the
+connections actually needed) and once with POOL_SIZE. Reports the peak number
+of connections in use, how long chats waited for one, and the wall time.
+
+Run:
+    python -m benchmarks.bench_pool_occupancy
+"""
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from backend.agent import graph as graph_module
+from backend.agent.graph import MedicalAgentGraph
+from backend.services import profile_store as profile_store_module
+
+CHATS = 50
+POOL_SIZE = 5
+LLM_SECONDS = 0.2  # per LLM node (risk, fact extraction, response)
+QUERY_SECONDS = 0.005
+ARRIVAL_SECONDS = 0.02
+
+
+class _Pool:
+    """Bounded fake connection pool that records occupancy and checkout waits"""
+
+    def __init__(self, size):
+        self._slots = asyncio.Semaphore(size)
+        self.in_use = 0
+        self.peak = 0
+        self.wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def scope(self, db=None):
+        if db is not None:
+            yield db
+            return
+        started = time.perf_counter()
+        async with self._slots:
+            self.wait_seconds += time.perf_counter() - started
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+            try:
+                yield _session()
+            finally:
+                self.in_use -= 1
+
+
+def _session():
+    async def execute(*args, **kwargs):
+        await asyncio.sleep(QUERY_SECONDS)
+        return MagicMock(scalar_one_or_none=MagicMock(return_value=None))
+
+    session = AsyncMock()
+    session.add = MagicMock()
+    session.execute.side_effect = execute
+    return session
+
+
+async def _redaction(state):
+    state["redacted_message"] = state["raw_message"]
+    return state
+
+
+async def _risk_gating(state):
+    await asyncio.sleep(LLM_SECONDS)
+    state["risk_assessment"] = {"risk_level": "LOW", "reason": "benchmark"}
+    return state
+
+
+async def _fact_extraction(state):
+    await asyncio.sleep(LLM_SECONDS)
+    state["extracted_facts"] = {"symptoms": [{"name": "Headache", "action": "ADD", "status": "ACTIVE"}]}
+    return state
+
+
+async def _response(state):
+    await asyncio.sleep(LLM_SECONDS)
+    state["response"] = "Rest and fluids."
+    return state
+
+
+def _state():
+    return {
+        "conversation_id": str(uuid.uuid4()),
+        "patient_id": str(uuid.uuid4()),
+        "raw_message": "I have a headache",
+        "conversation_summary": None,
+        "redacted_message": "",
+        "phi_detected": False,
+        "risk_assessment": None,
+        "patient_profile": None,
+        "profile_context": None,
+        "extracted_facts": None,
+        "response": None,
+        "should_escalate": False,
+        "escalation_ticket_id": None,
+        "error": None
+    }
+
+
+async def _run(hold_session: bool, pool_size: int):
+    pool = _Pool(pool_size)
+    graph_module.session_scope = pool.scope
+
+    async def chat(i):
+        await asyncio.sleep(i * ARRIVAL_SECONDS)
+        if hold_session:
+            # The old pattern: the request's session is used for the whole run
+            async with pool.scope() as db:
+                await MedicalAgentGraph(message_id=uuid.uuid4(), db=db).run(_state())
+        else:
+            await MedicalAgentGraph(message_id=uuid.uuid4()).run(_state())
+
+    started = time.perf_counter()
+    await asyncio.gather(*[chat(i) for i in range(CHATS)])
+    return pool, time.perf_counter() - started
+
+
+async def main():
+    graph_module.redaction_node = _redaction
+    graph_module.risk_gating_node = _risk_gating
+    graph_module.fact_extraction_node = _fact_extraction
+    graph_module.response_node = _response
+    profile_store_module.acquire_profile_advisory_lock = AsyncMock()
+    profile_store_module.record_profile_events = AsyncMock()
+
+    print(f"{CHATS} chats {ARRIVAL_SECONDS * 1000:.0f}ms apart, {LLM_SECONDS * 1000:.0f}ms per LLM node")
+    for pool_size in (CHATS, POOL_SIZE):
+        print(f"pool of {pool_size}:")
+        for label, hold_session in (("session per run", True), ("short sessions", False)):
+            pool, elapsed = await _run(hold_session, pool_size)
+            print(
+                f"  {label:16s} peak connections {pool.peak:2d}   "
+                f"mean pool wait {pool.wait_seconds / CHATS * 1000:7.1f}ms   wall {elapsed:5.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
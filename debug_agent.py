@@ -17,10 +17,12 @@ async def main():
         "conversation_id": conversation_id,
         "patient_id": patient_id,
         "raw_message": message_content,
+        "conversation_summary": None,
         "redacted_message": "",
         "phi_detected": False,
         "risk_assessment": None,
         "patient_profile": None,
+        "profile_context": None,
         "extracted_facts": None,
         "response": None,
         "should_escalate": False,
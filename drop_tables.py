@@ -10,7 +10,7 @@ async def drop_all_tables():
     """Drop all tables using CASCADE"""
     print("Dropping all tables with CASCADE...")
     
-    tables = ["audit_logs", "escalation_tickets", "messages", "patient_profiles", "conversations", "users"]
+    tables = ["profile_snapshots", "profile_events", "symptom_history", "audit_segments", "audit_chain_head", "audit_logs", "clinician_availability", "escalation_tickets", "messages", "patient_profiles", "conversations", "users", "alembic_version"]
     
     async with engine.begin() as conn:
         for table in tables:
@@ -21,8 +21,8 @@ async def drop_all_tables():
                 print(f"  Could not drop {table}: {e}")
     
     print("\nAll tables dropped successfully!")
-    print("\nNow restart the server with: python start.py")
-    print("The server will recreate all tables with the new schema.")
+    print("\nNow recreate the schema with: python -m backend.cli setup")
+    print("(python start.py runs this automatically)")
 
 
 if __name__ == "__main__":
@@ -47,6 +47,11 @@ messageInput.addEventListener('input', function () {
 });
 
 // Functions
+function authHeaders(extra = {}) {
+    // Session token issued by /auth/login
+    return { ...extra, 'Authorization': `Bearer ${currentUser.access_token}` };
+}
+
 async function handleLogin(username, password) {
     try {
         loginError.style.display = 'none';
@@ -82,7 +87,9 @@ async function handleLogin(username, password) {
 async function startConversation() {
     try {
         // First, check if patient has an existing active/escalated conversation
-        const checkResponse = await fetch(`${API_BASE}/conversations/patient/${currentUser.user_id}/latest`);
+        const checkResponse = await fetch(`${API_BASE}/conversations/patient/${currentUser.user_id}/latest`, {
+            headers: authHeaders()
+        });
         const checkData = await checkResponse.json();
 
         if (checkData.exists) {
@@ -91,7 +98,9 @@ async function startConversation() {
             console.log('Loading existing conversation:', currentConversation.id);
 
             // Load all existing messages
-            const messagesResponse = await fetch(`${API_BASE}/conversations/${currentConversation.id}`);
+            const messagesResponse = await fetch(`${API_BASE}/conversations/${currentConversation.id}`, {
+                headers: authHeaders()
+            });
             const conversationData = await messagesResponse.json();
 
             // Display all existing messages
@@ -105,8 +114,8 @@ async function startConversation() {
             console.log('Creating new conversation');
             const response = await fetch(`${API_BASE}/conversations`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ patient_id: currentUser.user_id })
+                headers: authHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({})
             });
 
             currentConversation = await response.json();
@@ -123,9 +132,8 @@ async function sendMessage() {
     const content = messageInput.value.trim();
     if (!content || !currentConversation) return;
 
-    // Disable input
-    messageInput.disabled = true;
-    sendBtn.disabled = true;
+    // Input stays enabled: follow-up messages sent while a reply is pending
+    // may be answered together (the server coalesces them into one reply)
 
     // Add patient message to UI
     addMessage('patient', content);
@@ -138,11 +146,15 @@ async function sendMessage() {
     try {
         const response = await fetch(`${API_BASE}/conversations/${currentConversation.id}/messages`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: authHeaders({ 'Content-Type': 'application/json' }),
             body: JSON.stringify({ content: content })
         });
 
-        const data = await response.json();
+        let data = await response.json();
+        if (response.status === 202) {
+            // Async mode: the agent runs in the background, poll for its reply
+            data = await waitForJob(data.job_id);
+        }
 
         // Add AI response
         if (data.response) {
@@ -153,8 +165,8 @@ async function sendMessage() {
             }, 500);
         }
 
-        // Show escalation notice
-        if (data.escalated) {
+        // Show escalation notice (once per batch, with the reply)
+        if (data.escalated && !data.coalesced) {
             setTimeout(() => {
                 addEscalationNotice();
             }, 1000);
@@ -164,12 +176,22 @@ async function sendMessage() {
         addMessage('ai', 'Sorry, I encountered an error. Please try again.');
         lastMessageCount++; // Count error message too
     } finally {
-        messageInput.disabled = false;
-        sendBtn.disabled = false;
         messageInput.focus();
     }
 }
 
+async function waitForJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const response = await fetch(`${API_BASE}/conversations/jobs/${jobId}`, {
+            headers: authHeaders()
+        });
+        const job = await response.json();
+        if (job.status === 'done') return job.result;
+        if (job.status === 'failed' || !response.ok) throw new Error(job.error || job.detail || 'Message processing failed');
+    }
+}
+
 function addMessage(sender, content, riskLevel = 'LOW') {
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${sender}`;
@@ -214,7 +236,9 @@ function addEscalationNotice() {
 
 async function loadEscalations() {
     try {
-        const response = await fetch(`${API_BASE}/escalations`);
+        const response = await fetch(`${API_BASE}/escalations`, {
+            headers: authHeaders()
+        });
         const escalations = await response.json();
 
         escalationsContainer.innerHTML = '';
@@ -249,6 +273,7 @@ function createEscalationCard(escalation) {
             <span class="risk-badge ${riskClass}">${escalation.risk_level} RISK</span>
         </div>
         <div class="clinical-summary">${escalation.clinical_summary}</div>
+        ${renderFollowUps(escalation.follow_ups || [])}
         <div style="margin-top: 16px;">
             <button class="icon-btn" onclick="respondToEscalation('${escalation.id}', '${escalation.conversation_id}')">
                 Respond to Patient
@@ -259,6 +284,34 @@ function createEscalationCard(escalation) {
     return card;
 }
 
+function renderFollowUps(followUps) {
+    if (followUps.length === 0) return '';
+
+    const items = followUps.map(followUp => `
+        <li class="follow-up${followUp.material ? ' material' : ''}">
+            <div class="follow-up-meta">
+                ${new Date(followUp.received_at + 'Z').toLocaleString()}
+                <span class="risk-badge ${escapeHtml(followUp.risk_level).toLowerCase()}">${escapeHtml(followUp.risk_level)}</span>
+                ${followUp.material ? `<span class="follow-up-material">${escapeHtml(followUp.material)}</span>` : ''}
+            </div>
+            <div>${escapeHtml(followUp.message)}</div>
+        </li>
+    `).join('');
+
+    return `
+        <div class="follow-ups">
+            <strong>Follow-ups (${followUps.length})</strong>
+            <ul>${items}</ul>
+        </div>
+    `;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text ?? '';
+    return div.innerHTML;
+}
+
 async function respondToEscalation(ticketId, conversationId) {
     const response = prompt('Enter your response to the patient:');
     if (!response) return;
@@ -266,9 +319,8 @@ async function respondToEscalation(ticketId, conversationId) {
     try {
         await fetch(`${API_BASE}/escalations/${ticketId}/respond`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: authHeaders({ 'Content-Type': 'application/json' }),
             body: JSON.stringify({
-                clinician_id: currentUser.user_id,
                 response_text: response
             })
         });
@@ -294,6 +346,10 @@ function showScreen(screen) {
 }
 
 function logout() {
+    if (currentUser) {
+        // Revoke the session token server-side (best effort)
+        fetch(`${API_BASE}/auth/logout`, { method: 'POST', headers: authHeaders() }).catch(() => {});
+    }
     currentUser = null;
     currentConversation = null;
 
@@ -323,7 +379,9 @@ function startMessagePolling() {
         if (!currentConversation) return;
 
         try {
-            const response = await fetch(`${API_BASE}/conversations/${currentConversation.id}`);
+            const response = await fetch(`${API_BASE}/conversations/${currentConversation.id}`, {
+                headers: authHeaders()
+            });
             const data = await response.json();
 
             // Check if there are new messages
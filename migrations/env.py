@@ -0,0 +1,58 @@
+"""
+Alembic environment (async engine, URL from backend.config)
+"""
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.config import get_settings
+from backend.database import Base
+
+# Import all models so they're registered with Base.metadata (autogenerate)
+from backend.models.user import User
+from backend.models.conversation import Conversation
+from backend.models.message import Message
+from backend.models.patient_profile import PatientProfile
+from backend.models.escalation import EscalationTicket
+from backend.models.clinician_availability import ClinicianAvailability
+from backend.models.symptom_history import SymptomHistory
+from backend.models.profile_history import ProfileEvent, ProfileSnapshot
+from backend.models.audit_log import AuditLog, AuditChainHead, AuditSegment
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+database_url = config.get_main_option("sqlalchemy.url") or get_settings().database_url
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of connecting (alembic upgrade head --sql)"""
+    context.configure(
+        url=database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    engine = create_async_engine(database_url)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
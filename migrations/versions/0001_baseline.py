@@ -0,0 +1,121 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+Tables exactly as init_db created them (Base.metadata.create_all) before
+migrations were introduced. A database that was created by init_db can be
+adopted with `alembic stamp 0001_baseline` followed by `alembic upgrade head`;
+the later revisions bring it to the current schema, including converting
+messages and audit_logs into partitioned tables (0007).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+user_role = sa.Enum("PATIENT", "CLINICIAN", name="userrole")
+conversation_status = sa.Enum("ACTIVE", "ESCALATED", "CLOSED", name="conversationstatus")
+sender_type = sa.Enum("PATIENT", "AI", "CLINICIAN", name="sendertype")
+risk_level = sa.Enum("LOW", "MEDIUM", "HIGH", "UNKNOWN", name="risklevel")
+escalation_status = sa.Enum("PENDING", "IN_PROGRESS", "RESOLVED", name="escalationstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("role", user_role, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "conversations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", conversation_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_conversations_patient_id", "conversations", ["patient_id"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("sender_type", sender_type, nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("risk_level", risk_level, nullable=True),
+        sa.Column("audio_url", sa.String(), nullable=True),
+        sa.Column("transcription_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_messages_conversation_id", "messages", ["conversation_id"])
+
+    op.create_table(
+        "patient_profiles",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("medications", postgresql.JSONB(), nullable=False),
+        sa.Column("symptoms", postgresql.JSONB(), nullable=False),
+        sa.Column("allergies", postgresql.JSONB(), nullable=False),
+        sa.Column("conditions", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_updated", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_patient_profiles_patient_id", "patient_profiles", ["patient_id"], unique=True)
+
+    op.create_table(
+        "escalation_tickets",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("assigned_clinician_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("reason", sa.Text(), nullable=False),
+        sa.Column("risk_level", sa.String(), nullable=False),
+        sa.Column("clinical_summary", sa.Text(), nullable=False),
+        sa.Column("status", escalation_status, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("resolved_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_escalation_tickets_conversation_id", "escalation_tickets", ["conversation_id"])
+    op.create_index("ix_escalation_tickets_patient_id", "escalation_tickets", ["patient_id"])
+
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("resource_type", sa.String(), nullable=False),
+        sa.Column("resource_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("metadata_hash", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_audit_logs_user_id", "audit_logs", ["user_id"])
+    op.create_index("ix_audit_logs_timestamp", "audit_logs", ["timestamp"])
+
+
+def downgrade() -> None:
+    for table in (
+        "audit_logs",
+        "escalation_tickets",
+        "patient_profiles",
+        "messages",
+        "conversations",
+        "users",
+    ):
+        op.drop_table(table)
+
+    for enum in (escalation_status, risk_level, sender_type, conversation_status, user_role):
+        enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""Archived symptom entries
+
+Revision ID: 0002_symptom_history
+Revises: 0001_baseline
+Create Date: 2026-10-19
+
+symptom_history: raw symptom entries that profile compaction moved out of
+patient_profiles.symptoms (backend/services/profile_compaction.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002_symptom_history"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "symptom_history",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("entry", postgresql.JSONB(), nullable=False),
+        sa.Column("archive_reason", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_symptom_history_patient_id", "symptom_history", ["patient_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("symptom_history")
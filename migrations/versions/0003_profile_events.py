@@ -0,0 +1,53 @@
+"""Profile event log and snapshots
+
+Revision ID: 0003_profile_events
+Revises: 0002_symptom_history
+Create Date: 2026-10-19
+
+- profile_events: append-only log of every change applied to a profile
+- profile_snapshots: full profile state every profile_snapshot_interval events
+- patient_profiles.version: sequence of the last event applied
+
+Existing profiles start at version 0 with no events; their current columns
+are the state that later events apply to.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003_profile_events"
+down_revision = "0002_symptom_history"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("patient_profiles", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+    op.create_table(
+        "profile_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("provenance_message_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_profile_events_patient_seq", "profile_events", ["patient_id", "seq"], unique=True)
+
+    op.create_table(
+        "profile_snapshots",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("patient_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("state", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_profile_snapshots_patient_version", "profile_snapshots", ["patient_id", "version"])
+
+
+def downgrade() -> None:
+    op.drop_table("profile_snapshots")
+    op.drop_table("profile_events")
+    op.drop_column("patient_profiles", "version")
@@ -0,0 +1,26 @@
+"""Precomputed prompt context per profile
+
+Revision ID: 0004_profile_context_digest
+Revises: 0003_profile_events
+Create Date: 2026-10-19
+
+patient_profiles.context_digest: prompt context for the profile's version
+(backend/services/profile_digest.py). NULL until the next write; readers
+build it on the fly meanwhile.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004_profile_context_digest"
+down_revision = "0003_profile_events"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("patient_profiles", sa.Column("context_digest", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("patient_profiles", "context_digest")
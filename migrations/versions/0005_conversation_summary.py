@@ -0,0 +1,29 @@
+"""Rolling conversation summary
+
+Revision ID: 0005_conversation_summary
+Revises: 0004_profile_context_digest
+Create Date: 2026-10-19
+
+- conversations.rolling_summary: bounded summary of the turns so far
+- conversations.summary_turns: turns folded into it (compare-and-set key)
+
+Existing conversations start without a summary; it is built from their
+next turn on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_conversation_summary"
+down_revision = "0004_profile_context_digest"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("rolling_summary", sa.Text(), nullable=True))
+    op.add_column("conversations", sa.Column("summary_turns", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("conversations", "summary_turns")
+    op.drop_column("conversations", "rolling_summary")
@@ -0,0 +1,47 @@
+"""Hash-chained audit entries and sealed segments
+
+Revision ID: 0006_audit_hash_chain
+Revises: 0005_conversation_summary
+Create Date: 2026-10-19
+
+- audit_logs.seq / prev_hash / entry_hash: the hash chain
+  (backend/services/audit.py). Rows written before this stay NULL and are
+  outside the chain.
+- audit_segments: Merkle roots over sealed ranges of the chain
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006_audit_hash_chain"
+down_revision = "0005_conversation_summary"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_logs", sa.Column("seq", sa.BigInteger(), nullable=True))
+    op.add_column("audit_logs", sa.Column("prev_hash", sa.String(64), nullable=True))
+    op.add_column("audit_logs", sa.Column("entry_hash", sa.String(64), nullable=True))
+    op.create_unique_constraint("audit_logs_seq_key", "audit_logs", ["seq"])
+
+    op.create_table(
+        "audit_segments",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("start_seq", sa.BigInteger(), nullable=False, unique=True),
+        sa.Column("end_seq", sa.BigInteger(), nullable=False),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column("prev_hash", sa.String(64), nullable=False),
+        sa.Column("last_entry_hash", sa.String(64), nullable=False),
+        sa.Column("merkle_root", sa.String(64), nullable=False),
+        sa.Column("sealed_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("audit_segments")
+    op.drop_constraint("audit_logs_seq_key", "audit_logs", type_="unique")
+    op.drop_column("audit_logs", "entry_hash")
+    op.drop_column("audit_logs", "prev_hash")
+    op.drop_column("audit_logs", "seq")
@@ -0,0 +1,146 @@
+"""Partition messages and audit_logs by month
+
+Revision ID: 0007_partition_messages_audit_logs
+Revises: 0006_audit_hash_chain
+Create Date: 2026-10-19
+
+Postgres cannot turn an existing table into a partitioned one, so each table
+is rebuilt: the old table is renamed, the partitioned table is created under
+the original name (the partition key joins the primary key), a monthly
+partition is created for every month that has rows plus a DEFAULT partition,
+the rows are copied over and the old table is dropped. Partitions for the
+current and upcoming months are left to ensure_partitions
+(backend/services/partitions.py).
+
+The copy runs in the migration transaction and locks both tables until it
+commits; run it in a maintenance window on large databases.
+
+Also adds audit_chain_head, the pointer to the newest chained audit entry,
+initialized from the copied chain.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0007_partition_messages_audit_logs"
+down_revision = "0006_audit_hash_chain"
+branch_labels = None
+depends_on = None
+
+# Existing enum types (created by the baseline)
+sender_type = postgresql.ENUM(name="sendertype", create_type=False)
+risk_level = postgresql.ENUM(name="risklevel", create_type=False)
+
+MESSAGE_COLUMNS = "id, conversation_id, sender_type, content, risk_level, audio_url, transcription_id, created_at"
+AUDIT_COLUMNS = "id, user_id, action, resource_type, resource_id, metadata_hash, seq, prev_hash, entry_hash, timestamp"
+
+
+def _create_messages(partitioned: bool) -> None:
+    op.create_table(
+        "messages",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("conversation_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("sender_type", sender_type, nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("risk_level", risk_level, nullable=True),
+        sa.Column("audio_url", sa.String(), nullable=True),
+        sa.Column("transcription_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", "created_at") if partitioned else sa.PrimaryKeyConstraint("id"),
+        **({"postgresql_partition_by": "RANGE (created_at)"} if partitioned else {}),
+    )
+    op.create_index("ix_messages_conversation_id", "messages", ["conversation_id"])
+
+
+def _create_audit_logs(partitioned: bool) -> None:
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("resource_type", sa.String(), nullable=False),
+        sa.Column("resource_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("metadata_hash", sa.String(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=True),
+        sa.Column("prev_hash", sa.String(64), nullable=True),
+        sa.Column("entry_hash", sa.String(64), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", "timestamp") if partitioned else sa.PrimaryKeyConstraint("id"),
+        **({"postgresql_partition_by": "RANGE (timestamp)"} if partitioned else {}),
+    )
+    op.create_index("ix_audit_logs_user_id", "audit_logs", ["user_id"])
+    op.create_index("ix_audit_logs_timestamp", "audit_logs", ["timestamp"])
+    if partitioned:
+        # A partitioned table cannot enforce uniqueness on seq alone (the chain lock does)
+        op.create_index("ix_audit_logs_seq", "audit_logs", ["seq"])
+    else:
+        op.create_unique_constraint("audit_logs_seq_key", "audit_logs", ["seq"])
+
+
+def _set_aside(table: str, constraints: list, indexes: list) -> str:
+    """Rename the table and drop its index-backed constraints and indexes so the new table can reuse the names"""
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    for constraint in constraints:
+        op.execute(f"ALTER TABLE {old} DROP CONSTRAINT {constraint}")
+    for index in indexes:
+        op.execute(f"DROP INDEX {index}")
+    return old
+
+
+def _create_monthly_partitions(table: str, key: str, source: str) -> None:
+    """One partition per month that has rows in source, named like partition_name()"""
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+        BEGIN
+            FOR month IN SELECT DISTINCT date_trunc('month', {key})::date FROM {source} LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+    """)
+
+
+def upgrade() -> None:
+    old = _set_aside("messages", ["messages_pkey"], ["ix_messages_conversation_id"])
+    _create_messages(partitioned=True)
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+    _create_monthly_partitions("messages", "created_at", old)
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM {old}")
+    op.drop_table(old)
+
+    old = _set_aside("audit_logs", ["audit_logs_pkey", "audit_logs_seq_key"], ["ix_audit_logs_user_id", "ix_audit_logs_timestamp"])
+    _create_audit_logs(partitioned=True)
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+    _create_monthly_partitions("audit_logs", "timestamp", old)
+    op.execute(f"INSERT INTO audit_logs ({AUDIT_COLUMNS}) SELECT {AUDIT_COLUMNS} FROM {old}")
+    op.drop_table(old)
+
+    op.create_table(
+        "audit_chain_head",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("entry_hash", sa.String(64), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO audit_chain_head (id, seq, entry_hash) "
+        "SELECT 1, seq, entry_hash FROM audit_logs WHERE seq IS NOT NULL ORDER BY seq DESC LIMIT 1"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("audit_chain_head")
+
+    old = _set_aside("audit_logs", ["audit_logs_pkey"], ["ix_audit_logs_user_id", "ix_audit_logs_timestamp", "ix_audit_logs_seq"])
+    _create_audit_logs(partitioned=False)
+    op.execute(f"INSERT INTO audit_logs ({AUDIT_COLUMNS}) SELECT {AUDIT_COLUMNS} FROM {old}")
+    op.drop_table(old)  # Drops its partitions too
+
+    old = _set_aside("messages", ["messages_pkey"], ["ix_messages_conversation_id"])
+    _create_messages(partitioned=False)
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM {old}")
+    op.drop_table(old)
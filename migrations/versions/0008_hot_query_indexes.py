@@ -0,0 +1,77 @@
+"""Composite indexes for the hot queries
+
+Revision ID: 0008_hot_query_indexes
+Revises: 0007_partition_messages_audit_logs
+Create Date: 2026-10-19
+
+- conversations (patient_id, status, updated_at DESC): get_latest_conversation
+- messages (conversation_id, created_at): get_conversation history
+- escalation_tickets (status, created_at DESC): clinician queue
+
+Indexes are built with CREATE INDEX CONCURRENTLY so writers are not blocked.
+Postgres cannot build a partitioned index concurrently, so for messages the
+parent index is created ON ONLY the parent (invalid, no build) and each
+partition's index is built concurrently and attached; the parent index
+becomes valid once every partition has one. Partitions created later get the
+index automatically.
+
+The single-column indexes these replace are dropped afterwards.
+"""
+from alembic import context, op
+from sqlalchemy import text
+
+revision = "0008_hot_query_indexes"
+down_revision = "0007_partition_messages_audit_logs"
+branch_labels = None
+depends_on = None
+
+MESSAGES_INDEX = "ix_messages_conversation_created"
+
+
+def _message_partitions() -> list:
+    if context.is_offline_mode():
+        # --sql: the monthly partitions depend on the data, assume only the default one
+        return ["messages_default"]
+    result = op.get_bind().execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'messages' ORDER BY child.relname"
+    ))
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    partitions = _message_partitions()
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_patient_status_updated "
+            "ON conversations (patient_id, status, updated_at DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_escalation_tickets_status_created "
+            "ON escalation_tickets (status, created_at DESC)"
+        )
+
+        op.execute(f"CREATE INDEX IF NOT EXISTS {MESSAGES_INDEX} ON ONLY messages (conversation_id, created_at)")
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_conversation_created "
+                f"ON {partition} (conversation_id, created_at)"
+            )
+            op.execute(f"ALTER INDEX {MESSAGES_INDEX} ATTACH PARTITION {partition}_conversation_created")
+
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversations_patient_id")
+    # Partitioned indexes cannot be dropped concurrently (brief lock on messages)
+    op.execute("DROP INDEX IF EXISTS ix_messages_conversation_id")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_messages_conversation_id ON messages (conversation_id)")
+    op.execute(f"DROP INDEX IF EXISTS {MESSAGES_INDEX}")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_patient_id ON conversations (patient_id)")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_escalation_tickets_status_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversations_patient_status_updated")
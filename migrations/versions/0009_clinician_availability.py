@@ -0,0 +1,46 @@
+"""Clinician availability and load for automatic escalation assignment
+
+Revision ID: 0009_clinician_availability
+Revises: 0008_hot_query_indexes
+Create Date: 2026-10-19
+
+- clinician_availability: one row per clinician (available flag, open
+  ticket count, optional cap, last assignment time)
+- escalation_tickets (assigned_clinician_id, status): a clinician's open
+  tickets (load recount, next-ticket lookup)
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0009_clinician_availability"
+down_revision = "0008_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "clinician_availability",
+        sa.Column("clinician_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("available", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("open_tickets", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_open_tickets", sa.Integer(), nullable=True),
+        sa.Column("last_assigned_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_clinician_availability_load", "clinician_availability", ["available", "open_tickets"])
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_escalation_tickets_assigned_status "
+            "ON escalation_tickets (assigned_clinician_id, status)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_escalation_tickets_assigned_status")
+    op.drop_index("ix_clinician_availability_load", table_name="clinician_availability")
+    op.drop_table("clinician_availability")
@@ -0,0 +1,41 @@
+"""Follow-ups on escalation tickets
+
+Revision ID: 0010_escalation_follow_ups
+Revises: 0009_clinician_availability
+Create Date: 2026-10-19
+
+Repeated escalations in a conversation with an open ticket are appended to
+it (backend/services/escalation_coalescer.py):
+
+- follow_ups: the later escalating messages
+- summarized_follow_ups: how many of them the SBAR covers
+- summary_updated_at: last SBAR regeneration (debounce)
+
+The columns are added with constant defaults, so no table rewrite.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0010_escalation_follow_ups"
+down_revision = "0009_clinician_availability"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "escalation_tickets",
+        sa.Column("follow_ups", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb"))
+    )
+    op.add_column(
+        "escalation_tickets",
+        sa.Column("summarized_follow_ups", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column("escalation_tickets", sa.Column("summary_updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("escalation_tickets", "summary_updated_at")
+    op.drop_column("escalation_tickets", "summarized_follow_ups")
+    op.drop_column("escalation_tickets", "follow_ups")
@@ -0,0 +1,33 @@
+"""Source of each message's risk label
+
+Revision ID: 0011_message_risk_source
+Revises: 0010_escalation_follow_ups
+Create Date: 2026-10-19
+
+messages.risk_source records what produced risk_level (LLM triage, risk
+keywords, the local pre-classifier, a reused near-duplicate result, ...), so
+the pre-classifier is trained and evaluated on LLM and keyword labels only
+rather than on its own or the cache's output.
+
+The column is nullable with no default (no table rewrite); existing rows
+stay NULL and are left out of training.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_message_risk_source"
+down_revision = "0010_escalation_follow_ups"
+branch_labels = None
+depends_on = None
+
+risk_source = sa.Enum("LLM", "KEYWORD", "FALLBACK", "CLASSIFIER", "CACHE", "COALESCED", name="risksource")
+
+
+def upgrade() -> None:
+    risk_source.create(op.get_bind(), checkfirst=True)
+    op.add_column("messages", sa.Column("risk_source", risk_source, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "risk_source")
+    risk_source.drop(op.get_bind(), checkfirst=True)
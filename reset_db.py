@@ -11,6 +11,10 @@ from backend.models.conversation import Conversation
 from backend.models.message import Message
 from backend.models.patient_profile import PatientProfile
 from backend.models.escalation import EscalationTicket
+from backend.models.clinician_availability import ClinicianAvailability
+from backend.models.symptom_history import SymptomHistory
+from backend.models.profile_history import ProfileEvent, ProfileSnapshot
+from backend.models.audit_log import AuditLog, AuditChainHead, AuditSegment
 
 
 async def reset_database():
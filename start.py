@@ -23,6 +23,16 @@ def main():
             print("Error: .env.example not found!")
             return
     
+    # Schema and test users (workers no longer do this on startup)
+    print("Database: Applying migrations and seeding test users")
+    setup = subprocess.run(
+        [sys.executable, "-m", "backend.cli", "setup"],
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if setup.returncode != 0:
+        print("Error: Database setup failed (is PostgreSQL running?)")
+        return
+    
     print("Starting servers...\n")
     
     # Start backend
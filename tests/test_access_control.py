@@ -6,6 +6,7 @@ from backend.main import app
 from backend.database import get_db
 from backend.models.conversation import Conversation
 from backend.models.user import User, UserRole
+from backend.services.tokens import token_service
 
 # How to run:
 # pytest tests/test_access_control.py
@@ -99,3 +100,64 @@ def test_patient_cannot_fetch_triage_queue():
          pytest.fail("Security Vulnerability: Patient could access triage queue")
     
     assert response.status_code == 403
+
+
+def _auth_headers(user_id, role):
+    return {"Authorization": f"Bearer {token_service.issue(user_id, role)}"}
+
+
+def test_patient_token_cannot_read_another_patients_conversation():
+    """Ownership is enforced from the signed token, not from client-supplied ids"""
+    client = TestClient(app)
+    patient_a_id = uuid.uuid4()
+    
+    mock_conversation = MagicMock()
+    mock_conversation.patient_id = uuid.uuid4()
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = mock_conversation
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = mock_result
+    
+    async def override_get_db():
+        yield mock_session
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        headers = _auth_headers(patient_a_id, UserRole.PATIENT)
+        response = client.get(f"/api/v1/conversations/{uuid.uuid4()}", headers=headers)
+        assert response.status_code == 403
+        
+        response = client.post(f"/api/v1/conversations/{uuid.uuid4()}/messages", json={"content": "hi"}, headers=headers)
+        assert response.status_code == 403
+        
+        response = client.get(f"/api/v1/profile/{uuid.uuid4()}", headers=headers)
+        assert response.status_code == 403
+        
+        # Only the conversation lookup ran; no user lookups
+        assert mock_session.execute.await_count == 2
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_triage_queue_requires_clinician_token():
+    client = TestClient(app)
+    
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = []
+    mock_session = AsyncMock()
+    mock_session.execute.return_value = mock_result
+    
+    async def override_get_db():
+        yield mock_session
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        patient = client.get("/api/v1/escalations", headers=_auth_headers(uuid.uuid4(), UserRole.PATIENT))
+        assert patient.status_code == 403
+        
+        invalid = client.get("/api/v1/escalations", headers={"Authorization": "Bearer forged.token.value"})
+        assert invalid.status_code == 401
+        
+        clinician = client.get("/api/v1/escalations", headers=_auth_headers(uuid.uuid4(), UserRole.CLINICIAN))
+        assert clinician.status_code == 200
+        assert clinician.json() == []
+    finally:
+        app.dependency_overrides.clear()
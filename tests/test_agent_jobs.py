@@ -0,0 +1,176 @@
+import asyncio
+import uuid
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.database import get_db
+from backend.api.v1 import conversations as conversations_module
+from backend.models.user import UserRole
+from backend.services.agent_jobs import URGENT, AgentJobQueue, QueueFull
+from backend.services.tokens import token_service
+
+# How to run:
+# pytest tests/test_agent_jobs.py
+
+
+async def _wait(job):
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(0.01)
+    return job
+
+
+@pytest.mark.asyncio
+async def test_high_priority_jobs_run_first():
+    queue = AgentJobQueue(workers=1, max_queue=10, job_ttl_seconds=60)
+    await queue.start()
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker(job):
+        await gate.wait()
+
+    def record(name):
+        async def fn(job):
+            order.append(name)
+            return name
+        return fn
+
+    owner, conversation = uuid.uuid4(), uuid.uuid4()
+    queue.submit(owner, conversation, blocker)
+    await asyncio.sleep(0)  # the single worker is now busy
+    low = queue.submit(owner, conversation, record("low"), priority=1)
+    high = queue.submit(owner, conversation, record("high"), priority=0)
+    gate.set()
+
+    await _wait(low)
+    assert order == ["high", "low"]
+    assert high.status == "done" and high.result == "high"
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failures_and_early_results_are_recorded():
+    queue = AgentJobQueue(workers=2, max_queue=10, job_ttl_seconds=60)
+    await queue.start()
+    follow_up = asyncio.Event()
+
+    async def failing(job):
+        raise RuntimeError("Gemini timeout")
+
+    async def early(job):
+        job.finish({"response": "ok"})
+        await asyncio.sleep(0.05)  # e.g. the summary refresh
+        follow_up.set()
+
+    owner, conversation = uuid.uuid4(), uuid.uuid4()
+    failed = await _wait(queue.submit(owner, conversation, failing))
+    done = await _wait(queue.submit(owner, conversation, early))
+
+    assert failed.status == "failed" and "Gemini timeout" in failed.error
+    assert done.result == {"response": "ok"}
+    assert not follow_up.is_set()  # published before the follow-up work finished
+    await queue.stop()
+    assert follow_up.is_set()  # stop drains in-flight work
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected():
+    queue = AgentJobQueue(workers=1, max_queue=1, job_ttl_seconds=60)
+    await queue.start()
+    gate = asyncio.Event()
+
+    async def blocker(job):
+        await gate.wait()
+
+    owner, conversation = uuid.uuid4(), uuid.uuid4()
+    queue.submit(owner, conversation, blocker)
+    await asyncio.sleep(0)
+    queue.submit(owner, conversation, blocker)
+    with pytest.raises(QueueFull):
+        queue.submit(owner, conversation, blocker)
+
+    gate.set()
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout_drops_only_routine_jobs():
+    queue = AgentJobQueue(workers=1, max_queue=10, job_ttl_seconds=60)
+    await queue.start()
+    gate = asyncio.Event()
+
+    async def slow(job):
+        await gate.wait()
+        return "slow"
+
+    async def quick(job):
+        return "quick"
+
+    owner, conversation = uuid.uuid4(), uuid.uuid4()
+    queue.submit(owner, conversation, slow)
+    await asyncio.sleep(0)
+    routine = queue.submit(owner, conversation, quick, priority=1)
+    urgent = queue.submit(owner, conversation, quick, priority=URGENT)
+
+    stopping = asyncio.create_task(queue.stop(drain_seconds=0.05))
+    await asyncio.sleep(0.1)
+    assert not stopping.done()  # Still waiting for the HIGH-keyword job
+    gate.set()
+    await stopping
+
+    assert urgent.status == "done"
+    assert routine.status == "failed" and routine.error == "Dropped at shutdown"
+
+
+@pytest.mark.asyncio
+async def test_send_message_returns_202_and_job_result(monkeypatch):
+    queue = AgentJobQueue(workers=2, max_queue=10, job_ttl_seconds=60)
+    await queue.start()
+    monkeypatch.setattr(conversations_module, "agent_jobs", queue)
+    monkeypatch.setattr(conversations_module.settings, "agent_async_mode", True)
+    monkeypatch.setattr(conversations_module.audit_service, "log_action", AsyncMock())
+    monkeypatch.setattr(conversations_module.conversation_summary_service, "refresh", AsyncMock())
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=0)
+    monkeypatch.setattr(conversations_module, "message_limiter", limiter)
+
+    async def fake_process(turn, messages):
+        await asyncio.sleep(0.05)
+        return {"response": "Rest and fluids.", "should_escalate": False, "risk_assessment": {"risk_level": "LOW"}}
+
+    monkeypatch.setattr(conversations_module, "process_patient_message", fake_process)
+
+    patient_id = uuid.uuid4()
+    conversation = MagicMock()
+    conversation.id = uuid.uuid4()
+    conversation.patient_id = patient_id
+    conversation_result = MagicMock()
+    conversation_result.scalar_one_or_none.return_value = conversation
+
+    async def override_get_db():
+        session = AsyncMock()
+        session.add = MagicMock()
+        session.execute.return_value = conversation_result
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    owner = {"Authorization": f"Bearer {token_service.issue(patient_id, UserRole.PATIENT)}"}
+    other = {"Authorization": f"Bearer {token_service.issue(uuid.uuid4(), UserRole.PATIENT)}"}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            accepted = await client.post(f"/api/v1/conversations/{conversation.id}/messages",
+                                         json={"content": "I have a cold"}, headers=owner)
+            assert accepted.status_code == 202
+            job_id = accepted.json()["job_id"]
+
+            await _wait(queue.get(job_id))
+            status = await client.get(f"/api/v1/conversations/jobs/{job_id}", headers=owner)
+            forbidden = await client.get(f"/api/v1/conversations/jobs/{job_id}", headers=other)
+    finally:
+        app.dependency_overrides.clear()
+        await queue.stop()
+
+    assert status.json()["status"] == "done"
+    assert status.json()["result"]["response"] == "Rest and fluids."
+    assert forbidden.status_code == 403
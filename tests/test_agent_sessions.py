@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.orm import Session
+from backend.agent import graph as graph_module
+from backend.agent.graph import MedicalAgentGraph
+from backend.agent.nodes import escalation_node as escalation_module
+from backend.database import PoolOccupancy
+from backend.services import profile_store as profile_store_module
+from backend.services.metrics import metrics
+from backend.services.profile_store import ProfileUnitOfWork
+
+# How to run:
+# pytest tests/test_agent_sessions.py
+
+
+class SessionTracker:
+    """Stands in for session_scope: counts sessions open at any moment"""
+
+    def __init__(self):
+        self.open = 0
+        self.opened = 0
+
+    @asynccontextmanager
+    async def scope(self, db=None):
+        if db is not None:
+            yield db
+            return
+        session = AsyncMock(sync_session=Session())
+        session.add = MagicMock()
+        empty = MagicMock()
+        empty.scalar_one_or_none.return_value = None
+        session.execute.return_value = empty
+        self.open += 1
+        self.opened += 1
+        try:
+            yield session
+        finally:
+            self.open -= 1
+
+
+def _initial_state(patient_id):
+    return {
+        "conversation_id": str(uuid.uuid4()),
+        "patient_id": str(patient_id),
+        "raw_message": "I started taking ibuprofen",
+        "conversation_summary": None,
+        "redacted_message": "",
+        "phi_detected": False,
+        "risk_assessment": None,
+        "patient_profile": None,
+        "profile_context": None,
+        "extracted_facts": None,
+        "response": None,
+        "should_escalate": False,
+        "escalation_ticket_id": None,
+        "error": None
+    }
+
+
+@pytest.mark.asyncio
+async def test_no_session_is_held_while_the_llm_nodes_run(monkeypatch):
+    tracker = SessionTracker()
+    open_during_llm = []
+
+    async def redaction(state):
+        state["redacted_message"] = state["raw_message"]
+        return state
+
+    async def risk_gating(state, should_escalate=False):
+        open_during_llm.append(tracker.open)
+        await asyncio.sleep(0.01)
+        state["risk_assessment"] = {"risk_level": "HIGH" if should_escalate else "LOW", "reason": "test"}
+        state["should_escalate"] = should_escalate
+        return state
+
+    async def fact_extraction(state):
+        open_during_llm.append(tracker.open)
+        await asyncio.sleep(0.01)
+        state["extracted_facts"] = {"medications": [{"name": "Ibuprofen", "action": "ADD", "status": "ACTIVE"}]}
+        return state
+
+    async def respond(state):
+        open_during_llm.append(tracker.open)
+        await asyncio.sleep(0.01)
+        state["response"] = "Noted."
+        return state
+
+    monkeypatch.setattr(graph_module, "session_scope", tracker.scope)
+    monkeypatch.setattr(graph_module, "redaction_node", redaction)
+    monkeypatch.setattr(graph_module, "risk_gating_node", risk_gating)
+    monkeypatch.setattr(graph_module, "fact_extraction_node", fact_extraction)
+    monkeypatch.setattr(graph_module, "response_node", respond)
+    monkeypatch.setattr(profile_store_module, "acquire_profile_advisory_lock", AsyncMock())
+    monkeypatch.setattr(profile_store_module, "record_profile_events", AsyncMock())
+
+    result = await MedicalAgentGraph(message_id=uuid.uuid4()).run(_initial_state(uuid.uuid4()))
+
+    assert result["response"] == "Noted."
+    assert open_during_llm == [0, 0, 0]
+    assert tracker.opened == 2  # profile read, profile write
+    assert tracker.open == 0
+
+    # Escalation: read and ticket write in their own sessions around the SBAR call
+    async def generate(tier, prompt):
+        open_during_llm.append(tracker.open)
+        return "SBAR"
+
+    monkeypatch.setattr(escalation_module, "session_scope", tracker.scope)
+    monkeypatch.setattr(escalation_module.llm, "generate", generate)
+
+    async def high_risk(state):
+        return await risk_gating(state, should_escalate=True)
+
+    monkeypatch.setattr(graph_module, "risk_gating_node", high_risk)
+    open_during_llm.clear()
+    tracker.opened = 0
+
+    result = await MedicalAgentGraph(message_id=uuid.uuid4()).run(_initial_state(uuid.uuid4()))
+
+    assert result["escalation_ticket_id"] is not None
+    assert open_during_llm == [0, 0]
+    assert tracker.opened == 2  # profile read, ticket write
+    assert tracker.open == 0
+
+
+@pytest.mark.asyncio
+async def test_commit_rereads_the_profile_under_the_lock(monkeypatch):
+    lock = AsyncMock()
+    record = AsyncMock()
+    monkeypatch.setattr(profile_store_module, "acquire_profile_advisory_lock", lock)
+    monkeypatch.setattr(profile_store_module, "record_profile_events", record)
+
+    stale, latest = MagicMock(version=3), MagicMock(version=4)
+    read_db, write_db = AsyncMock(), AsyncMock(sync_session=Session())
+    read_db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=stale))
+    write_db.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=latest))
+
+    uow = ProfileUnitOfWork(uuid.uuid4())
+    await uow.view(read_db)
+    lock.assert_not_awaited()  # the read takes no lock
+
+    uow.stage([{"event_type": "MEDICATION_ADDED"}])
+    await uow.commit(write_db)
+
+    lock.assert_awaited_once_with(write_db, uow.patient_id)
+    assert record.await_args.args[1] is latest
+    assert not uow.has_changes
+
+
+def test_pool_occupancy_gauges():
+    metrics.reset()
+    occupancy = PoolOccupancy()
+    occupancy.checkout()
+    occupancy.checkout()
+    occupancy.checkin()
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["db_pool_checked_out"] == 1
+    assert gauges["db_pool_checked_out_peak"] == 2
@@ -0,0 +1,122 @@
+import pytest
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from backend.services.audit import (
+    AuditService,
+    CHAIN_FIELDS,
+    GENESIS_HASH,
+    append_chained,
+    compute_entry_hash,
+)
+from backend.models.audit_log import AuditLog
+from backend.services.audit_verify import merkle_root, verify_segment
+
+
+def _rows(count, start=datetime(2026, 1, 1)):
+    return [
+        {
+            "id": uuid.uuid4(),
+            "user_id": uuid.uuid4(),
+            "action": "MESSAGE_SENT",
+            "resource_type": "Message",
+            "resource_id": uuid.uuid4(),
+            "metadata_hash": "abc",
+            "timestamp": start + timedelta(seconds=i)
+        }
+        for i in range(count)
+    ]
+
+
+async def _chain(rows, tail=None):
+    result = MagicMock()
+    result.first.return_value = tail
+    conn = AsyncMock()
+    conn.execute.side_effect = [MagicMock(), result, MagicMock(), MagicMock()]
+    await append_chained(conn, rows)
+    return rows
+
+
+def _as_tuples(rows):
+    return [tuple(row[field] for field in CHAIN_FIELDS) + (row["prev_hash"], row["entry_hash"]) for row in rows]
+
+
+def _job(rows, **extra):
+    return {"start_seq": rows[0]["seq"], "prev_hash": rows[0]["prev_hash"], "rows": _as_tuples(rows), **extra}
+
+
+@pytest.mark.asyncio
+async def test_rows_are_linked_to_their_predecessor():
+    rows = await _chain(_rows(3))
+
+    assert [row["seq"] for row in rows] == [1, 2, 3]
+    assert rows[0]["prev_hash"] == GENESIS_HASH
+    assert rows[1]["prev_hash"] == rows[0]["entry_hash"]
+    assert rows[2]["entry_hash"] == compute_entry_hash(rows[1]["entry_hash"], rows[2])
+    assert AuditService.verify_entry(AuditLog(**rows[2]))
+
+
+@pytest.mark.asyncio
+async def test_chain_continues_from_stored_tail():
+    rows = await _chain(_rows(1), tail=(41, "f" * 64))
+
+    assert rows[0]["seq"] == 42
+    assert rows[0]["prev_hash"] == "f" * 64
+
+
+@pytest.mark.asyncio
+async def test_verify_segment_accepts_intact_sealed_segment():
+    rows = await _chain(_rows(5))
+    job = _job(rows, last_entry_hash=rows[-1]["entry_hash"], merkle_root=merkle_root([r["entry_hash"] for r in rows]))
+
+    outcome = verify_segment(job)
+
+    assert outcome["ok"], outcome["error"]
+    assert outcome["rows"] == 5
+
+
+@pytest.mark.asyncio
+async def test_verify_segment_detects_edited_row():
+    rows = await _chain(_rows(5))
+    rows[2]["action"] = "PROFILE_UPDATED"
+
+    outcome = verify_segment(_job(rows))
+
+    assert not outcome["ok"]
+    assert outcome["error"].startswith("seq 3:")
+
+
+@pytest.mark.asyncio
+async def test_verify_segment_detects_deleted_row():
+    rows = await _chain(_rows(5))
+    del rows[1]
+
+    outcome = verify_segment(_job(rows))
+
+    assert not outcome["ok"]
+    assert outcome["error"].startswith("seq 2:")
+
+
+@pytest.mark.asyncio
+async def test_verify_segment_detects_rewritten_chain_against_seal():
+    """Recomputing every hash after an edit still breaks the sealed Merkle root"""
+    rows = await _chain(_rows(4))
+    sealed_root = merkle_root([r["entry_hash"] for r in rows])
+    sealed_last = rows[-1]["entry_hash"]
+
+    rows[1]["action"] = "PROFILE_UPDATED"
+    for i in range(1, len(rows)):
+        rows[i]["prev_hash"] = rows[i - 1]["entry_hash"]
+        rows[i]["entry_hash"] = compute_entry_hash(rows[i]["prev_hash"], rows[i])
+
+    outcome = verify_segment(_job(rows, last_entry_hash=sealed_last, merkle_root=sealed_root))
+
+    assert not outcome["ok"]
+
+
+def test_merkle_root_is_order_sensitive():
+    leaves = [compute_entry_hash(GENESIS_HASH, {field: i for field in CHAIN_FIELDS}) for i in range(3)]
+
+    assert merkle_root(leaves) != merkle_root(list(reversed(leaves)))
+    assert merkle_root(leaves[:1]) == leaves[0]
+    assert merkle_root([]) == GENESIS_HASH
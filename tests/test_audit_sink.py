@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from backend.services import audit
+from backend.services.audit import AuditSink, AuditService
+
+
+def _row(action="MESSAGE_SENT"):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "action": action,
+        "resource_type": "Message",
+        "resource_id": uuid.uuid4(),
+        "metadata_hash": "abc",
+        "timestamp": datetime.utcnow()
+    }
+
+
+@pytest.mark.asyncio
+async def test_events_are_written_in_batches(tmp_path):
+    """A full batch triggers one bulk write instead of one round trip per event"""
+    writes = []
+
+    async def writer(rows):
+        writes.append(list(rows))
+
+    sink = AuditSink(batch_size=10, flush_interval_ms=10_000, max_queue=100,
+                     spill_path=str(tmp_path / "spill.ndjson"), writer=writer)
+    await sink.start()
+    for _ in range(25):
+        assert sink.enqueue(_row())
+    await asyncio.sleep(0.05)
+
+    assert [len(batch) for batch in writes] == [10, 10]
+
+    await sink.stop()
+    assert [len(batch) for batch in writes] == [10, 10, 5]
+
+
+@pytest.mark.asyncio
+async def test_unwritten_events_spill_and_replay(tmp_path):
+    """Events that cannot reach the database survive a restart via the spill file"""
+    spill_path = tmp_path / "spill.ndjson"
+
+    async def failing_writer(rows):
+        raise ConnectionError("database down")
+
+    sink = AuditSink(batch_size=10, flush_interval_ms=10_000, max_queue=100,
+                     spill_path=str(spill_path), writer=failing_writer)
+    await sink.start()
+    rows = [_row(f"ACTION_{i}") for i in range(3)]
+    for row in rows:
+        sink.enqueue(row)
+    await sink.stop()
+
+    spilled = list(tmp_path.glob("spill.ndjson.*"))
+    assert len(spilled) == 1
+
+    written = []
+
+    async def writer(batch):
+        written.extend(batch)
+
+    restarted = AuditSink(batch_size=10, flush_interval_ms=10_000, max_queue=100,
+                          spill_path=str(spill_path), writer=writer)
+    await restarted.start()
+    await restarted.stop()
+
+    assert not list(tmp_path.iterdir())
+    assert written == rows
+
+
+@pytest.mark.asyncio
+async def test_spill_file_is_replayed_by_one_worker_only(tmp_path):
+    """A starting worker claims each spill file before replaying it"""
+    spill_path = tmp_path / "spill.ndjson"
+    (tmp_path / "spill.ndjson.123.abcd").write_text(audit._row_to_json(_row()) + "\n")
+    replayed = []
+
+    for _ in range(2):
+        async def writer(batch):
+            replayed.extend(batch)
+
+        sink = AuditSink(batch_size=10, flush_interval_ms=10_000, max_queue=100,
+                         spill_path=str(spill_path), writer=writer)
+        await sink.start()
+        await sink.stop()
+
+    assert len(replayed) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_rows_are_dead_lettered_without_blocking_the_queue(tmp_path):
+    """A batch the database rejects is bisected down to the offending row"""
+    dead_letter = tmp_path / "dead.ndjson"
+    written, attempts = [], []
+
+    async def writer(rows):
+        attempts.append(len(rows))
+        if any(row["action"] == "POISON" for row in rows):
+            raise ValueError("invalid input for column")
+        written.extend(rows)
+
+    sink = AuditSink(batch_size=8, flush_interval_ms=10_000, max_queue=100,
+                     spill_path=str(tmp_path / "spill.ndjson"), dead_letter_path=str(dead_letter), writer=writer)
+    await sink.start()
+    rows = [_row(f"ACTION_{i}") for i in range(8)]
+    rows[5]["action"] = "POISON"
+    for row in rows:
+        sink.enqueue(row)
+    await sink.stop()
+
+    assert written == rows[:5] + rows[6:]
+    assert attempts == [8, 4, 4, 2, 1, 1, 2]
+    assert [audit._row_from_json(line)["action"] for line in dead_letter.read_text().splitlines()] == ["POISON"]
+    assert not list(tmp_path.glob("spill.ndjson*"))
+
+
+@pytest.mark.asyncio
+async def test_log_action_writes_directly_without_sink(monkeypatch):
+    """When the sink is not running (or full) the event is chained in its own short transaction"""
+    monkeypatch.setattr(audit.audit_sink, "enqueue", lambda row: False)
+    tail = MagicMock()
+    tail.first.return_value = None
+    conn = AsyncMock()
+    conn.execute.side_effect = [MagicMock(), tail, MagicMock(), MagicMock()]  # chain lock, head read, insert, head update
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = conn
+    monkeypatch.setattr("backend.database.engine", engine)
+    mock_db = AsyncMock()
+
+    entry = await AuditService.log_action(
+        db=mock_db,
+        user_id=uuid.uuid4(),
+        action="MESSAGE_SENT",
+        resource_type="Message",
+        resource_id=uuid.uuid4(),
+        content="My SSN is 123-45-6789"
+    )
+
+    mock_db.execute.assert_not_awaited()  # The caller's transaction never takes the chain lock
+    engine.begin.assert_called_once()
+    assert conn.execute.await_count == 4
+    assert entry.seq == 1
+    assert "123-45-6789" not in entry.metadata_hash
@@ -0,0 +1,88 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from backend.models.clinician_availability import ClinicianAvailability
+from backend.models.escalation import EscalationTicket, EscalationStatus
+from backend.services.clinician_assignment import assign_ticket, update_ticket
+from backend.services.escalation_dispatch import EscalationDispatcher
+
+# How to run:
+# pytest tests/test_clinician_assignment.py
+
+
+def _ticket(risk_level, minutes_ago, assignee=None, status=EscalationStatus.PENDING):
+    return EscalationTicket(
+        id=uuid.uuid4(),
+        risk_level=risk_level,
+        status=status,
+        assigned_clinician_id=assignee,
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+    )
+
+
+def _sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_assigns_least_loaded_clinician_with_skip_locked():
+    clinician = ClinicianAvailability(clinician_id=uuid.uuid4(), available=True, open_tickets=2)
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = clinician
+    db = AsyncMock()
+    db.execute.return_value = result
+    ticket = _ticket("HIGH", 0)
+
+    assert await assign_ticket(db, ticket) == clinician.clinician_id
+    assert ticket.assigned_clinician_id == clinician.clinician_id
+    assert clinician.open_tickets == 3 and clinician.last_assigned_at is not None
+
+    sql = _sql(db.execute.await_args.args[0])
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY clinician_availability.open_tickets, clinician_availability.last_assigned_at ASC NULLS FIRST" in sql
+
+    # Nobody available (or all locked / at capacity): the ticket stays in the shared queue
+    result.scalar_one_or_none.return_value = None
+    unassigned = _ticket("HIGH", 0)
+    assert await assign_ticket(db, unassigned) is None
+    assert unassigned.assigned_clinician_id is None
+
+
+@pytest.mark.asyncio
+async def test_load_moves_with_takeover_and_is_released_on_resolve():
+    first, second = uuid.uuid4(), uuid.uuid4()
+    ticket = _ticket("MEDIUM", 5, assignee=first)
+    db = AsyncMock()
+
+    await update_ticket(db, ticket, EscalationStatus.IN_PROGRESS, second)
+    assert db.execute.await_count == 2  # -1 for the first clinician, +1 for the second
+
+    db.execute.reset_mock()
+    await update_ticket(db, ticket, EscalationStatus.IN_PROGRESS, second)
+    db.execute.assert_not_awaited()  # No change in who holds it
+
+    await update_ticket(db, ticket, EscalationStatus.RESOLVED, second)
+    assert db.execute.await_count == 1
+    assert ticket.status == EscalationStatus.RESOLVED
+
+
+def test_clinicians_only_pop_their_own_or_unassigned_tickets():
+    dispatcher = EscalationDispatcher()
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    alice_low = _ticket("LOW", 30, assignee=alice)
+    alice_high = _ticket("HIGH", 1, assignee=alice)
+    unassigned_medium = _ticket("MEDIUM", 10)
+    for ticket in (alice_low, alice_high, unassigned_medium):
+        dispatcher.track(ticket)
+
+    assert dispatcher.pop(bob) == (unassigned_medium.id, None)
+    assert dispatcher.pop(bob) is None
+    assert dispatcher.pop(alice) == (alice_high.id, alice)
+
+    # Released back to the shared queue when Alice goes unavailable
+    alice_low.assigned_clinician_id = None
+    dispatcher.track(alice_low)
+    assert dispatcher.pop(bob) == (alice_low.id, None)
+    assert dispatcher.pending == 0
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from backend.services import conversation_summary
+from backend.services.conversation_summary import ConversationSummaryService
+from backend.agent.nodes import risk_gating_node as risk_gating_module
+
+
+@pytest.mark.asyncio
+async def test_summary_stays_bounded_when_llm_fails(monkeypatch):
+    """Fallback summaries keep only the most recent text within the token budget"""
+    monkeypatch.setattr(conversation_summary.llm, "generate", AsyncMock(side_effect=RuntimeError("quota")))
+
+    service = ConversationSummaryService(max_tokens=20, cache_size=10)
+    summary = None
+    for turn in range(50):
+        summary = await service.summarize(summary, f"turn {turn}: my rash is spreading", None)
+
+    assert len(summary) <= 20 * 4
+    assert summary.endswith("turn 49: my rash is spreading")
+
+
+@pytest.mark.asyncio
+async def test_summary_uses_previous_summary_and_new_turn_only(monkeypatch):
+    """Each update sees only the previous summary plus the new exchange"""
+    generate = AsyncMock(return_value="Rash on arm since Tuesday.")
+    monkeypatch.setattr(conversation_summary.llm, "generate", generate)
+
+    service = ConversationSummaryService(max_tokens=200, cache_size=10)
+    summary = await service.summarize("Patient reports a rash.", "on my arm since Tuesday", "Thanks for the detail.")
+
+    tier, prompt = generate.call_args[0]
+    assert tier == "summary"
+    assert "Patient reports a rash." in prompt
+    assert "on my arm since Tuesday" in prompt
+    assert summary == "Rash on arm since Tuesday."
+
+
+@pytest.mark.asyncio
+async def test_summary_falls_back_when_the_tier_times_out(monkeypatch):
+    """A slow summary call keeps the previous summary plus the new message"""
+    monkeypatch.setattr(conversation_summary.llm, "generate", AsyncMock(side_effect=asyncio.TimeoutError()))
+
+    service = ConversationSummaryService(max_tokens=200, cache_size=10)
+    summary = await service.summarize("Patient reports a rash.", "on my arm", None)
+
+    assert summary == "Patient reports a rash. Patient: on my arm"
+
+
+def test_summary_cache_is_lru():
+    """Only the most recently updated conversations stay cached"""
+    service = ConversationSummaryService(max_tokens=50, cache_size=2)
+    service._remember("a", "summary a")
+    service._remember("b", "summary b")
+    service._remember("c", "summary c")
+
+    assert service.get_cached("a") is None
+    assert service.get_cached("c") == "summary c"
+
+
+@pytest.mark.asyncio
+async def test_refresh_folds_into_newer_summary_stored_by_another_worker(monkeypatch):
+    """The write only applies if summary_turns is unchanged; otherwise the stored summary is re-read"""
+    from backend import database
+
+    stale_read = MagicMock(first=MagicMock(return_value=("Rash on arm.", 4)))
+    fresh_read = MagicMock(first=MagicMock(return_value=("Rash on arm, now with fever.", 5)))
+    session = AsyncMock()
+    session.execute.side_effect = [stale_read, MagicMock(rowcount=0), fresh_read, MagicMock(rowcount=1)]
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory)
+    service = ConversationSummaryService(max_tokens=200, cache_size=10)
+    summarize = AsyncMock(side_effect=["first attempt", "Rash, fever, and now a headache."])
+    monkeypatch.setattr(service, "summarize", summarize)
+
+    conversation_id = uuid.uuid4()
+    await service.refresh(conversation_id, "and a headache", None)
+
+    assert [call.args[0] for call in summarize.await_args_list] == ["Rash on arm.", "Rash on arm, now with fever."]
+    update = session.execute.await_args_list[3].args[0]
+    assert update.compile().params["summary_turns_1"] == 5
+    assert service.get_cached(str(conversation_id)) == "Rash, fever, and now a headache."
+
+
+@pytest.mark.asyncio
+async def test_risk_gating_receives_rolling_summary(monkeypatch):
+    """risk_gating_node passes the conversation summary as assessment context"""
+    assess = AsyncMock(return_value={"risk_level": "LOW", "requires_escalation": False})
+    monkeypatch.setattr(risk_gating_module.risk_assessment_service, "assess_risk", assess)
+
+    state = {
+        "conversation_id": "conversation-a",
+        "redacted_message": "it is getting worse",
+        "conversation_summary": "Chest tightness since morning."
+    }
+    await risk_gating_module.risk_gating_node(state)
+
+    assert assess.call_args[1]["conversation_context"] == "Chest tightness since morning."
+    assert assess.call_args[1]["scope"] == "conversation-a"
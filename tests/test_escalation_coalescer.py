@@ -0,0 +1,141 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.agent.nodes import escalation_node as escalation_module
+from backend.agent.nodes.escalation_node import escalation_node
+from backend.models.escalation import EscalationTicket, EscalationStatus
+from backend.services import escalation_coalescer as coalescer_module
+from backend.services.escalation_coalescer import (
+    TrailingSbarUpdates, follow_up_entry, material_change, refresh_sbar, sbar_due, seconds_until_sbar_due
+)
+
+# How to run:
+# pytest tests/test_escalation_coalescer.py
+
+
+def _ticket(minutes_since_summary=0, risk_level="MEDIUM"):
+    return EscalationTicket(
+        id=uuid.uuid4(),
+        conversation_id=uuid.uuid4(),
+        patient_id=uuid.uuid4(),
+        reason="Persistent fever for three days",
+        risk_level=risk_level,
+        clinical_summary="**Situation**: Patient reports a high fever for three days.",
+        status=EscalationStatus.PENDING,
+        follow_ups=[],
+        summarized_follow_ups=0,
+        created_at=datetime.utcnow() - timedelta(minutes=30),
+        summary_updated_at=datetime.utcnow() - timedelta(minutes=minutes_since_summary)
+    )
+
+
+def _state(ticket, message, risk_level):
+    return {
+        "conversation_id": str(ticket.conversation_id),
+        "patient_id": str(ticket.patient_id),
+        "raw_message": message,
+        "redacted_message": message,
+        "risk_assessment": {"risk_level": risk_level, "reason": "test", "requires_escalation": True},
+        "patient_profile": None,
+        "profile_context": None,
+        "should_escalate": True,
+        "escalation_ticket_id": None,
+    }
+
+
+def test_material_change_needs_higher_risk_or_new_risk_terms():
+    ticket = _ticket()
+
+    assert material_change(ticket, "still have a high fever", {"risk_level": "MEDIUM"}) is None
+    assert material_change(ticket, "now I feel dizziness too", {"risk_level": "MEDIUM"}) == "new: dizziness"
+    assert material_change(ticket, "it hurts", {"risk_level": "HIGH"}) == "risk level raised to HIGH"
+    assert material_change(ticket, "feeling better", {"risk_level": "LOW"}) is None
+
+
+def test_sbar_regeneration_is_debounced_unless_risk_rises():
+    material = [follow_up_entry("now with dizziness", {"risk_level": "MEDIUM"}, "new: dizziness")]
+    raised = [follow_up_entry("I had a seizure", {"risk_level": "HIGH"}, "risk level raised to HIGH")]
+    repeat = [follow_up_entry("still feverish", {"risk_level": "MEDIUM"}, None)]
+
+    assert not sbar_due(_ticket(minutes_since_summary=0), material)
+    assert 100 < seconds_until_sbar_due(_ticket(minutes_since_summary=0), material) <= 120
+    assert sbar_due(_ticket(minutes_since_summary=10), material)
+    assert sbar_due(_ticket(minutes_since_summary=0), raised)
+    assert not sbar_due(_ticket(minutes_since_summary=10), repeat)
+    assert seconds_until_sbar_due(_ticket(minutes_since_summary=10), repeat) is None
+
+
+def _scope(session):
+    @asynccontextmanager
+    async def scope(db=None):
+        yield session
+    return scope
+
+
+@pytest.mark.asyncio
+async def test_repeat_escalations_become_follow_ups_on_the_open_ticket(monkeypatch):
+    ticket = _ticket(minutes_since_summary=0)
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=ticket))
+    trailing = MagicMock()
+    prompts = []
+
+    async def generate(tier, prompt):
+        prompts.append(prompt)
+        return "**Situation**: Fever, now with dizziness and a seizure."
+
+    monkeypatch.setattr(escalation_module, "session_scope", _scope(session))
+    monkeypatch.setattr(escalation_module.llm, "generate", generate)
+    monkeypatch.setattr(escalation_module, "trailing_sbar_updates", trailing)
+
+    # Repeat of what the ticket says: appended, no new ticket, no SBAR call
+    result = await escalation_node(_state(ticket, "my fever is still high", "MEDIUM"), None)
+    assert result["escalation_ticket_id"] == str(ticket.id)
+    assert len(ticket.follow_ups) == 1 and not prompts
+    session.add.assert_not_called()
+    trailing.schedule.assert_not_called()
+
+    # New symptom inside the debounce window: summarized when the window closes
+    await escalation_node(_state(ticket, "now I have dizziness", "MEDIUM"), None)
+    assert not prompts and ticket.summarized_follow_ups == 0
+    ticket_id, delay = trailing.schedule.call_args.args
+    assert ticket_id == ticket.id and 100 < delay <= 120
+
+    # Raised risk level: risk and SBAR updated right away, covering both pending follow-ups
+    await escalation_node(_state(ticket, "I just had a seizure", "HIGH"), None)
+    assert ticket.risk_level == "HIGH"
+    assert len(prompts) == 1
+    assert "Patient reports a high fever" in prompts[0] and "now I have dizziness" in prompts[0]
+    assert ticket.clinical_summary == "**Situation**: Fever, now with dizziness and a seizure."
+    assert ticket.summarized_follow_ups == len(ticket.follow_ups) == 3
+    assert trailing.schedule.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_trailing_update_summarizes_debounced_follow_up(monkeypatch):
+    ticket = _ticket(minutes_since_summary=10)
+    ticket.follow_ups = [follow_up_entry("now I have dizziness", {"risk_level": "MEDIUM"}, "new: dizziness")]
+    session = AsyncMock()
+    session.get.return_value = ticket
+    session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=ticket))
+    monkeypatch.setattr(coalescer_module, "session_scope", _scope(session))
+    monkeypatch.setattr(coalescer_module.llm, "generate", AsyncMock(return_value="**Situation**: Fever and dizziness."))
+
+    assert await refresh_sbar(ticket.id) is None
+    assert ticket.clinical_summary == "**Situation**: Fever and dizziness."
+    assert ticket.summarized_follow_ups == 1
+
+    # Scheduled once however often it is requested, and re-armed if still not due
+    refresh = AsyncMock(side_effect=[0.0, None])
+    monkeypatch.setattr(coalescer_module, "refresh_sbar", refresh)
+    updates = TrailingSbarUpdates()
+    updates.schedule(ticket.id, 0)
+    updates.schedule(ticket.id, 0)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert refresh.await_count == 2
+    assert updates.scheduled == 0
+    await updates.stop()
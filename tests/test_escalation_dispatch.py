@@ -0,0 +1,108 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.database import get_db
+from backend.models.escalation import EscalationTicket, EscalationStatus
+from backend.models.user import UserRole
+from backend.services.escalation_dispatch import EscalationDispatcher, escalation_dispatcher
+from backend.services.tokens import token_service
+
+# How to run:
+# pytest tests/test_escalation_dispatch.py
+
+
+def _ticket(risk_level, minutes_ago, status=EscalationStatus.PENDING):
+    return EscalationTicket(
+        id=uuid.uuid4(),
+        conversation_id=uuid.uuid4(),
+        patient_id=uuid.uuid4(),
+        reason="reason",
+        risk_level=risk_level,
+        clinical_summary="SBAR",
+        status=status,
+        created_at=datetime.utcnow() - timedelta(minutes=minutes_ago)
+    )
+
+
+def _result(tickets):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = tickets
+    result.scalar_one.return_value = tickets[0] if tickets else None
+    result.all.return_value = []
+    return result
+
+
+def test_orders_by_risk_then_deadline_and_pops_pending_only():
+    dispatcher = EscalationDispatcher()
+    old_medium = _ticket("MEDIUM", 50)
+    new_high = _ticket("HIGH", 1)
+    old_high = _ticket("HIGH", 10)
+    in_progress = _ticket("HIGH", 30, EscalationStatus.IN_PROGRESS)
+    low = _ticket("LOW", 120)
+    for ticket in (old_medium, new_high, old_high, in_progress, low):
+        dispatcher.track(ticket)
+
+    assert dispatcher.ordered() == [in_progress.id, old_high.id, new_high.id, old_medium.id, low.id]
+    assert dispatcher.pending == 4
+
+    # A status change re-ranks the ticket: resolved ones leave the queue
+    old_high.status = EscalationStatus.RESOLVED
+    dispatcher.track(old_high)
+    assert old_high.id not in dispatcher.ordered()
+
+    assert [dispatcher.pop() for _ in range(4)] == [(new_high.id, None), (old_medium.id, None), (low.id, None), None]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_and_catch_up_from_database():
+    dispatcher = EscalationDispatcher()
+    first, second = _ticket("MEDIUM", 5), _ticket("HIGH", 1)
+    db = AsyncMock()
+    db.execute.side_effect = [_result([first]), _result([first, second])]
+
+    assert await dispatcher.catch_up(db) == 1  # Not loaded yet: full rebuild
+    assert await dispatcher.catch_up(db) == 1  # Only the ticket it did not know
+    assert dispatcher.ordered() == [second.id, first.id]
+    assert dispatcher.ready
+
+
+def test_next_ticket_skips_tickets_claimed_elsewhere(monkeypatch):
+    escalation_dispatcher.reset()
+    taken, free = _ticket("HIGH", 20), _ticket("HIGH", 5)
+    clinician_id = uuid.uuid4()
+
+    conflict, claimed = MagicMock(rowcount=0), MagicMock(rowcount=1)
+    free_after = _ticket("HIGH", 5, EscalationStatus.IN_PROGRESS)
+    free_after.id, free_after.assigned_clinician_id = free.id, clinician_id
+    mock_session = AsyncMock()
+    mock_session.execute.side_effect = [
+        _result([taken, free]),  # rebuild
+        conflict,
+        claimed,
+        MagicMock(),  # clinician load +1
+        _result([free_after]),
+        _result([]),  # patient names
+    ]
+
+    async def override_get_db():
+        yield mock_session
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token_service.issue(clinician_id, UserRole.CLINICIAN)}"}
+        response = client.post("/api/v1/escalations/next", headers=headers)
+
+        assert response.status_code == 200
+        assert response.json()["id"] == str(free.id)
+        assert response.json()["assigned_clinician_id"] == str(clinician_id)
+        assert escalation_dispatcher.pending == 0
+        mock_session.commit.assert_awaited_once()
+
+        mock_session.execute.side_effect = [_result([])]
+        assert client.post("/api/v1/escalations/next", headers=headers).status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        escalation_dispatcher.reset()
@@ -0,0 +1,88 @@
+import pytest
+from backend.services import risk_assessment as risk_assessment_module
+from backend.services.json_stream import IncrementalJSONParser
+from backend.services.llm_schemas import ExtractedFactsOutput, parse_facts, response_schema
+from backend.services.risk_assessment import risk_assessment_service
+
+# How to run:
+# pytest tests/test_json_stream.py
+
+
+def test_partial_fields_while_streaming_and_text_around_json_skipped():
+    parser = IncrementalJSONParser()
+    parser.feed('Sure, here it is:\n```json\n{"risk_level": "HI')
+    assert parser.partial() == {}
+
+    parser.feed('GH", "triage_reason": "chest pa')
+    assert parser.partial() == {"risk_level": "HIGH"}
+    assert not parser.complete
+
+    parser.feed('in", "confidence": "HIGH"}\n```')
+    assert parser.complete
+    assert parser.result() == {"risk_level": "HIGH", "triage_reason": "chest pain", "confidence": "HIGH"}
+
+
+def test_truncated_reply_keeps_complete_values_and_trailing_commas_tolerated():
+    parser = IncrementalJSONParser()
+    parser.feed('{"medications": [{"name": "metformin", "action": "ADD"}, {"name": "insu')
+    assert parser.result() == {"medications": [{"name": "metformin", "action": "ADD"}]}
+
+    parser = IncrementalJSONParser()
+    parser.feed('{"risk_level": "LOW", "requires_escalation": false,}')
+    assert parser.result() == {"risk_level": "LOW", "requires_escalation": False}
+
+
+def test_parse_facts_drops_only_invalid_items():
+    facts = parse_facts({
+        "medications": [{"name": "metformin", "action": "ADD"}, {"name": "aspirin", "action": "MAYBE"}],
+        "symptoms": "none",
+        "allergies": [{"action": "ADD"}, {"allergen": "penicillin", "action": "ADD", "reaction": "rash"}],
+    })
+
+    assert facts["medications"] == [{"name": "metformin", "action": "ADD"}]
+    assert facts["symptoms"] == [] and facts["conditions"] == []
+    assert facts["allergies"] == [{"allergen": "penicillin", "action": "ADD", "reaction": "rash"}]
+
+
+def test_response_schema_is_gemini_subset():
+    schema = response_schema(ExtractedFactsOutput)
+    text = str(schema)
+
+    assert "$ref" not in text and "$defs" not in text and "title" not in text and "anyOf" not in text
+    medication = schema["properties"]["medications"]["items"]
+    assert medication["properties"]["action"] == {"enum": ["ADD", "STOP", "UPDATE"], "type": "string", "format": "enum"}
+    assert medication["properties"]["status"]["nullable"] is True
+    assert medication["required"] == ["name", "action"]
+
+
+@pytest.mark.asyncio
+async def test_triage_returns_as_soon_as_high_is_emitted(monkeypatch):
+    sent = []
+
+    async def stream(tier, prompt, schema=None):
+        try:
+            for chunk in ['{"confidence": "HIGH", "requires_escalation": true, "risk_level": "HIGH"', ', "triage_reason": "possible stroke', '"}']:
+                sent.append(chunk)
+                yield chunk
+        finally:
+            sent.append("closed")
+
+    monkeypatch.setattr(risk_assessment_module.llm, "stream", stream)
+
+    result = await risk_assessment_service.assess_risk("My face feels strange and my words come out wrong")
+
+    assert result["risk_level"] == "HIGH" and result["requires_escalation"]
+    assert result["reason"] == "High risk detected by triage"
+    assert len(sent) == 2 and sent[-1] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_unusable_reply_falls_back_to_keywords(monkeypatch):
+    async def stream(tier, prompt, schema=None):
+        yield '{"triage_reason": "unsure", "risk_level": "SOMETIMES"}'
+
+    monkeypatch.setattr(risk_assessment_module.llm, "stream", stream)
+
+    result = await risk_assessment_service.assess_risk("I have had a high fever since yesterday")
+
+    assert result["reason"] == "Keyword-based detection"
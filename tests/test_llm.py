@@ -0,0 +1,114 @@
+import asyncio
+import subprocess
+import sys
+import pytest
+from unittest.mock import MagicMock
+from backend.services import llm as llm_module
+from backend.services.llm import GeminiProvider
+
+
+def _fake_sdk(monkeypatch):
+    genai = MagicMock()
+    genai.GenerativeModel.side_effect = lambda name: MagicMock(model_name=name)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setattr("google.generativeai", genai, raising=False)
+    return genai
+
+
+def test_importing_the_app_does_not_load_the_sdk():
+    """backend.main imports without google.generativeai and without an API key"""
+    code = (
+        "import sys, backend.main; "
+        "from backend.services.llm import llm; "
+        "assert 'google.generativeai' not in sys.modules; "
+        "assert not llm.configured"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={"PATH": "", "GOOGLE_API_KEY": ""}
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_configures_once_and_caches_models_per_name(monkeypatch):
+    genai = _fake_sdk(monkeypatch)
+    monkeypatch.setattr(llm_module.settings, "google_api_key", "key")
+    provider = GeminiProvider()
+
+    first = provider.model("gemini-a")
+    again = provider.model("gemini-a")
+    other = provider.model("gemini-b")
+
+    assert first is again
+    assert other is not first
+    assert other.model_name == "gemini-b"
+    genai.configure.assert_called_once_with(api_key="key")
+    assert genai.GenerativeModel.call_count == 2
+
+
+def test_missing_api_key_fails_on_first_use(monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "google_api_key", "")
+    provider = GeminiProvider()
+
+    with pytest.raises(RuntimeError, match="GOOGLE_API_KEY"):
+        provider.model("gemini-a")
+    assert not provider.configured
+
+
+def _provider_with_models(monkeypatch, delay=0.0):
+    """Provider whose models echo their name; returns (provider, names of the models called)"""
+    provider = GeminiProvider()
+    called = []
+
+    def model(name=None):
+        async def generate_content_async(prompt, generation_config=None):
+            called.append((name, generation_config["max_output_tokens"]))
+            await asyncio.sleep(delay)
+            return MagicMock(text=f" {name} ")
+
+        return MagicMock(generate_content_async=generate_content_async)
+
+    monkeypatch.setattr(provider, "model", model)
+    return provider, called
+
+
+@pytest.mark.asyncio
+async def test_each_tier_uses_its_own_model_and_limits(monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "gemini_model", "pro")
+    monkeypatch.setattr(llm_module.settings, "llm_risk_model", "flash")
+    monkeypatch.setattr(llm_module.settings, "llm_risk_max_tokens", 100)
+    monkeypatch.setattr(llm_module.settings, "llm_response_model", "")
+    monkeypatch.setattr(llm_module.settings, "llm_response_max_tokens", 900)
+    provider, called = _provider_with_models(monkeypatch)
+
+    assert (await provider.generate("risk", "prompt")).strip() == "flash"
+    assert (await provider.generate("response", "prompt")).strip() == "pro"
+    assert called == [("flash", 100), ("pro", 900)]
+    with pytest.raises(ValueError):
+        await provider.generate("unknown", "prompt")
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_the_fast_tier_while_shedding_load(monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "llm_response_model", "pro")
+    monkeypatch.setattr(llm_module.settings, "gemini_fast_model", "flash")
+    monkeypatch.setattr(llm_module.settings, "llm_fast_tier_in_flight", 2)
+    provider, called = _provider_with_models(monkeypatch, delay=0.01)
+
+    await asyncio.gather(*[provider.generate("response", "prompt") for _ in range(3)])
+    await provider.generate("response", "prompt")
+
+    # The third concurrent call finds two in flight; once they finish the primary model is back
+    assert [name for name, _ in called] == ["pro", "pro", "flash", "pro"]
+
+
+@pytest.mark.asyncio
+async def test_tier_timeout(monkeypatch):
+    monkeypatch.setattr(llm_module.settings, "llm_sbar_timeout_seconds", 0.01)
+    provider, _ = _provider_with_models(monkeypatch, delay=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.generate("sbar", "prompt")
+    assert not provider.shedding_load()
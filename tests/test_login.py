@@ -0,0 +1,108 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.database import get_db
+from backend.api.v1 import auth as auth_module
+from backend.models.user import User, UserRole
+from backend.services.passwords import PasswordHasher, hash_password_sync
+from backend.services.rate_limit import TokenBucketLimiter
+
+# How to run:
+# pytest tests/test_login.py
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=0.5, clock=lambda: now[0])
+
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") == pytest.approx(2.0)
+    assert limiter.acquire("bob") == 0
+
+    now[0] = 2.0
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") > 0
+
+
+def test_token_bucket_evicts_least_recently_used_keys():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=0, max_keys=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("c")
+
+    # "a" was evicted and starts with a full bucket; "c" is still empty
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("c") == float("inf")
+
+
+@pytest.mark.asyncio
+async def test_verify_does_not_block_the_event_loop():
+    """Other coroutines keep running while bcrypt checks are in progress"""
+    hasher = PasswordHasher(workers=2)
+    password_hash = hash_password_sync("test123")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    try:
+        results = await asyncio.gather(
+            hasher.verify("test123", password_hash),
+            hasher.verify("wrong", password_hash)
+        )
+    finally:
+        task.cancel()
+        hasher.shutdown()
+
+    assert results == [True, False]
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_malformed_hash_is_rejected():
+    hasher = PasswordHasher(workers=1)
+    try:
+        assert await hasher.verify("test123", "not-a-bcrypt-hash") is False
+    finally:
+        hasher.shutdown()
+
+
+def test_login_is_rate_limited_per_username(monkeypatch):
+    """Attempts beyond the burst get 429 + Retry-After without touching the database"""
+    user = User(username="patient1", name="Patient One", role=UserRole.PATIENT)
+    user.set_password("test123")
+
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    session = AsyncMock()
+    session.execute.return_value = result
+
+    async def override_get_db():
+        yield session
+
+    now = [time.monotonic()]
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=1 / 60, clock=lambda: now[0])
+    monkeypatch.setattr(auth_module, "login_limiter", limiter)
+    monkeypatch.setattr(auth_module.settings, "login_rate_limit_burst", 2)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        assert client.post("/api/v1/auth/login", json={"username": "patient1", "password": "wrong"}).status_code == 401
+        assert client.post("/api/v1/auth/login", json={"username": "Patient1", "password": "test123"}).status_code == 200
+
+        limited = client.post("/api/v1/auth/login", json={"username": "patient1", "password": "test123"})
+        assert limited.status_code == 429
+        assert limited.headers["Retry-After"] == "60"
+        assert session.execute.await_count == 2
+
+        assert client.post("/api/v1/auth/login", json={"username": "patient2", "password": "x"}).status_code == 401
+    finally:
+        app.dependency_overrides.clear()
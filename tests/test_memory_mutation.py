@@ -1,6 +1,7 @@
 import pytest
 import uuid
 from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.orm import Session
 from backend.agent.nodes.memory_nodes import memory_update_node
 from backend.models.patient_profile import PatientProfile
 
@@ -16,7 +17,7 @@ async def test_memory_mutation_flow():
     msg_id_1 = uuid.uuid4()
     
     # Mock DB Session
-    mock_db = AsyncMock()
+    mock_db = AsyncMock(sync_session=Session())
     mock_db.add = MagicMock()
     
     # ---------------------------------------------------------
@@ -0,0 +1,220 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.database import get_db
+from backend.api.v1 import conversations as conversations_module
+from backend.models.message import RiskLevel, RiskSource
+from backend.models.user import UserRole
+from backend.services.message_coalescer import MessageCoalescer
+from backend.services.tokens import token_service
+
+# How to run:
+# pytest tests/test_message_coalescer.py
+
+
+@pytest.mark.asyncio
+async def test_rapid_messages_share_one_run():
+    coalescer = MessageCoalescer(window_ms=50, max_wait_ms=1000, max_messages=10)
+    runner = AsyncMock(side_effect=lambda items: " | ".join(items))
+
+    async def send(text, delay):
+        await asyncio.sleep(delay)
+        return await coalescer.submit("conv", text, runner)
+
+    results = await asyncio.gather(
+        send("I have a rash", 0), send("on my arm", 0.01), send("since Tuesday", 0.02)
+    )
+
+    runner.assert_awaited_once()
+    for items, result in results:
+        assert items == ["I have a rash", "on my arm", "since Tuesday"]
+        assert result == "I have a rash | on my arm | since Tuesday"
+
+
+@pytest.mark.asyncio
+async def test_immediate_submit_runs_pending_batch_without_waiting():
+    coalescer = MessageCoalescer(window_ms=5000, max_wait_ms=5000, max_messages=10)
+    runner = AsyncMock(side_effect=lambda items: len(items))
+
+    started = time.monotonic()
+    first = asyncio.create_task(coalescer.submit("conv", "feeling odd", runner))
+    await asyncio.sleep(0)
+    items, result = await coalescer.submit("conv", "crushing chest pain", runner, immediate=True)
+
+    assert time.monotonic() - started < 1
+    assert items == ["feeling odd", "crushing chest pain"]
+    assert (await first)[1] == 2
+    runner.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batch_run_is_held_until_it_finishes_even_if_submitters_leave():
+    coalescer = MessageCoalescer(window_ms=5000, max_wait_ms=5000, max_messages=10)
+    gate = asyncio.Event()
+    runs = []
+
+    async def runner(items):
+        await gate.wait()
+        runs.append(items)
+
+    submitter = asyncio.create_task(coalescer.submit("conv", "crushing chest pain", runner, immediate=True))
+    await asyncio.sleep(0)
+    assert coalescer.running == 1
+
+    submitter.cancel()  # e.g. the client disconnected
+    gate.set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert runs == [["crushing chest pain"]]
+    assert coalescer.running == 0
+
+
+@pytest.mark.asyncio
+async def test_batches_are_bounded_and_per_conversation():
+    coalescer = MessageCoalescer(window_ms=30, max_wait_ms=1000, max_messages=2)
+    runner = AsyncMock(side_effect=lambda items: list(items))
+
+    results = await asyncio.gather(
+        coalescer.submit("a", 1, runner),
+        coalescer.submit("a", 2, runner),
+        coalescer.submit("a", 3, runner),
+        coalescer.submit("b", 4, runner)
+    )
+
+    assert [items for items, _ in results] == [[1, 2], [1, 2], [3], [4]]
+    assert runner.await_count == 3
+    assert coalescer.pending("a") == 0
+
+
+@pytest.mark.asyncio
+async def test_runner_failure_reaches_every_message_of_the_batch():
+    coalescer = MessageCoalescer(window_ms=20, max_wait_ms=1000, max_messages=10)
+    runner = AsyncMock(side_effect=RuntimeError("LLM down"))
+
+    results = await asyncio.gather(
+        coalescer.submit("conv", 1, runner),
+        coalescer.submit("conv", 2, runner),
+        return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_send_message_replies_once_per_batch(monkeypatch):
+    """Each message is stored and redacted on its own; the agent runs once and the last message gets the reply"""
+    monkeypatch.setattr(conversations_module.settings, "message_coalesce_window_ms", 100)
+    monkeypatch.setattr(conversations_module, "message_coalescer", MessageCoalescer(100, 2000, 5))
+    monkeypatch.setattr(conversations_module.audit_service, "log_action", AsyncMock())
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=0)
+    monkeypatch.setattr(conversations_module, "message_limiter", limiter)
+
+    runs = []
+
+    async def fake_run(turn, messages):
+        runs.append(messages)
+        return {"response": "Thanks, noted.", "should_escalate": False, "redacted_message": "",
+                "risk_assessment": {"risk_level": "LOW"}}
+
+    monkeypatch.setattr(conversations_module, "process_patient_message", fake_run)
+    monkeypatch.setattr(conversations_module.conversation_summary_service, "refresh", AsyncMock())
+
+    patient_id = uuid.uuid4()
+    conversation = MagicMock()
+    conversation.id = uuid.uuid4()
+    conversation.patient_id = patient_id
+    conversation_result = MagicMock()
+    conversation_result.scalar_one_or_none.return_value = conversation
+    stored = []
+
+    def add(message):
+        message.id = uuid.uuid4()  # assigned by the INSERT on a real flush
+        stored.append(message)
+
+    async def override_get_db():
+        session = AsyncMock()
+        session.add = MagicMock(side_effect=add)
+        session.execute.return_value = conversation_result
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    headers = {"Authorization": f"Bearer {token_service.issue(patient_id, UserRole.PATIENT)}"}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def send(text, delay):
+                await asyncio.sleep(delay)
+                return await client.post(f"/api/v1/conversations/{conversation.id}/messages",
+                                         json={"content": text}, headers=headers)
+
+            responses = await asyncio.gather(
+                send("I have a rash", 0), send("call me at 555-123-4567", 0.02), send("since Tuesday", 0.04)
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    bodies = [response.json() for response in responses]
+    assert [body["response"] for body in bodies] == [None, None, "Thanks, noted."]
+    assert bodies[0]["coalesced"] and bodies[1]["coalesced"]
+    assert len(runs) == 1 and len(runs[0]) == 3
+
+    # Stored per message, already redacted
+    assert [message.content for message in stored] == [
+        "I have a rash", "call me at [REDACTED_PHONE]", "since Tuesday"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_update_handles_out_of_order_timestamps(monkeypatch):
+    """The partition-pruning bounds are min/max created_at; rows outside them are found by id, missing ones skipped"""
+    now = datetime.utcnow()
+    first, second, gone = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    # Submitted in coalescer order, which is not created_at order
+    messages = [
+        (second, now, None, "since Tuesday"),
+        (first, now - timedelta(seconds=5), None, "I have a rash"),
+        (gone, now - timedelta(seconds=2), None, "and a fever"),
+    ]
+    rows = {message_id: MagicMock(id=message_id) for message_id in (first, second)}
+    statements = []
+
+    async def execute(statement):
+        statements.append(statement)
+        result = MagicMock()
+        # The ranged query misses `first`, the id-only fallback finds it
+        found = [rows[second]] if len(statements) == 1 else [rows[first]]
+        result.scalars.return_value.all.return_value = found
+        return result
+
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=execute)
+
+    @asynccontextmanager
+    async def fake_scope():
+        yield session
+
+    agent = MagicMock()
+    agent.run = AsyncMock(return_value={
+        "response": "Thanks, noted.", "redacted_message": "redacted",
+        "risk_assessment": {"risk_level": "LOW", "source": "LLM"}
+    })
+    monkeypatch.setattr(conversations_module, "session_scope", fake_scope)
+    monkeypatch.setattr(conversations_module, "MedicalAgentGraph", MagicMock(return_value=agent))
+
+    turn = {"conversation_id": uuid.uuid4(), "patient_id": uuid.uuid4(), "summary": ""}
+    await conversations_module.process_patient_message(turn, messages)
+
+    bounds = statements[0].compile().params
+    assert bounds["created_at_1"] == now - timedelta(seconds=5)
+    assert bounds["created_at_2"] == now
+    assert len(statements) == 2
+    assert rows[first].risk_level == RiskLevel.LOW and rows[second].risk_level == RiskLevel.LOW
+    assert rows[first].risk_source == RiskSource.COALESCED
+    session.add.assert_called_once()  # only the AI reply
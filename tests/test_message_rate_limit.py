@@ -0,0 +1,124 @@
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.database import get_db
+from backend.api.v1 import conversations as conversations_module
+from backend.models.user import UserRole
+from backend.services.rate_limit import MessageRateLimiter, RedisMessageRateLimiter, TokenBucketLimiter
+from backend.services.tokens import token_service
+
+# How to run:
+# pytest tests/test_message_rate_limit.py
+
+
+def _limiter(conversation_burst, patient_burst):
+    clock = lambda: 0.0
+    return MessageRateLimiter(
+        conversation=TokenBucketLimiter(conversation_burst, 1 / 60, clock=clock),
+        patient=TokenBucketLimiter(patient_burst, 1 / 60, clock=clock)
+    )
+
+
+@pytest.mark.asyncio
+async def test_conversation_and_patient_buckets_both_apply():
+    limiter = _limiter(conversation_burst=2, patient_burst=3)
+
+    assert await limiter.acquire("patient", "conv-1") == 0
+    assert await limiter.acquire("patient", "conv-1") == 0
+    assert await limiter.acquire("patient", "conv-1") == pytest.approx(60)  # conversation bucket empty
+
+    # A new conversation still draws on the same patient bucket
+    assert await limiter.acquire("patient", "conv-2") == 0
+    assert await limiter.acquire("patient", "conv-3") == pytest.approx(60)  # patient bucket empty
+
+
+@pytest.mark.asyncio
+async def test_rejected_message_does_not_consume_tokens():
+    """A message takes a token from both buckets or from neither"""
+    limiter = _limiter(conversation_burst=1, patient_burst=2)
+
+    assert await limiter.acquire("patient", "conv-1") == 0
+    assert await limiter.acquire("patient", "conv-1") > 0  # conversation empty, patient untouched
+    assert await limiter.acquire("patient", "conv-2") == 0
+
+
+def _client_for_conversation(patient_id):
+    conversation = MagicMock()
+    conversation.id = uuid.uuid4()
+    conversation.patient_id = patient_id
+    conversation_result = MagicMock()
+    conversation_result.scalar_one_or_none.return_value = conversation
+
+    session = AsyncMock()
+    session.add = MagicMock()
+    session.execute.return_value = conversation_result
+
+    async def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    headers = {"Authorization": f"Bearer {token_service.issue(patient_id, UserRole.PATIENT)}"}
+    return TestClient(app), conversation, headers
+
+
+def test_throttled_message_gets_429_with_retry_after(monkeypatch):
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=12.3)
+    monkeypatch.setattr(conversations_module, "message_limiter", limiter)
+    patient_id = uuid.uuid4()
+    client, conversation, headers = _client_for_conversation(patient_id)
+    try:
+        response = client.post(
+            f"/api/v1/conversations/{conversation.id}/messages",
+            json={"content": "what dose of ibuprofen can I take?"},
+            headers=headers
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "13"
+    limiter.acquire.assert_awaited_once_with(str(patient_id), str(conversation.id))
+
+
+def test_high_risk_keyword_message_is_never_throttled(monkeypatch):
+    limiter = MagicMock()
+    limiter.acquire = AsyncMock(return_value=60)
+    monkeypatch.setattr(conversations_module, "message_limiter", limiter)
+    monkeypatch.setattr(conversations_module.audit_service, "log_action", AsyncMock())
+
+    agent = MagicMock()
+    agent.return_value.run = AsyncMock(side_effect=RuntimeError("agent reached"))
+    monkeypatch.setattr(conversations_module, "MedicalAgentGraph", agent)
+
+    client, conversation, headers = _client_for_conversation(uuid.uuid4())
+    try:
+        response = client.post(
+            f"/api/v1/conversations/{conversation.id}/messages",
+            json={"content": "I have crushing chest pain"},
+            headers=headers
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    # The message went past the limiter into the agent
+    assert response.status_code != 429
+    limiter.acquire.assert_not_awaited()
+    agent.return_value.run.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_charges_both_keys_and_fails_open():
+    limiter = RedisMessageRateLimiter("redis://unused", [("conversation", 5, 0.5), ("patient", 20, 1.0)])
+    limiter._client = object()
+    limiter._script = AsyncMock(return_value=b"2.5")
+
+    assert await limiter.acquire("p1", "c1") == 2.5
+    call = limiter._script.call_args.kwargs
+    assert call["keys"] == ["ratelimit:conversation:c1", "ratelimit:patient:p1"]
+    assert call["args"] == [1, 5, 0.5, 20, 1.0]
+
+    limiter._script = AsyncMock(side_effect=ConnectionError("redis down"))
+    assert await limiter.acquire("p1", "c1") == 0
@@ -0,0 +1,81 @@
+import pytest
+from backend.services import risk_assessment as risk_assessment_module
+from backend.services.metrics import metrics
+from backend.services.near_duplicate import NearDuplicateCache
+from backend.services.risk_assessment import risk_assessment_service
+
+# How to run:
+# pytest tests/test_near_duplicate.py
+
+
+def _cache(**overrides):
+    options = {"max_entries": 100, "max_distance": 3, "ttl_seconds": 60, "min_words": 4}
+    options.update(overrides)
+    return NearDuplicateCache(**options)
+
+
+def test_punctuation_casing_and_filler_words_match():
+    cache = _cache()
+    cache.put("risk", "Blood sugar was 140 this morning after breakfast.", {"risk_level": "LOW"})
+
+    assert cache.get("risk", "blood sugar was 140 this morning after breakfast") == {"risk_level": "LOW"}
+    assert cache.get("risk", "Hi, um, blood sugar was 140 this morning after breakfast!! thanks") == {"risk_level": "LOW"}
+    assert cache.get("extraction", "blood sugar was 140 this morning after breakfast") is None  # other kind
+
+
+def test_numbers_negations_and_short_messages_never_match():
+    cache = _cache()
+    cache.put("risk", "Blood sugar was 140 this morning after breakfast", {"risk_level": "LOW"})
+    cache.put("risk", "I have pain in my left leg today", {"risk_level": "MEDIUM"})
+    cache.put("risk", "feeling fine", {"risk_level": "LOW"})
+
+    assert cache.get("risk", "Blood sugar was 40 this morning after breakfast") is None
+    assert cache.get("risk", "I have no pain in my left leg today") is None
+    assert cache.get("risk", "feeling fine") is None
+    assert cache.get("risk", "My knee has been swollen since Saturday") is None
+
+
+def test_scope_eviction_and_hit_rate():
+    metrics.reset()
+    cache = _cache(max_entries=2)
+    cache.put("extraction", "I took my metformin with dinner tonight", {"medications": []}, scope="patient-a:3")
+
+    assert cache.get("extraction", "I took my metformin with dinner tonight", scope="patient-a:4") is None
+    assert cache.get("extraction", "I took my metformin with dinner tonight.", scope="patient-a:3") == {"medications": []}
+
+    cache.put("risk", "my ankle still hurts when I walk", {"risk_level": "LOW"})
+    cache.put("risk", "the rash on my arm is spreading slowly", {"risk_level": "MEDIUM"})
+    assert cache.get("extraction", "I took my metformin with dinner tonight", scope="patient-a:3") is None  # evicted
+    assert sum(len(members) for members in cache._index.values()) == 2 * 4  # two entries, four bands
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["near_duplicate_cache.extraction.hit_rate"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.asyncio
+async def test_assess_risk_reuses_near_duplicates_but_not_high_keywords(monkeypatch):
+    monkeypatch.setattr(risk_assessment_module, "near_duplicate_cache", _cache())
+    calls = []
+
+    async def stream(tier, prompt, schema=None):
+        calls.append(prompt)
+        yield '{"confidence": "HIGH", "requires_escalation": false, "risk_level": "LOW", "triage_reason": "routine"}'
+
+    monkeypatch.setattr(risk_assessment_module.llm, "stream", stream)
+
+    message = "Blood sugar was 140 this morning after breakfast"
+    await risk_assessment_service.assess_risk(message, scope="conversation-a")
+    reused = await risk_assessment_service.assess_risk(message.lower() + "!", scope="conversation-a")
+    assert len(calls) == 1
+    assert reused["risk_level"] == "LOW" and reused["source"] == "CACHE"
+
+    # Never reused across conversations, for another context, or without a scope
+    await risk_assessment_service.assess_risk(message, scope="conversation-b")
+    await risk_assessment_service.assess_risk(message, "Earlier: my left arm went numb", scope="conversation-a")
+    await risk_assessment_service.assess_risk(message)
+    assert len(calls) == 4
+
+    for _ in range(2):
+        high = await risk_assessment_service.assess_risk("I have chest pain since this morning after breakfast", scope="conversation-a")
+    assert len(calls) == 6
+    assert high["risk_level"] == "HIGH"
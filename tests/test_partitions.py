@@ -0,0 +1,47 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from backend.services.partitions import add_months, ensure_partitions, partition_name, _export_partition
+
+
+def test_add_months_wraps_years():
+    assert add_months(datetime(2026, 11, 1), 3) == datetime(2027, 2, 1)
+    assert add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    assert partition_name("messages", datetime(2026, 2, 1)) == "messages_2026_02"
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_current_and_upcoming_months():
+    conn = AsyncMock()
+
+    names = await ensure_partitions(conn, now=datetime(2026, 12, 15), months_ahead=1)
+
+    assert names == ["messages_2026_12", "messages_2027_01", "audit_logs_2026_12", "audit_logs_2027_01"]
+    statements = [str(call.args[0]) for call in conn.execute.await_args_list]
+    assert (
+        "CREATE TABLE IF NOT EXISTS messages_2027_01 PARTITION OF messages "
+        "FOR VALUES FROM ('2027-01-01T00:00:00') TO ('2027-02-01T00:00:00')"
+    ) in statements
+    assert "CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT" in statements
+
+
+@pytest.mark.asyncio
+async def test_export_writes_compressed_ndjson_and_manifest(tmp_path):
+    lines = [json.dumps({"id": str(i), "content": "[REDACTED]"}) for i in range(3)]
+
+    async def rows():
+        for line in lines:
+            yield (line,)
+
+    conn = MagicMock()
+    conn.stream = AsyncMock(return_value=rows())
+
+    manifest = await _export_partition(conn, "messages", "messages_2025_01", str(tmp_path))
+
+    with gzip.open(tmp_path / "messages_2025_01.ndjson.gz", "rt") as archive:
+        assert archive.read().splitlines() == lines
+    assert manifest["rows"] == 3
+    assert manifest["range_end"] == "2025-02-01T00:00:00"
+    assert json.loads((tmp_path / "messages_2025_01.manifest.json").read_text())["sha256"] == manifest["sha256"]
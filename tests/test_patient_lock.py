@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from backend.services.patient_lock import KeyedLock
+
+
+@pytest.mark.asyncio
+async def test_same_patient_runs_are_serialized():
+    """Read-modify-write under the lock never loses an update"""
+    locks = KeyedLock()
+    profile = []
+
+    async def update(fact):
+        async with locks.hold("patient-a"):
+            snapshot = list(profile)
+            await asyncio.sleep(0.01)
+            snapshot.append(fact)
+            profile[:] = snapshot
+
+    await asyncio.gather(*[update(i) for i in range(10)])
+
+    assert sorted(profile) == list(range(10))
+    assert len(locks) == 0, "Locks should be released once nobody waits"
+
+
+@pytest.mark.asyncio
+async def test_different_patients_do_not_wait():
+    """Holding one patient's lock does not block another patient"""
+    locks = KeyedLock()
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    async def hold_a():
+        async with locks.hold("patient-a"):
+            entered.set()
+            await release.wait()
+
+    task = asyncio.create_task(hold_a())
+    await entered.wait()
+
+    async with locks.hold("patient-b"):
+        assert len(locks) == 2
+
+    release.set()
+    await task
+    assert len(locks) == 0
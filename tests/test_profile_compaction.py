@@ -0,0 +1,116 @@
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.orm import Session
+from backend.models.patient_profile import PatientProfile
+from backend.models.symptom_history import SymptomHistory
+from backend.services.profile_compaction import compact_symptoms, compact_profile, profile_size
+
+
+def _symptom(description, severity="MODERATE", **extra):
+    entry = {
+        "description": description,
+        "severity": severity,
+        "provenance_message_id": str(uuid.uuid4())
+    }
+    entry.update(extra)
+    return entry
+
+
+def test_duplicates_collapse_into_summary():
+    """Repeated mentions become one summarized entry with the highest severity"""
+    first = _symptom("Headache", "MILD")
+    second = _symptom("headache ", "SEVERE")
+    third = _symptom("Nausea")
+
+    active, archived = compact_symptoms([first, third, second], window=10)
+
+    assert len(active) == 2
+    assert active[0]["description"] == "Nausea"
+    summary = active[1]
+    assert summary["summarized"] is True
+    assert summary["occurrences"] == 2
+    assert summary["severity"] == "SEVERE"
+    assert summary["provenance_message_id"] == second["provenance_message_id"]
+    assert summary["first_provenance_message_id"] == first["provenance_message_id"]
+    assert [reason for _, reason in archived] == ["DUPLICATE", "DUPLICATE"]
+
+
+def test_resolved_and_window_overflow_are_archived():
+    """Resolved symptoms leave the profile and only the newest `window` entries stay"""
+    resolved = _symptom("Cough", status="RESOLVED")
+    symptoms = [resolved] + [_symptom(f"Symptom {i}") for i in range(5)]
+
+    active, archived = compact_symptoms(symptoms, window=3)
+
+    assert [s["description"] for s in active] == ["Symptom 2", "Symptom 3", "Symptom 4"]
+    reasons = [reason for _, reason in archived]
+    assert reasons.count("RESOLVED") == 1
+    assert reasons.count("WINDOW") == 2
+    assert archived[0][0] is resolved
+
+
+@pytest.mark.asyncio
+async def test_compact_profile_archives_and_shrinks():
+    """Compaction writes history rows and reports smaller prompt size"""
+    mock_db = AsyncMock(sync_session=Session())
+    mock_db.add = MagicMock()
+
+    profile = PatientProfile(
+        patient_id=uuid.uuid4(),
+        medications=[],
+        symptoms=[_symptom("Headache") for _ in range(30)],
+        allergies=[],
+        conditions=[]
+    )
+
+    stats = await compact_profile(mock_db, profile, window=5)
+
+    assert len(profile.symptoms) == 1
+    assert stats["archived"] == 30
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert stats["tokens_after"] < stats["tokens_before"]
+    assert stats["bytes_after"] == profile_size({"symptoms": profile.symptoms})[0]
+
+    history_rows = [call[0][0] for call in mock_db.add.call_args_list]
+    assert all(isinstance(row, SymptomHistory) for row in history_rows)
+    assert mock_db.flush.called
+
+
+@pytest.mark.asyncio
+async def test_run_compaction_commits_each_profile_in_its_own_transaction(monkeypatch):
+    """Advisory locks are released per profile; batch_size only pages the candidate ids"""
+    from backend import database
+    from backend.services import profile_compaction
+
+    profile_ids = [uuid.uuid4() for _ in range(3)]
+    pages = [profile_ids[:2], profile_ids[2:], []]
+    sessions = []
+
+    def page_result():
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = pages.pop(0)
+        return result
+
+    @asynccontextmanager
+    async def session_factory():
+        session = AsyncMock()
+        session.execute = AsyncMock(side_effect=lambda query: page_result())
+        session.get = AsyncMock(side_effect=lambda model, profile_id: MagicMock(id=profile_id))
+        sessions.append(session)
+        yield session
+
+    stats = {"archived": 1, "bytes_before": 10, "bytes_after": 5, "tokens_before": 3, "tokens_after": 2}
+    compact = AsyncMock(return_value=stats)
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(profile_compaction, "compact_profile", compact)
+
+    totals = await profile_compaction.run_compaction(window=5, batch_size=2)
+
+    assert totals["profiles_compacted"] == 3 and totals["archived"] == 3
+    assert [call.args[1].id for call in compact.await_args_list] == profile_ids
+    # Each compacted profile has its own session, committed once
+    profile_sessions = [session for session in sessions if session.get.await_count]
+    assert len(profile_sessions) == 3
+    assert all(session.commit.await_count == 1 for session in profile_sessions)
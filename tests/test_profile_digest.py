@@ -0,0 +1,77 @@
+import uuid
+from backend.services.profile_history import facts_to_events, apply_event, empty_profile, make_event, SYMPTOMS_COMPACTED
+from backend.services.profile_digest import build_digest, advance_digest, NO_HISTORY
+
+
+def _turns():
+    msg = uuid.uuid4()
+    return [
+        facts_to_events({
+            "medications": [{"name": "Advil", "action": "ADD"}, {"name": "Metformin", "action": "ADD"}],
+            "allergies": [{"allergen": "Penicillin", "reaction": "Rash", "action": "ADD"}],
+        }, msg),
+        facts_to_events({
+            "symptoms": [{"description": "Headache", "severity": "MILD", "action": "ADD"},
+                         {"description": "Nausea", "action": "ADD"}],
+            "conditions": [{"name": "Type 2 diabetes", "action": "ADD"}],
+        }, msg),
+        facts_to_events({
+            "medications": [{"name": "advil", "action": "STOP"}],
+            "symptoms": [{"description": "headache", "action": "REMOVE"}],
+        }, msg),
+    ]
+
+
+def test_incremental_digest_matches_full_rebuild():
+    """Advancing the stored digest event by event yields the same prompt text as a rebuild"""
+    profile = empty_profile()
+    digest = build_digest(profile, 0)
+    version = 0
+
+    for events in _turns():
+        for event in events:
+            apply_event(profile, event)
+        digest = advance_digest(digest, version, events, profile)
+        version += len(events)
+
+        rebuilt = build_digest(profile, version)
+        assert digest["context"] == rebuilt["context"]
+        assert digest["block"] == rebuilt["block"]
+        assert digest["version"] == version
+
+    assert digest["context"].splitlines() == [
+        "Current medications: Metformin",
+        "Known conditions: Type 2 diabetes",
+        "Allergies: Penicillin (Rash)",
+        "Recent symptoms: Nausea (MODERATE)",
+    ]
+
+
+def test_stale_digest_is_rebuilt():
+    """A digest for an older version is replaced, not patched"""
+    profile = empty_profile()
+    events = _turns()[0]
+    for event in events:
+        apply_event(profile, event)
+
+    stale = build_digest(empty_profile(), version=7)
+    digest = advance_digest(stale, 0, events, profile)
+
+    assert digest == build_digest(profile, len(events))
+
+
+def test_empty_and_compacted_profiles():
+    """Empty profiles render the no-history text; compaction replaces the symptom line"""
+    assert build_digest(empty_profile())["context"] == NO_HISTORY
+
+    profile = empty_profile()
+    events = _turns()[1]
+    for event in events:
+        apply_event(profile, event)
+    digest = advance_digest(build_digest(empty_profile()), 0, events, profile)
+
+    compacted = make_event(SYMPTOMS_COMPACTED, {"symptoms": [{"description": "Nausea", "severity": "SEVERE"}]})
+    apply_event(profile, compacted)
+    digest = advance_digest(digest, len(events), [compacted], profile)
+
+    assert "- Symptoms: Nausea (SEVERE)" in digest["block"]
@@ -0,0 +1,79 @@
+import pytest
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from backend.models.patient_profile import PatientProfile
+from backend.models.profile_history import ProfileEvent, ProfileSnapshot
+from backend.services import profile_history
+from backend.services.profile_history import (
+    facts_to_events,
+    record_profile_events,
+    get_profile_as_of,
+    apply_event,
+    empty_profile,
+)
+
+
+@pytest.mark.asyncio
+async def test_events_are_logged_and_snapshotted(monkeypatch):
+    """Each fact becomes a sequenced event; a snapshot is written every N events"""
+    monkeypatch.setattr(profile_history.settings, "profile_snapshot_interval", 2)
+
+    mock_db = AsyncMock()
+    profile = PatientProfile(patient_id=uuid.uuid4(), medications=[], symptoms=[], allergies=[], conditions=[], version=0)
+    msg_id = uuid.uuid4()
+
+    events = facts_to_events({
+        "medications": [{"name": "Advil", "action": "ADD"}],
+        "symptoms": [{"description": "Headache", "severity": "MILD", "action": "ADD"}],
+        "allergies": [{"allergen": "Penicillin", "reaction": "Rash", "action": "ADD"}]
+    }, msg_id)
+    await record_profile_events(mock_db, profile, events)
+
+    assert profile.version == 3
+    assert profile.medications[0]["name"] == "Advil"
+
+    event_insert, snapshot_insert = mock_db.execute.call_args_list
+    event_rows = event_insert[0][1]
+    assert [row["seq"] for row in event_rows] == [1, 2, 3]
+    assert all(row["provenance_message_id"] == msg_id for row in event_rows)
+
+    snapshot_rows = snapshot_insert[0][1]
+    assert [row["version"] for row in snapshot_rows] == [2]
+    assert len(snapshot_rows[0]["state"]["medications"]) == 1
+    assert len(snapshot_rows[0]["state"]["allergies"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_profile_as_of_replays_tail_after_snapshot():
+    """Point-in-time reads start from the snapshot and replay only later events"""
+    patient_id = uuid.uuid4()
+    msg_id = uuid.uuid4()
+
+    state_at_1 = empty_profile()
+    apply_event(state_at_1, facts_to_events({"medications": [{"name": "Advil", "action": "ADD"}]}, msg_id)[0])
+    snapshot = ProfileSnapshot(patient_id=patient_id, version=1, state=state_at_1)
+
+    stop_event = ProfileEvent(
+        patient_id=patient_id,
+        seq=2,
+        event_type="MEDICATION_STOPPED",
+        payload={"name": "advil"},
+        provenance_message_id=msg_id
+    )
+
+    snapshot_result = MagicMock()
+    snapshot_result.scalar_one_or_none.return_value = snapshot
+    events_result = MagicMock()
+    events_result.scalars.return_value.all.return_value = [stop_event]
+
+    mock_db = AsyncMock()
+    mock_db.execute.side_effect = [snapshot_result, events_result]
+
+    state = await get_profile_as_of(mock_db, patient_id, datetime.utcnow())
+
+    assert state["version"] == 2
+    assert state["medications"][0]["status"] == "STOPPED"
+    assert state["medications"][0]["provenance_message_id"] == str(msg_id)
+    # The snapshot itself must not be mutated by replay
+    assert snapshot.state["medications"][0]["status"] == "ACTIVE"
@@ -0,0 +1,75 @@
+import pytest
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.orm import Session
+from backend.models.patient_profile import PatientProfile
+from backend.services.profile_history import facts_to_events
+from backend.services.profile_store import ProfileUnitOfWork, ProfileReadCache, profile_cache
+
+
+@pytest.mark.asyncio
+async def test_profile_loaded_once_and_shared():
+    """Every node gets the same ORM object and dict view from a single query"""
+    patient_id = uuid.uuid4()
+    profile = PatientProfile(patient_id=patient_id, medications=[{"name": "Advil"}], symptoms=[], allergies=[], conditions=[], version=1)
+
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = profile
+    mock_db = AsyncMock()
+    mock_db.execute.return_value = mock_result
+
+    uow = ProfileUnitOfWork(patient_id)
+    first_view = await uow.view(mock_db)
+    second_view = await uow.view(mock_db)
+    loaded = await uow.load(mock_db)
+
+    assert first_view is second_view
+    assert loaded is profile
+    assert first_view["medications"] is profile.medications
+    assert mock_db.execute.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_commit_writes_once_and_invalidates_cache():
+    """Staged events from several nodes are persisted in one write"""
+    patient_id = uuid.uuid4()
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = None
+    mock_db = AsyncMock(sync_session=Session())
+    mock_db.add = MagicMock()
+    mock_db.execute.return_value = mock_result
+
+    profile_cache.put(patient_id, {"patient_id": str(patient_id)})
+
+    uow = ProfileUnitOfWork(patient_id)
+    await uow.get_or_create(mock_db)
+    uow.stage(facts_to_events({"medications": [{"name": "Advil", "action": "ADD"}]}, uuid.uuid4()))
+    uow.stage(facts_to_events({"allergies": [{"allergen": "Latex", "action": "ADD"}]}, uuid.uuid4()))
+    await uow.commit(mock_db)
+    await uow.commit(mock_db)  # nothing left to write
+
+    assert uow.profile.version == 2
+    assert mock_db.flush.call_count == 1
+    assert mock_db.add.call_count == 1
+
+    # The cached profile is dropped when the caller's transaction commits, not before
+    assert profile_cache.get(patient_id) is not None
+    mock_db.sync_session.commit()
+    assert profile_cache.get(patient_id) is None
+
+
+def test_read_cache_expires_and_evicts(monkeypatch):
+    """Entries expire after the TTL and the oldest entry is evicted when full"""
+    now = [1000.0]
+    monkeypatch.setattr("backend.services.profile_store.time.monotonic", lambda: now[0])
+
+    cache = ProfileReadCache(ttl_seconds=30, max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.put("c", {"v": 3})
+
+    assert cache.get("a") is None
+    assert cache.get("b") == {"v": 2}
+
+    now[0] += 31
+    assert cache.get("c") is None
@@ -0,0 +1,124 @@
+import random
+import numpy as np
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from backend.services import risk_assessment as risk_assessment_module
+from backend.services import risk_classifier as risk_classifier_module
+from backend.services.risk_assessment import risk_assessment_service
+from backend.services.risk_classifier import RiskPreClassifier, fit
+
+# How to run:
+# pytest tests/test_risk_classifier.py
+
+LOW = [
+    "what time should I take my {thing}",
+    "can I take my {thing} with food",
+    "I need a refill of my {thing}",
+    "when is my next appointment about my {thing}",
+    "thanks for the advice about my {thing}",
+    "is it ok to skip my {thing} today",
+]
+MEDIUM = [
+    "I have had a high fever for three days and my {thing} is not helping",
+    "severe pain in my back since I stopped my {thing}",
+    "I feel dizzy and confused after taking my {thing}",
+    "persistent vomiting and I can't keep my {thing} down",
+]
+HIGH = [
+    "my chest hurts badly and my arm is numb after my {thing}",
+    "I can't breathe properly since taking my {thing}",
+    "I want to overdose on my {thing}",
+    "my face is drooping and my speech is slurred, I took my {thing}",
+]
+THINGS = ["vitamins", "metformin", "inhaler", "ibuprofen", "lisinopril", "insulin", "allergy pills", "antibiotics"]
+
+
+def _corpus(seed=3, per_template=40):
+    rng = random.Random(seed)
+    texts, levels = [], []
+    for level, templates in (("LOW", LOW), ("MEDIUM", MEDIUM), ("HIGH", HIGH)):
+        for template in templates:
+            for _ in range(per_template):
+                texts.append(template.format(thing=rng.choice(THINGS)))
+                levels.append(level)
+    return texts, levels
+
+
+def test_training_meets_recall_target_and_skips_clear_low():
+    texts, levels = _corpus()
+    classifier, report = fit(texts, levels, target_recall=0.99, dim=2 ** 14)
+
+    assert classifier.threshold > 0
+    assert report["high_recall"] == 1.0 and report["medium_recall"] == 1.0
+    assert report["low_skip_rate"] > 0.8
+    assert classifier.is_clear_low("what time should I take my vitamins")
+    assert not classifier.is_clear_low("I can't breathe properly since taking my inhaler")
+
+
+def test_too_few_escalating_examples_never_skip():
+    texts, levels = _corpus()
+    classifier = RiskPreClassifier.train(texts, [level != "LOW" for level in levels], dim=2 ** 12, epochs=20)
+    classifier.calibrate(texts[:5], [True] * 5, target_recall=0.99)
+
+    assert classifier.threshold == 0
+    assert not classifier.is_clear_low("what time should I take my vitamins")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    texts, levels = _corpus(per_template=10)
+    classifier, _ = fit(texts, levels, target_recall=0.95, dim=2 ** 12)
+    path = str(tmp_path / "risk_classifier.npz")
+    classifier.save(path)
+
+    loaded = RiskPreClassifier.load(path)
+    assert loaded.threshold == pytest.approx(classifier.threshold)
+    assert loaded.meta["target_recall"] == pytest.approx(0.95)
+    np.testing.assert_allclose(loaded.scores(texts[:10]), classifier.scores(texts[:10]))
+
+
+@pytest.mark.asyncio
+async def test_assess_risk_skips_llm_only_for_clear_low(monkeypatch, tmp_path):
+    texts, levels = _corpus()
+    classifier, _ = fit(texts, levels, target_recall=0.99, dim=2 ** 14)
+    path = str(tmp_path / "risk_classifier.npz")
+    classifier.save(path)
+    monkeypatch.setattr(risk_assessment_module.settings, "risk_classifier_path", path)
+    risk_classifier_module.risk_pre_classifier.reset()
+    calls = []
+
+    async def stream(tier, prompt, schema=None):
+        calls.append(prompt)
+        yield '{"confidence": "HIGH", "requires_escalation": true, "risk_level": "MEDIUM", "triage_reason": "fever"}'
+
+    monkeypatch.setattr(risk_assessment_module.llm, "stream", stream)
+
+    try:
+        clear = await risk_assessment_service.assess_risk("can I take my vitamins with food")
+        assert not calls
+        unclear = await risk_assessment_service.assess_risk("I have had a high fever for three days")
+        assert len(calls) == 1
+    finally:
+        risk_classifier_module.risk_pre_classifier.reset()
+
+    assert clear["risk_level"] == "LOW" and not clear["requires_escalation"]
+    assert unclear["risk_level"] == "MEDIUM"
+    assert (clear["source"], unclear["source"]) == ("CLASSIFIER", "LLM")
+
+
+@pytest.mark.asyncio
+async def test_training_uses_only_llm_and_keyword_labels(monkeypatch):
+    from backend import database
+
+    session = AsyncMock()
+    session.execute.return_value = MagicMock(all=MagicMock(return_value=[]))
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    monkeypatch.setattr(database, "AsyncSessionLocal", session_factory)
+    await risk_classifier_module.load_labelled_messages()
+
+    query = session.execute.await_args.args[0].compile(compile_kwargs={"literal_binds": True})
+    assert "messages.risk_source IN ('LLM', 'KEYWORD')" in str(query)
@@ -37,7 +37,12 @@ async def test_risk_escalation_flow():
     mock_conversation = MagicMock()
     mock_conversation.status = "ACTIVE"
     mock_result.scalar_one_or_none.return_value = mock_conversation
-    mock_db.execute.return_value = mock_result
+    # No open ticket to add to and no clinician available
+    empty_result = MagicMock()
+    empty_result.scalar_one_or_none.return_value = None
+    mock_db.execute.side_effect = lambda statement, *args: (
+        mock_result if "FROM conversations" in str(statement) else empty_result
+    )
     
     # Prepare State
     state = AgentState(
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+import backend.main as main
+import backend.init_test_users as seed_module
+from backend.models.user import User
+
+
+@pytest.mark.asyncio
+async def test_worker_startup_does_not_touch_schema_or_seed(monkeypatch):
+    """Workers only warm the pool; create_all and seeding are one-off CLI commands"""
+    warm_pool = AsyncMock()
+    init_db = AsyncMock()
+    init_test_users = AsyncMock()
+    monkeypatch.setattr(main, "warm_pool", warm_pool)
+    monkeypatch.setattr("backend.database.init_db", init_db)
+    monkeypatch.setattr(seed_module, "init_test_users", init_test_users)
+    monkeypatch.setattr(main.audit_sink, "start", AsyncMock())
+    monkeypatch.setattr(main, "partition_maintenance_loop", AsyncMock())
+    monkeypatch.setattr(main.escalation_dispatcher, "rebuild", AsyncMock(return_value=0))
+    monkeypatch.setattr(main, "resync_loop", AsyncMock())
+    monkeypatch.setattr(main, "background_tasks", set())
+
+    await main.startup_event()
+
+    warm_pool.assert_awaited_once_with(main.settings.db_pool_warm_connections)
+    init_db.assert_not_awaited()
+    init_test_users.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_seed_checks_all_users_in_one_query(monkeypatch):
+    """Existing users are found with a single IN query and are not re-hashed"""
+    existing = MagicMock()
+    existing.scalars.return_value.all.return_value = [
+        "patient1", "patient2", "patient3", "patient4", "clinician1"
+    ]
+    db = AsyncMock()
+    db.add = MagicMock()
+    db.execute.return_value = existing
+
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=db)
+    session.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(seed_module, "async_session_maker", lambda: session)
+
+    await seed_module.init_test_users()
+
+    assert db.execute.await_count == 1
+    db.add.assert_called_once()
+    created = db.add.call_args.args[0]
+    assert isinstance(created, User)
+    assert created.username == "clinician2"
+    assert created.check_password("test123")
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_and_awaits_background_loops(monkeypatch, capsys):
+    """Periodic loops are referenced while they run, failures are logged, shutdown cancels the rest"""
+    started = asyncio.Event()
+
+    async def forever(interval):
+        started.set()
+        await asyncio.Event().wait()
+
+    async def failing(interval):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(main, "background_tasks", set())
+    monkeypatch.setattr(main, "warm_pool", AsyncMock())
+    monkeypatch.setattr(main.escalation_dispatcher, "rebuild", AsyncMock(return_value=0))
+    monkeypatch.setattr(main.settings, "audit_batching", False)
+    monkeypatch.setattr(main.settings, "agent_async_mode", False)
+    monkeypatch.setattr(main.settings, "escalation_queue_resync_seconds", 1)
+    monkeypatch.setattr(main.settings, "profile_compaction_interval_seconds", 1)
+    monkeypatch.setattr(main.settings, "audit_seal_interval_seconds", 0)
+    monkeypatch.setattr(main.settings, "partition_maintenance_interval_seconds", 0)
+    monkeypatch.setattr(main, "resync_loop", forever)
+    monkeypatch.setattr(main, "compaction_loop", failing)
+    for stop in (main.agent_jobs, main.trailing_sbar_updates, main.audit_sink):
+        monkeypatch.setattr(stop, "stop", AsyncMock())
+    monkeypatch.setattr(main.password_hasher, "shutdown", MagicMock())
+
+    await main.startup_event()
+    await started.wait()
+    await asyncio.sleep(0)
+
+    assert "Error in background task profile_compaction" in capsys.readouterr().out
+    assert [task.get_name() for task in main.background_tasks] == ["escalation_resync"]
+    task = next(iter(main.background_tasks))
+
+    await main.shutdown_event()
+
+    assert task.cancelled()
+    assert not main.background_tasks
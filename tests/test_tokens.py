@@ -0,0 +1,78 @@
+import json
+import uuid
+import pytest
+from backend.models.user import UserRole
+from backend.services.tokens import InvalidToken, RevocationList, RevocationListFull, TokenService, _b64decode, _b64encode
+
+
+def _service(ttl_seconds=60, revocations=None):
+    return TokenService("test-secret", ttl_seconds, revocations or RevocationList(100))
+
+
+def test_issued_token_round_trips():
+    service = _service()
+    user_id = uuid.uuid4()
+
+    user = service.verify(service.issue(user_id, UserRole.CLINICIAN))
+
+    assert user.user_id == user_id
+    assert user.role == UserRole.CLINICIAN
+
+
+def test_tampered_or_foreign_tokens_are_rejected():
+    service = _service()
+    token = service.issue(uuid.uuid4(), UserRole.PATIENT)
+    header, payload, signature = token.split(".")
+
+    # Claim a different role with the original signature
+    claims = json.loads(_b64decode(payload))
+    claims["role"] = "CLINICIAN"
+    forged_payload = _b64encode(json.dumps(claims).encode())
+    with pytest.raises(InvalidToken):
+        service.verify(f"{header}.{forged_payload}.{signature}")
+    with pytest.raises(InvalidToken):
+        TokenService("other-secret", 60, RevocationList(10)).verify(token)
+    with pytest.raises(InvalidToken):
+        service.verify("not-a-token")
+
+
+def test_expired_token_is_rejected():
+    service = _service(ttl_seconds=60)
+    token = service.issue(uuid.uuid4(), UserRole.PATIENT, now=1000)
+
+    assert service.verify(token, now=1059)
+    with pytest.raises(InvalidToken, match="expired"):
+        service.verify(token, now=1060)
+
+
+def test_revoked_token_is_rejected_until_it_expires():
+    revocations = RevocationList(100)
+    service = _service(revocations=revocations)
+    token = service.issue(uuid.uuid4(), UserRole.PATIENT)
+    other = service.issue(uuid.uuid4(), UserRole.PATIENT)
+
+    service.revoke(service.verify(token))
+
+    with pytest.raises(InvalidToken, match="revoked"):
+        service.verify(token)
+    assert service.verify(other)
+
+    # Expired entries are dropped from the list on lookup
+    user = service.verify(other)
+    revocations.revoke(user.token_id, expires_at=10)
+    assert not revocations.is_revoked(user.token_id, now=11)
+
+
+def test_full_revocation_list_evicts_only_expired_entries():
+    revocations = RevocationList(2)
+    revocations.revoke("a", expires_at=100, now=50)
+    revocations.revoke("b", expires_at=10 ** 12, now=50)
+
+    # "a" has expired and makes room; live revocations are never evicted
+    revocations.revoke("c", expires_at=10 ** 12, now=150)
+    with pytest.raises(RevocationListFull):
+        revocations.revoke("d", expires_at=10 ** 12, now=150)
+
+    assert revocations.is_revoked("b")
+    assert revocations.is_revoked("c")
+    assert not revocations.is_revoked("d")